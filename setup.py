@@ -5,11 +5,13 @@ setuptools.setup(
     name="surveillance_bot",
     version="1.0",
     packages=['surveillance_bot'],
-    install_requires=["python-telegram-bot>=12", "opencv-python>=4", "sounddevice>=0.4", "pydub>=0.25"],
+    install_requires=["python-telegram-bot>=13.5", "opencv-python>=4", "sounddevice>=0.4"],
+    extras_require={'opus': ["soundfile>=0.10"]},
     python_requires='>=3.6, <3.9',
     entry_points={
         'console_scripts': [
-            'surveillance_bot = surveillance_bot.main:main'
+            'surveillance_bot = surveillance_bot.main:main',
+            'surveillance_bot_batch = surveillance_bot.batch:main'
         ]
     },
     author="Pablo Chinea",
@@ -0,0 +1,577 @@
+"""
+Module for audio monitoring.
+
+This module implements the `AudioMonitor` class that listens to the
+microphone during the surveillance mode. A single input stream is kept
+open while monitoring, shared by every camera watched by the process (see
+`AudioMonitor.shared_listener`), its samples are written into a preallocated
+circular buffer and the loudness of a sliding window is updated with every
+block of samples, so sound is detected within a block and the video
+analysis never waits for the audio. The buffer keeps the latest seconds of
+sound, so the audio clips of the events include the sound heard before
+them.
+
+Optionally, sound is detected in frequency bands by a `SpectralDetector`,
+which compares the energy of every band with its learned noise floor, so a
+constant background noise (e.g. a hum) does not hide the sounds of other
+frequencies.
+"""
+from collections import deque
+from math import log10, sqrt
+from threading import Lock
+from typing import (
+    Any,
+    ClassVar,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple
+)
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+import sounddevice as sd
+
+FULL_SCALE = 2 ** 31
+"""Full scale amplitude of the 32 bits samples."""
+
+MIN_DBFS = -120.0
+"""Lowest level (in dBFS) accepted as a sound threshold."""
+
+
+def to_dbfs(amplitude: float) -> float:
+    """
+    Converts an amplitude into decibels relative to the full scale.
+
+    Args:
+        amplitude: The amplitude of 32 bits samples.
+
+    Returns:
+        The level in dBFS, minus infinity for silence.
+    """
+    if amplitude <= 0:
+        return float('-inf')
+    return 20 * log10(amplitude / FULL_SCALE)
+
+
+class Band(NamedTuple):
+    """
+    Frequency band.
+
+    Attributes:
+        low: Lowest frequency (in Hz) of the band.
+        high: Highest frequency (in Hz) of the band.
+    """
+    low: float
+    high: float
+
+
+def parse_bands(spec: str) -> List[Band]:
+    """
+    Parses a textual description of frequency bands.
+
+    Bands are separated by commas and their frequencies (in Hz) by a hyphen,
+    e.g. ``300-3400, 4000-8000`` (voices and breaking glass).
+
+    Args:
+        spec: Description of the bands, empty for no bands.
+
+    Returns:
+        The bands described.
+
+    Raises:
+        ValueError: If the description is not valid.
+    """
+    bands = []
+    for band in spec.split(','):
+        band = band.strip()
+        if not band:
+            continue
+        low, high = (float(value) for value in band.split('-'))
+        if not 0 <= low < high:
+            raise ValueError(f'Invalid band: {band}')
+        bands.append(Band(low, high))
+    return bands
+
+
+def format_bands(bands: Sequence[Band]) -> str:
+    """
+    Describes frequency bands in the format read by `parse_bands`.
+
+    Args:
+        bands: The bands to be described.
+
+    Returns:
+        The description of the bands.
+    """
+    return ', '.join(f'{low:g}-{high:g}' for low, high in bands)
+
+
+class SpectralDetector:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """
+    Sound detector of frequency bands.
+
+    Samples are analysed in blocks overlapped by half of their length. All
+    the blocks completed by the samples received are stacked into a matrix,
+    windowed and transformed at once with a single real FFT, and their
+    power spectra are summed into the energy of every band with a matrix
+    product.
+
+    The noise floor of every band is learned from its energy, following
+    quiet periods quickly and louder backgrounds slowly. Sound is detected
+    when the energy of any band exceeds its noise floor by the margin.
+
+    Args:
+        sample_rate: Sample rate of the samples.
+        bands: Frequency bands where sound is detected.
+        block: Number of samples of the analysed blocks.
+        margin: Minimum level (in dB) of sound over the noise floor.
+        adaptation: Time constant (in seconds) of the noise floor adaptation
+            to louder backgrounds.
+    """
+    BLOCK = 1024
+    """Default number of samples of the analysed blocks."""
+
+    MARGIN = 12.0
+    """Default minimum level (in dB) of sound over the noise floor."""
+
+    ADAPTATION = 10.0
+    """Default time constant (in seconds) of the noise floor adaptation."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            sample_rate: int,
+            bands: Sequence[Band],
+            block=BLOCK,
+            margin=MARGIN,
+            adaptation=ADAPTATION
+    ) -> None:
+        if not bands:
+            raise ValueError('No frequency bands')
+        self.margin = margin
+        self._block = block
+        self._hop = block // 2
+        self._window = np.hanning(block).astype(np.float32)
+        frequencies = np.fft.rfftfreq(block, 1 / sample_rate)
+        # Bins x bands matrix summing the bins of every band
+        self._bands = np.stack([
+            (frequencies >= low) & (frequencies < high)
+            for low, high in bands
+        ], axis=1).astype(np.float32)
+        # Per block rates of the noise floor to louder and quieter levels
+        self._rise = min(1.0, self._hop / (sample_rate * adaptation))
+        self._fall = min(1.0, 10 * self._rise)
+        self._pending = np.zeros(0, np.float32)
+        self.floor: Optional[np.ndarray] = None
+        self.levels = np.full(len(bands), -np.inf)
+
+    def detect(self, samples: np.ndarray) -> bool:
+        """
+        Analyses the blocks completed by new samples.
+
+        Args:
+            samples: The new samples, as rows of channels.
+
+        Returns:
+            True if sound was detected in any of the blocks completed.
+        """
+        mono = samples.mean(axis=1, dtype=np.float32) / FULL_SCALE
+        data = np.concatenate((self._pending, mono))
+        count = (len(data) - self._block) // self._hop + 1
+        if count <= 0:
+            self._pending = data
+            return False
+
+        blocks = as_strided(
+            data,
+            shape=(count, self._block),
+            strides=(self._hop * data.itemsize, data.itemsize),
+            writeable=False
+        )
+        spectra = np.fft.rfft(blocks * self._window, axis=1)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        levels = 10 * np.log10(power @ self._bands + 1e-20)
+        self._pending = data[count * self._hop:].copy()
+
+        detected = False
+        for level in levels:
+            if self.floor is None:
+                self.floor = level.copy()
+                continue
+            detected = detected or bool(
+                (level > self.floor + self.margin).any()
+            )
+            rate = np.where(level > self.floor, self._rise, self._fall)
+            self.floor += rate * (level - self.floor)
+        self.levels = levels[-1]
+        return detected
+
+
+class AudioListener:
+    """
+    Consumer of the sound and clips of an `AudioMonitor`.
+
+    Every listener is told about all the sound detected, and gets the clips
+    of the sound and of the events it triggers. Create listeners with
+    `AudioMonitor.listen`.
+
+    Args:
+        monitor: The monitor listened to.
+    """
+    def __init__(self, monitor: 'AudioMonitor') -> None:
+        self.monitor = monitor
+        self._heard = False
+        self._wants_clip = False
+        self._published: Optional[int] = None
+
+    def trigger(self) -> bool:
+        """
+        Requests the clip of an event detected by other means (e.g. motion).
+
+        If a clip is already being recorded the listener gets that clip.
+
+        Returns:
+            True if a clip was started, False if a clip is already being
+            recorded.
+        """
+        return self.monitor._start_clip(self)  # pylint: disable=protected-access
+
+    def poll(self) -> Tuple[bool, Optional[Tuple[np.ndarray, ...]]]:
+        """
+        Gets the sound detected since the previous call, without waiting.
+
+        Returns:
+            A tuple with two values.
+                * True if sound was detected.
+                * The segments of the latest clip completed (see
+                  `AudioMonitor._clip`), or None if there is none.
+        """
+        with self.monitor._lock:  # pylint: disable=protected-access
+            heard, self._heard = self._heard, False
+            end, self._published = self._published, None
+        if end is None:
+            return heard, None
+        return heard, self.monitor._clip(end)  # pylint: disable=protected-access
+
+    def close(self) -> None:
+        """Stops listening and releases the input stream of the monitor."""
+        self.monitor._remove(self)  # pylint: disable=protected-access
+
+
+class AudioMonitor:  # pylint: disable=too-many-instance-attributes
+    """
+    Microphone monitor detecting sound.
+
+    Samples are received in the audio thread of the input stream and
+    written into a circular buffer. The energy (sum of squares) and the
+    peak of every block are kept for the blocks of the latest `window`
+    seconds, along with their running total, so the loudness of the window
+    is updated in constant time per block. When the RMS level of the window
+    rises above the threshold, sound is reported at once.
+
+    Events, either sound or other triggers (see `AudioListener.trigger`),
+    are recorded into clips from `pre_seconds` before the event to `seconds`
+    after it. Once the clip is completed it is polled as views of the
+    circular buffer, without copies. The buffer holds twice the length of a
+    clip, so a clip is not overwritten until the length of another clip has
+    been recorded after it, which leaves time to poll and encode it. Sound
+    and clips are polled by the listeners of the monitor from any thread.
+
+    The input stream is reference counted, it is opened by the first call to
+    `start` and closed when every `start` has been matched by a `stop`.
+
+    If frequency bands are given, sound is detected by a `SpectralDetector`
+    in those bands instead of by the loudness of the window.
+
+    Args:
+        seconds: Duration of the clips after the events.
+        threshold: Sensitivity of the microphone, the minimum RMS level (in
+            dBFS) of a window with sound.
+        sample_rate: Sample rate of the input stream.
+        channels: Number of channels of the input stream.
+        window: Duration (in seconds) of the sliding window whose loudness
+            is measured.
+        bands: Frequency bands where sound is detected.
+        pre_seconds: Duration of the clips before the events.
+    """
+    WINDOW = 0.5
+    """Default duration (in seconds) of the loudness window."""
+
+    _shared: ClassVar[Dict[Tuple, 'AudioMonitor']] = {}
+    _shared_lock: ClassVar[Lock] = Lock()
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            seconds: float = 5,
+            threshold=-40.0,
+            sample_rate=44100,
+            channels=1,
+            window: float = WINDOW,
+            bands: Sequence[Band] = (),
+            pre_seconds: float = 0
+    ) -> None:
+        self.seconds = seconds
+        self.pre_seconds = pre_seconds
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self._after = max(1, int(seconds * sample_rate))
+        self._clip_size = self._after + int(pre_seconds * sample_rate)
+        self._size = 2 * self._clip_size
+        self._buffer = np.zeros((self._size, channels), np.int32)
+        # Number of samples received, positions are counted from the start
+        self._written = 0
+        self._window_size = max(1, int(window * sample_rate))
+        self._blocks: Deque[Tuple[int, float, int]] = deque()
+        self._samples = 0
+        self._energy = 0.0
+        self._spectral = SpectralDetector(sample_rate, bands) if bands else None
+        self._loud = False
+        self._clip_end: Optional[int] = None
+        self._lock = Lock()
+        self._listeners: List[AudioListener] = []
+        self._users = 0
+        self._key: Optional[Tuple] = None
+        self._stream: Optional[sd.InputStream] = None
+
+    @classmethod
+    def shared_listener(  # pylint: disable=too-many-arguments
+            cls,
+            seconds: float,
+            threshold: float,
+            sample_rate: int,
+            bands: Sequence[Band] = (),
+            pre_seconds: float = 0
+    ) -> AudioListener:
+        """
+        Listens to the monitor shared by the process for these parameters.
+
+        The monitor is created and started for its first listener, and
+        stopped and discarded when its last listener is closed, so the
+        microphone is opened once however many cameras are watched.
+
+        Args:
+            seconds: Duration of the clips after the events.
+            threshold: Sensitivity of the microphone (see `AudioMonitor`).
+            sample_rate: Sample rate of the input stream.
+            bands: Frequency bands where sound is detected.
+            pre_seconds: Duration of the clips before the events.
+
+        Returns:
+            A started listener, it must be closed when no longer used.
+        """
+        key = (seconds, threshold, sample_rate, tuple(bands), pre_seconds)
+        with cls._shared_lock:
+            monitor = cls._shared.get(key)
+            if monitor is None:
+                monitor = cls(
+                    seconds,
+                    threshold,
+                    sample_rate,
+                    bands=bands,
+                    pre_seconds=pre_seconds
+                )
+                monitor._key = key
+                cls._shared[key] = monitor
+            listener = monitor.listen()
+            monitor.start()
+        return listener
+
+    @property
+    def is_active(self) -> bool:
+        """Return if the input stream is open."""
+        return self._stream is not None
+
+    @property
+    def rms_dbfs(self) -> float:
+        """RMS level (in dBFS) of the latest window."""
+        values = self._samples * self._buffer.shape[1]
+        return to_dbfs(sqrt(self._energy / values) if values else 0.0)
+
+    @property
+    def peak_dbfs(self) -> float:
+        """Peak level (in dBFS) of the latest window."""
+        return to_dbfs(max((peak for _, _, peak in self._blocks), default=0))
+
+    def start(self) -> None:
+        """Opens the input stream, if not open yet, and starts monitoring."""
+        with self._lock:
+            self._users += 1
+            if self._stream is not None:
+                return
+            self._stream = sd.InputStream(
+                callback=self._callback,
+                dtype=self._buffer.dtype,
+                channels=self._buffer.shape[1],
+                samplerate=self.sample_rate
+            )
+        self._stream.start()
+
+    def stop(self) -> None:
+        """Stops monitoring and closes the input stream if no longer used."""
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or self._stream is None:
+                return
+            stream, self._stream = self._stream, None
+        stream.stop()
+        stream.close()
+
+    def listen(self) -> AudioListener:
+        """
+        Adds a listener of the sound and clips of the monitor.
+
+        Returns:
+            The listener.
+        """
+        listener = AudioListener(self)
+        with self._lock:
+            self._listeners.append(listener)
+        return listener
+
+    def _callback(
+            self,
+            indata: np.ndarray,
+            frame_count: int,
+            time_info: Any,  # pylint: disable=unused-argument
+            status: Any  # pylint: disable=unused-argument
+    ) -> None:
+        """
+        Receives a block of samples from the input stream.
+
+        Args:
+            indata: The samples.
+            frame_count: Number of samples.
+            time_info: Timing information of the block.
+            status: Status flags of the stream.
+        """
+        started = self._written
+        self._store(indata)
+        self._measure(indata, frame_count)
+
+        if self._spectral:
+            loud = self._spectral.detect(indata)
+        else:
+            loud = self.rms_dbfs >= self.threshold
+        if loud and not self._loud:
+            with self._lock:
+                for listener in self._listeners:
+                    listener._heard = True  # pylint: disable=protected-access
+            self._start_clip(None, started)
+        self._loud = loud
+
+        with self._lock:
+            end = self._clip_end
+            if end is not None and self._written >= end:
+                self._clip_end = None
+                for listener in self._listeners:
+                    # pylint: disable=protected-access
+                    if listener._wants_clip:
+                        listener._wants_clip = False
+                        listener._published = end
+
+    def _start_clip(
+            self,
+            listener: Optional[AudioListener],
+            position: Optional[int] = None
+    ) -> bool:
+        """
+        Starts the clip of an event unless a clip is being recorded.
+
+        Args:
+            listener: Listener requesting the clip, every listener gets the
+                clips of sound.
+            position: Position of the first sample of the event, the latest
+                position if not given.
+
+        Returns:
+            True if the clip was started.
+        """
+        with self._lock:
+            for other in self._listeners:
+                if listener in (None, other):
+                    other._wants_clip = True  # pylint: disable=protected-access
+            if self._clip_end is not None:
+                return False
+            if position is None:
+                position = self._written
+            self._clip_end = position + self._after
+        return True
+
+    def _remove(self, listener: AudioListener) -> None:
+        """
+        Removes a listener and stops the monitor for it.
+
+        Args:
+            listener: The listener to be removed.
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                return
+            self._listeners.remove(listener)
+        self.stop()
+        with AudioMonitor._shared_lock:
+            if self._key is not None and not self._users:
+                AudioMonitor._shared.pop(self._key, None)
+                self._key = None
+
+    def _clip(self, end: int) -> Tuple[np.ndarray, ...]:
+        """
+        Gets a clip from the circular buffer.
+
+        Args:
+            end: Position following the last sample of the clip.
+
+        Returns:
+            The consecutive segments of the samples of the clip, oldest
+            first, as views of the circular buffer: one segment, or two if
+            the clip wraps around the end of the buffer. Samples already
+            overwritten are discarded.
+        """
+        start = max(0, end - self._clip_size, self._written - self._size)
+        if start >= end:
+            return (self._buffer[:0],)
+        first, last = start % self._size, end % self._size
+        if first < last:
+            return (self._buffer[first:last],)
+        return self._buffer[first:], self._buffer[:last]
+
+    def _store(self, samples: np.ndarray) -> None:
+        """
+        Writes samples into the circular buffer.
+
+        Args:
+            samples: The samples.
+        """
+        written = self._written + len(samples)
+        samples = samples[-self._size:]
+        position = (written - len(samples)) % self._size
+        end = position + len(samples)
+        if end <= self._size:
+            self._buffer[position:end] = samples
+        else:
+            split = self._size - position
+            self._buffer[position:] = samples[:split]
+            self._buffer[:end - self._size] = samples[split:]
+        self._written = written
+
+    def _measure(self, samples: np.ndarray, count: int) -> None:
+        """
+        Adds a block to the loudness window, dropping the oldest blocks.
+
+        Args:
+            samples: The samples of the block.
+            count: Number of samples.
+        """
+        energy = float(np.einsum('ij,ij->', samples, samples, dtype=np.float64))
+        peak = max(int(samples.max()), -int(samples.min())) if count else 0
+        self._blocks.append((count, energy, peak))
+        self._samples += count
+        self._energy += energy
+        while self._samples - self._blocks[0][0] >= self._window_size:
+            count, energy, _ = self._blocks.popleft()
+            self._samples -= count
+            self._energy = max(0.0, self._energy - energy)
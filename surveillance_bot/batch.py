@@ -0,0 +1,399 @@
+"""
+Module for the offline analysis of recorded videos.
+
+This module runs the motion detection of the surveillance mode over video
+files, reading them as fast as they can be decoded instead of in real time,
+so archived footage can be scanned again with other detectors, thresholds
+or regions. Frames are downscaled into analysis proxies and analysed by a
+motion detector just like in the surveillance mode. Consecutive frames with
+motion are grouped into events, reported as JSON along with the areas in
+motion, and optionally extracted as video clips. Files can be analysed in
+parallel by a pool of processes.
+
+Run it with ``surveillance_bot_batch <video files or directories>`` (see
+``--help`` for the options).
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple
+)
+
+import cv2
+import numpy as np
+
+from surveillance_bot.capture import (
+    CameraConnectionError,
+    CameraDevice,
+    ProxyScaler,
+    TimedVideoWriter
+)
+from surveillance_bot.motion import (
+    DEFAULT_DETECTOR,
+    DETECTORS,
+    MotionDetector,
+    Region,
+    create_detector,
+    parse_regions
+)
+
+VIDEO_EXTENSIONS = ('.avi', '.mkv', '.mov', '.mp4', '.mpg', '.webm')
+"""Extensions of the video files found in directories."""
+
+DEFAULT_FPS = 30.0
+"""Frame rate of the videos that do not report it."""
+
+
+class MotionEvent(NamedTuple):
+    """
+    Period of a video with motion.
+
+    Attributes:
+        start: Time (in seconds of the video) of the first frame with motion.
+        end: Time of the last frame with motion.
+        boxes: Areas in motion (in pixels of the frames) of every frame with
+            motion, as tuples of its time and its `motion.MOTION_BOX`
+            records.
+        clip: Path of the extracted clip, if any.
+    """
+    start: float
+    end: float
+    boxes: List[Tuple[float, np.ndarray]]
+    clip: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converts the event into JSON serializable types.
+
+        Returns:
+            A dict with the event fields, boxes are lists of x, y, width,
+            height and area.
+        """
+        return {
+            'start': self.start,
+            'end': self.end,
+            'boxes': [
+                {'time': timestamp, 'boxes': boxes.tolist()}
+                for timestamp, boxes in self.boxes
+            ],
+            'clip': self.clip
+        }
+
+
+def find_videos(paths: Iterable[str]) -> List[str]:
+    """
+    Gets the video files to be analysed.
+
+    Args:
+        paths: Video files or directories, directories are searched
+            recursively for files with a video extension.
+
+    Returns:
+        The sorted paths of the video files.
+    """
+    videos = []
+    for path in paths:
+        if not os.path.isdir(path):
+            videos.append(path)
+            continue
+        for directory, _, files in os.walk(path):
+            videos.extend(
+                os.path.join(directory, name) for name in files
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+    return sorted(videos)
+
+
+def analyse_video(  # pylint: disable=too-many-arguments, too-many-locals
+        path: str,
+        detector=DEFAULT_DETECTOR,
+        threshold=5,
+        regions: Sequence[Region] = (),
+        gap=5.0,
+        step=1,
+        clips_dir: Optional[str] = None,
+        codec='mp4v'
+) -> Dict[str, Any]:
+    """
+    Detects the motion events of a video file.
+
+    Every `step` frames one is decoded and analysed, the rest are only
+    grabbed. Frame times are computed from the frame rate of the video.
+
+    Args:
+        path: Path of the video file.
+        detector: Name of the motion detection strategy.
+        threshold: Sensitivity of the detection.
+        regions: Regions where motion is detected or ignored.
+        gap: Maximum time (in seconds) without motion inside an event.
+        step: Analyses one of every `step` frames.
+        clips_dir: Directory where the clips of the events are extracted,
+            they are not extracted if not given.
+        codec: FourCC string of the video codec of the clips.
+
+    Returns:
+        A dict with the path, frame rate, number of frames, duration,
+        processing time and events (see `MotionEvent.to_dict`) of the
+        video.
+
+    Raises:
+        CameraConnectionError: If the video can not be opened.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise CameraConnectionError(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    stem = os.path.splitext(os.path.basename(path))[0]
+    started = monotonic()
+
+    events: List[MotionEvent] = []
+    event: Optional[MotionEvent] = None
+    writer: Optional[TimedVideoWriter] = None
+    frames = 0
+
+    for frames, timestamp, image, boxes in _detect(
+            capture,
+            fps,
+            step,
+            partial(create_detector, detector, threshold, regions=regions)
+    ):
+        if boxes is None:
+            continue
+        if event is not None and timestamp - event.end > gap:
+            if writer:
+                writer.release()
+                writer = None
+            events.append(event)
+            event = None
+
+        if boxes.size:
+            if event is None:
+                clip = None
+                if clips_dir:
+                    clip = os.path.join(
+                        clips_dir,
+                        f'{stem}_{len(events) + 1:03d}.mp4'
+                    )
+                    height, width = image.shape[:2]
+                    writer = TimedVideoWriter(clip, codec, fps, (width, height))
+                event = MotionEvent(timestamp, timestamp, [], clip)
+            event.boxes.append((timestamp, boxes))
+            event = event._replace(end=timestamp)
+        if writer:
+            writer.write(image, timestamp)
+
+    if writer:
+        writer.release()
+    if event is not None:
+        events.append(event)
+    capture.release()
+
+    return {
+        'path': path,
+        'fps': fps,
+        'frames': frames,
+        'duration': frames / fps,
+        'seconds': monotonic() - started,
+        'events': [event.to_dict() for event in events]
+    }
+
+
+def _detect(
+        capture: cv2.VideoCapture,
+        fps: float,
+        step: int,
+        detector_factory: Callable[[float], MotionDetector]
+) -> Iterator[Tuple[int, float, Optional[np.ndarray], Optional[np.ndarray]]]:
+    """
+    Detects motion in the frames of a video.
+
+    Args:
+        capture: The opened video.
+        fps: Frame rate of the video.
+        step: Analyses one of every `step` frames.
+        detector_factory: Creates a motion detector for a proxy scale.
+
+    Yields:
+        A tuple for every frame read with the number of frames read so far,
+        the frame time, the frame itself (overwritten by the next frame) and
+        the areas in motion (as rows of x, y, width, height and area in
+        pixels of the frame). The frame and the areas are None for the
+        frames only grabbed.
+    """
+    frame_shape: Tuple[int, ...] = ()
+    image: Optional[np.ndarray] = None
+    proxy = np.empty(0, np.uint8)
+    scaler = motion_detector = None
+    scale = 1.0
+    index = -1
+    while capture.grab():
+        index += 1
+        if index % step:
+            yield index + 1, index / fps, None, None
+            continue
+        grabbed, image = capture.retrieve(image)
+        if not grabbed:
+            break
+        if image.shape != frame_shape:
+            frame_shape = image.shape
+            scaler = ProxyScaler(image.shape, CameraDevice.PROXY_WIDTH)
+            proxy = np.empty(scaler.shape, np.uint8)
+            scale = proxy.shape[1] / image.shape[1]
+            motion_detector = detector_factory(scale)
+        scaler(image, proxy)
+        boxes = motion_detector.detect(proxy)
+        yield index + 1, index / fps, image, _scale_boxes(boxes, scale)
+
+
+def _analyse_video(path: str, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Detects the motion events of a video file, reporting failures.
+
+    Args:
+        path: Path of the video file.
+        **kwargs: Analysis parameters (see `analyse_video`).
+
+    Returns:
+        The results of the video (see `analyse_video`), or a dict with its
+        path and an error message if it can not be opened.
+    """
+    try:
+        return analyse_video(path, **kwargs)
+    except CameraConnectionError:
+        return {'path': path, 'error': 'Can not open the video'}
+
+
+def write_report(report: Dict[str, Any], path: Optional[str] = None) -> None:
+    """
+    Writes a report as indented JSON.
+
+    Args:
+        report: The JSON serializable report.
+        path: Path of the JSON file, the report is written to the standard
+            output if not given.
+    """
+    if path:
+        with open(path, 'w', encoding='utf-8') as file_handler:
+            json.dump(report, file_handler, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+def _scale_boxes(boxes: np.ndarray, scale: float) -> np.ndarray:
+    """
+    Scales areas in motion from the analysis proxy to the frame.
+
+    Args:
+        boxes: The `motion.MOTION_BOX` records of the areas.
+        scale: Scale of the proxy relative to the frame.
+
+    Returns:
+        An array with a row of x, y, width, height and area of every area.
+    """
+    values = np.stack([boxes[field] for field in boxes.dtype.names], axis=1)
+    values = values / [scale, scale, scale, scale, scale ** 2]
+    return np.round(values).astype(np.int64)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Offline analysis command line entry point.
+
+    Args:
+        argv: Command line arguments, `sys.argv` if not given.
+    """
+    parser = argparse.ArgumentParser(
+        description='Detects motion events in recorded videos.'
+    )
+    parser.add_argument(
+        'paths', nargs='+', help='video files or directories of videos'
+    )
+    parser.add_argument(
+        '--detector', default=DEFAULT_DETECTOR, choices=list(DETECTORS),
+        help=f'motion detection strategy (default {DEFAULT_DETECTOR})'
+    )
+    parser.add_argument(
+        '--threshold', type=int, default=5,
+        help='detection threshold (default 5)'
+    )
+    parser.add_argument(
+        '--regions', default='',
+        help='regions where motion is detected, e.g. "0,0 1,0 1,0.5" '
+             '(exclusions are prefixed with "!")'
+    )
+    parser.add_argument(
+        '--gap', type=float, default=5.0,
+        help='maximum seconds without motion inside an event (default 5)'
+    )
+    parser.add_argument(
+        '--step', type=int, default=1,
+        help='analyses one of every STEP frames (default 1)'
+    )
+    parser.add_argument(
+        '--clips', metavar='DIRECTORY',
+        help='directory where the clips of the events are extracted'
+    )
+    parser.add_argument(
+        '--codec', default='mp4v',
+        help='FourCC string of the video codec of the clips (default mp4v)'
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=1,
+        help='number of videos analysed in parallel processes (default 1)'
+    )
+    parser.add_argument(
+        '--output', help='path of the JSON results file'
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        regions = parse_regions(args.regions)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.step < 1:
+        parser.error('step must be a positive number')
+    if args.clips:
+        os.makedirs(args.clips, exist_ok=True)
+
+    analyse = partial(
+        _analyse_video,
+        detector=args.detector,
+        threshold=args.threshold,
+        regions=regions,
+        gap=args.gap,
+        step=args.step,
+        clips_dir=args.clips,
+        codec=args.codec
+    )
+    videos = find_videos(args.paths)
+    if args.jobs > 1:
+        with ProcessPoolExecutor(args.jobs) as executor:
+            results = list(executor.map(analyse, videos))
+    else:
+        results = [analyse(video) for video in videos]
+
+    report = {
+        'detector': args.detector,
+        'threshold': args.threshold,
+        'regions': args.regions,
+        'videos': results
+    }
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,319 @@
+"""
+Module for benchmarking the motion analysis.
+
+This module drives the motion analysis (`Camera._motion_detection`) and the
+whole surveillance mode (`Camera.surveillance_start`) with frame sources
+read as fast as possible, for a number of sources (synthetic scenes of
+several resolutions or recorded incidents), detectors and thresholds. Every
+case reports the analysed frames per second and the latency percentiles of
+every stage (see `motion.StageTimer`), results are written as JSON so
+versions can be compared on the target hardware.
+
+Run it with ``python -m surveillance_bot.benchmark --output results.json``
+(see ``--help`` for the options).
+"""
+import argparse
+import platform
+import sys
+from threading import Thread
+from time import monotonic, sleep
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from surveillance_bot.batch import write_report
+from surveillance_bot.camera import Camera
+from surveillance_bot.motion import DETECTORS, StageTimer
+from surveillance_bot.sources import open_source
+
+MODES = ('detection', 'surveillance')
+"""Benchmarked operations: the motion analysis or the surveillance mode."""
+
+SOURCES = ('synthetic:640x480', 'synthetic:1280x720', 'synthetic:1920x1080')
+"""Default sources, synthetic scenes of several resolutions."""
+
+THRESHOLDS = (5, 20)
+"""Default detection thresholds."""
+
+PERCENTILES = (50, 90, 99)
+"""Percentiles of the stage latencies reported."""
+
+
+class BenchmarkCase(NamedTuple):
+    """
+    Benchmark configuration.
+
+    Attributes:
+        mode: Benchmarked operation (see `MODES`).
+        source: Spec of the frame source (see `sources.open_source`).
+        detector: Name of the motion detection strategy.
+        threshold: Sensitivity of the detection.
+    """
+    mode: str
+    source: str
+    detector: str
+    threshold: int
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Benchmark measurements.
+
+    Attributes:
+        case: The benchmark configuration.
+        frame_size: Width and height of the frames.
+        frames: Number of frames analysed.
+        seconds: Time (in seconds) spent analysing them.
+        stages: Latency statistics (in milliseconds) by stage: the number
+            of samples, the mean and the percentiles (``p50``, ``p90``
+            and ``p99``).
+    """
+    case: BenchmarkCase
+    frame_size: Tuple[int, int]
+    frames: int
+    seconds: float
+    stages: Dict[str, Dict[str, float]]
+
+    @property
+    def fps(self) -> float:
+        """Frames analysed per second."""
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converts the result into JSON serializable types.
+
+        Returns:
+            A dict with the case fields and the measurements.
+        """
+        return {
+            **self.case._asdict(),
+            'frame_size': list(self.frame_size),
+            'frames': self.frames,
+            'seconds': self.seconds,
+            'fps': self.fps,
+            'stages': self.stages
+        }
+
+
+def summarize(timer: StageTimer) -> Dict[str, Dict[str, float]]:
+    """
+    Computes the latency statistics of the stages measured by a timer.
+
+    Args:
+        timer: The timer.
+
+    Returns:
+        The statistics (in milliseconds) by stage.
+    """
+    summary = {}
+    for stage, samples in sorted(timer.samples.items()):
+        latencies = np.array(samples) * 1000
+        summary[stage] = {
+            'samples': len(samples),
+            'mean': float(latencies.mean()),
+            **{
+                f'p{percentile}': float(value)
+                for percentile, value in zip(
+                    PERCENTILES,
+                    np.percentile(latencies, PERCENTILES)
+                )
+            }
+        }
+    return summary
+
+
+def run_case(
+        case: BenchmarkCase,
+        frames=300,
+        max_seconds=60.0,
+        audio=False
+) -> BenchmarkResult:
+    """
+    Runs a benchmark case.
+
+    Every frame is analysed (no idle sampling). The surveillance mode
+    encodes photos every second and records videos of 10 seconds of frame
+    capture time. The microphone is not listened by default, so the cases
+    run without an input device and measure the video analysis only.
+
+    Args:
+        case: The benchmark configuration.
+        frames: Number of frames to be analysed.
+        max_seconds: Maximum duration of the case, in case the source is
+            slower than expected.
+        audio: Listens to the microphone during the case.
+
+    Returns:
+        The measurements.
+    """
+    camera = Camera(open_source(case.source, realtime=False))
+    timer = StageTimer()
+    camera.timer = timer
+    camera.start()
+
+    results: Iterator[Any]
+    if case.mode == 'detection':
+        results = camera._motion_detection(  # pylint: disable=protected-access
+            video_threshold=case.threshold,
+            detector=case.detector,
+            idle_fps=0,
+            audio=audio
+        )
+    else:
+        results = camera.surveillance_start(
+            timestamp=False,
+            video_seconds=10,
+            picture_seconds=1,
+            video_threshold=case.threshold,
+            detector=case.detector,
+            idle_fps=0,
+            audio=audio
+        )
+
+    # The surveillance mode only yields on events, so it is stopped by a
+    # thread watching the analysis
+    start = monotonic()
+
+    def watch() -> None:
+        while camera.analysis_stats.analysed < frames \
+                and monotonic() - start < max_seconds:
+            sleep(0.01)
+        camera.surveillance_stop()
+
+    watcher = Thread(target=watch, daemon=True)
+    watcher.start()
+    for _ in results:
+        pass
+    seconds = monotonic() - start
+    watcher.join()
+    camera.stop()
+
+    return BenchmarkResult(
+        case,
+        camera.frame_size,
+        camera.analysis_stats.analysed,
+        seconds,
+        summarize(timer)
+    )
+
+
+def run_benchmarks(  # pylint: disable=too-many-arguments
+        modes: Sequence[str] = MODES,
+        sources: Sequence[str] = SOURCES,
+        detectors: Sequence[str] = tuple(DETECTORS),
+        thresholds: Sequence[int] = THRESHOLDS,
+        frames=300,
+        max_seconds=60.0,
+        audio=False
+) -> Iterator[BenchmarkResult]:
+    """
+    Runs every combination of the given configurations.
+
+    Args:
+        modes: Benchmarked operations.
+        sources: Specs of the frame sources.
+        detectors: Names of the motion detection strategies.
+        thresholds: Detection thresholds.
+        frames: Number of frames analysed by every case.
+        max_seconds: Maximum duration of every case.
+        audio: Listens to the microphone during the cases.
+
+    Yields:
+        The measurements of every case.
+    """
+    for mode in modes:
+        for source in sources:
+            for detector in detectors:
+                for threshold in thresholds:
+                    yield run_case(
+                        BenchmarkCase(mode, source, detector, threshold),
+                        frames,
+                        max_seconds,
+                        audio
+                    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Benchmark command line entry point.
+
+    Args:
+        argv: Command line arguments, `sys.argv` if not given.
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the motion analysis of the surveillance bot.'
+    )
+    parser.add_argument(
+        '--mode', dest='modes', action='append', choices=MODES,
+        help='benchmarked operation (all by default)'
+    )
+    parser.add_argument(
+        '--source', dest='sources', action='append',
+        help='frame source: synthetic:<width>x<height>, a video file or a '
+             'directory of images (synthetic scenes by default)'
+    )
+    parser.add_argument(
+        '--detector', dest='detectors', action='append',
+        choices=list(DETECTORS),
+        help='motion detection strategy (all by default)'
+    )
+    parser.add_argument(
+        '--threshold', dest='thresholds', action='append', type=int,
+        help=f'detection threshold (default {THRESHOLDS})'
+    )
+    parser.add_argument(
+        '--frames', type=int, default=300,
+        help='frames analysed by every case (default 300)'
+    )
+    parser.add_argument(
+        '--max-seconds', type=float, default=60.0,
+        help='maximum duration of every case (default 60)'
+    )
+    parser.add_argument(
+        '--audio', action='store_true',
+        help='listen to the microphone during the cases (off by default)'
+    )
+    parser.add_argument(
+        '--label', default='',
+        help='label of the results, e.g. the version benchmarked'
+    )
+    parser.add_argument(
+        '--output', help='path of the JSON results file'
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for result in run_benchmarks(
+            args.modes or MODES,
+            args.sources or SOURCES,
+            args.detectors or tuple(DETECTORS),
+            args.thresholds or THRESHOLDS,
+            args.frames,
+            args.max_seconds,
+            args.audio
+    ):
+        case = result.case
+        width, height = result.frame_size
+        print(
+            f'{case.mode:12} {case.source:24} {width}x{height} '
+            f'{case.detector:10} {case.threshold:3} '
+            f'{result.fps:8.1f} fps',
+            file=sys.stderr
+        )
+        results.append(result.to_dict())
+
+    report = {
+        'label': args.label,
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results
+    }
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
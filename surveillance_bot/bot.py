@@ -10,12 +10,20 @@ import logging
 import os
 import sys
 from functools import wraps
-from typing import Any, Callable, Optional, Union
-from io import BytesIO
+from threading import Thread
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union
+)
 
-import numpy as np
 import sounddevice as sd
-from pydub import AudioSegment
 
 from telegram import ChatAction, ParseMode, ReplyKeyboardMarkup, Update
 from telegram.ext import (
@@ -27,12 +35,22 @@ from telegram.ext import (
     Updater,
     Filters
 )  # type: ignore
+from surveillance_bot.audio import parse_bands
 from surveillance_bot.bot_config import BotConfig
 from surveillance_bot.camera import (
     Camera,
-    CameraConnectionError,
+    CameraNotFound,
+    CameraPool,
     CodecNotAvailable
 )
+from surveillance_bot.capture import (
+    CameraConnectionError,
+    CaptureProcessNotAvailable
+)
+from surveillance_bot.motion import DEFAULT_DETECTOR, parse_regions
+from surveillance_bot.pipeline import StageStats, SurveillancePipeline
+from surveillance_bot.sources import SourceType
+from surveillance_bot.voice import decode_voice
 
 HandlerType = Callable[[Update, CallbackContext], Any]
 
@@ -48,14 +66,21 @@ class Bot:
         token: Access Token for the telegram bot.
         username: Username of the only user authorized to interact with the
             bot (without @).
+        persistence_dir: Directory for bot configuration persistence.
         log_level: Logging level for logging module.
+        cam_ids: IDs of the video capturing devices to use, or a mapping
+            from camera ID to its video source.
+        capture_process: Grabs the frames of every camera in a separate
+            process.
     """
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
             self,
             token: str,
             username: str,
             persistence_dir: Optional[str] = None,
-            log_level: Union[int, str, None] = None
+            log_level: Union[int, str, None] = None,
+            cam_ids: Union[Sequence[int], Mapping[int, SourceType]] = (0,),
+            capture_process=False
     ) -> None:
         self.logger = logging.getLogger(__name__)
         if log_level:
@@ -71,7 +96,7 @@ class Bot:
             sys.exit(1)
 
         try:
-            self.camera = Camera()
+            self.cameras = CameraPool(cam_ids, capture_process)
         except CameraConnectionError:
             self.logger.critical("Error! Can not connect to the camera.")
             sys.exit(2)
@@ -80,14 +105,22 @@ class Bot:
                 "Error! There are no suitable video codec available."
             )
             sys.exit(2)
+        except CaptureProcessNotAvailable:
+            self.logger.critical(
+                "Error! Capture process mode requires Python 3.8 or newer."
+            )
+            sys.exit(2)
 
         self.authorized_user = username
+        self._pipelines: Dict[int, SurveillancePipeline] = {}
+        self._persistence_dir = persistence_dir
 
         persistence: Optional[PicklePersistence]
         if persistence_dir:
-            os.makedirs(persistence_dir)
+            os.makedirs(persistence_dir, exist_ok=True)
             path = os.path.join(persistence_dir, 'surveillance-bot.pickle')
             persistence = PicklePersistence(filename=path)
+            self._load_heatmaps()
         else:
             persistence = None
 
@@ -117,6 +150,88 @@ class Bot:
         # Register audio message handler
         dispatcher.add_handler(MessageHandler(Filters.voice & ~Filters.command, self.voice_handler))
 
+    @property
+    def camera(self) -> Camera:
+        """Default camera, used when a command does not select any."""
+        return self.cameras.default
+
+    def _select_cameras(
+            self,
+            update: Update,
+            context: CallbackContext
+    ) -> Optional[List[Tuple[int, Camera]]]:
+        """
+        Gets the cameras selected through the command arguments.
+
+        A camera ID or "all" can be passed as first argument of a command,
+        all cameras are selected when no argument is given.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            A list of tuples with the camera ID and the camera itself, or
+            None if the selector does not match any camera.
+        """
+        selector = context.args[0] if context.args else None
+        try:
+            return self.cameras.select(selector)
+        except CameraNotFound:
+            update.message.reply_text(
+                text=f'Error! Camera "{selector}" not found'
+            )
+            self.logger.warning('Camera "%s" not found', selector)
+            return None
+
+    def _heatmap_path(self, cam_id: int) -> Optional[str]:
+        """
+        Gets the path of the file where the heatmap of a camera persists.
+
+        Args:
+            cam_id: ID of the camera.
+
+        Returns:
+            The path of the file, or None without a persistence directory.
+        """
+        if not self._persistence_dir:
+            return None
+        return os.path.join(self._persistence_dir, f'heatmap-{cam_id}.npy')
+
+    def _load_heatmaps(self) -> None:
+        """Loads the persisted heatmaps of the cameras."""
+        for cam_id in self.cameras:
+            path = self._heatmap_path(cam_id)
+            if path and os.path.exists(path):
+                try:
+                    self.cameras[cam_id].heatmap.load(path)
+                except (OSError, ValueError):
+                    self.logger.warning('Can not load heatmap "%s"', path)
+
+    def _save_heatmap(self, cam_id: int) -> None:
+        """
+        Persists the heatmap of a camera.
+
+        Args:
+            cam_id: ID of the camera.
+        """
+        path = self._heatmap_path(cam_id)
+        if path:
+            self.cameras[cam_id].heatmap.save(path)
+
+    def _camera_name(self, cam_id: int) -> str:
+        """
+        Gets the name used to identify a camera in the messages.
+
+        Args:
+            cam_id: ID of the camera.
+
+        Returns:
+            The camera name, or an empty string when there is only one
+            camera.
+        """
+        return f'Camera {cam_id}' if len(self.cameras) > 1 else ''
+
     def command_handler(
             self,
             command: str,
@@ -163,11 +278,8 @@ class Bot:
         file_id = update.message.voice.file_id
         file = self.updater.bot.get_file(file_id)
         buffer = file.download_as_bytearray()
-        sound = AudioSegment.from_ogg(BytesIO(buffer))
-        audio = BytesIO()
-        sound.export(audio, format='wav')
-        data = np.frombuffer(audio.read(), dtype="int32")
-        sd.play(data)
+        samples, sample_rate = decode_voice(bytes(buffer))
+        sd.play(samples, sample_rate)
 
     def start(self) -> None:
         """
@@ -177,13 +289,13 @@ class Bot:
         until the bot is interrupted by a signal. After that the camera
         device is released and the function ends.
         """
-        self.camera.start()
+        self.cameras.start()
         self.updater.start_polling()
         self.logger.info("Surveillance Bot started")
 
         self.updater.idle()
 
-        self.camera.stop()
+        self.cameras.stop()
         self.logger.info("Surveillance Bot stopped")
 
     def _error(self, update: Union[Update, object], context: CallbackContext) -> None:
@@ -236,7 +348,7 @@ class Bot:
             ReplyKeyboardMarkup instance with the menu content.
 
         """
-        active = self.camera.is_surveillance_active \
+        active = self.cameras.is_surveillance_active \
             if is_active is None else is_active
         custom_keyboard = [
             [
@@ -285,6 +397,12 @@ class Bot:
                  "/surveillance|_stop |- Stops surveillance mode\n"
                  "/surveillance|_status |- Indicates if surveillance mode "
                  "is active or not\n"
+                 "/heatmap |- Shows where motion has been detected\n"
+                 "/heatmap|_reset |- Clears the motion heatmap\n"
+                 "\n"
+                 "Camera commands accept a camera ID or _all_ as argument "
+                 "\\(e|.g|. /get|_photo 1\\), all cameras are used by "
+                 "default|.\n"
                  "\n"
                  "*General commands*\n"
                  "/config |- Invokes configuration menu\n"
@@ -303,24 +421,31 @@ class Bot:
         """
         Handler for `/get_photo` command.
 
-        It takes a single shot and sends it to the user.
+        It takes a single shot from every selected camera and sends them to
+        the user.
 
         Args:
             update: The update to be handled.
             context: The context object for the update.
         """
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
         # Retrieves configuration
         timestamp = context.bot_data[BotConfig.TIMESTAMP]
 
-        # Uploads photo
-        context.bot.send_chat_action(
-            chat_id=update.message.chat_id,
-            action=ChatAction.UPLOAD_PHOTO
-        )
-        context.bot.send_photo(
-            chat_id=update.message.chat_id,
-            photo=self.camera.get_photo(timestamp=timestamp)
-        )
+        for cam_id, camera in cameras:
+            # Uploads photo
+            context.bot.send_chat_action(
+                chat_id=update.message.chat_id,
+                action=ChatAction.UPLOAD_PHOTO
+            )
+            context.bot.send_photo(
+                chat_id=update.message.chat_id,
+                photo=camera.get_photo(timestamp=timestamp),
+                caption=self._camera_name(cam_id) or None
+            )
 
     def _command_get_video(
             self,
@@ -330,43 +455,53 @@ class Bot:
         """
         Handler for `/get_video` command.
 
-        It takes a video and sends it to the user.
+        It takes a video from every selected camera and sends them to the
+        user.
 
         Args:
             update: The update to be handled.
             context: The context object for the update.
         """
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
         # Retrieves configuration
         timestamp = context.bot_data[BotConfig.TIMESTAMP]
         seconds = context.bot_data[BotConfig.OD_VIDEO_DURATION]
 
-        # Sends waiting message
-        message = update.message.reply_text(
-            text=f'Recording a {seconds} seconds video...'
-        )
+        for cam_id, camera in cameras:
+            name = self._camera_name(cam_id)
+            prefix = f'{name}: ' if name else ''
 
-        # Records video
-        context.bot.send_chat_action(
-            chat_id=update.message.chat_id,
-            action=ChatAction.RECORD_VIDEO
-        )
-        video = self.camera.get_video(timestamp=timestamp, seconds=seconds)
+            # Sends waiting message
+            message = update.message.reply_text(
+                text=f'{prefix}Recording a {seconds} seconds video...'
+            )
 
-        # Uploads video
-        context.bot.send_chat_action(
-            chat_id=update.message.chat_id,
-            action=ChatAction.UPLOAD_VIDEO
-        )
-        context.bot.send_video(
-            chat_id=update.message.chat_id,
-            video=video
-        )
+            # Records video
+            context.bot.send_chat_action(
+                chat_id=update.message.chat_id,
+                action=ChatAction.RECORD_VIDEO
+            )
+            video = camera.get_video(timestamp=timestamp, seconds=seconds)
 
-        # Deletes waiting message
-        context.bot.delete_message(
-            chat_id=update.message.chat_id,
-            message_id=message.message_id
-        )
+            # Uploads video
+            context.bot.send_chat_action(
+                chat_id=update.message.chat_id,
+                action=ChatAction.UPLOAD_VIDEO
+            )
+            context.bot.send_video(
+                chat_id=update.message.chat_id,
+                video=video,
+                caption=name or None
+            )
+
+            # Deletes waiting message
+            context.bot.delete_message(
+                chat_id=update.message.chat_id,
+                message_id=message.message_id
+            )
 
     def _command_get_audio(
             self,
@@ -393,19 +528,18 @@ class Bot:
         # Records video
         context.bot.send_chat_action(
             chat_id=update.message.chat_id,
-            action=ChatAction.RECORD_AUDIO
+            action=ChatAction.RECORD_VOICE
         )
         audio = asyncio.run(self.camera.get_audio(seconds=seconds))
 
         # Uploads audio
         context.bot.send_chat_action(
             chat_id=update.message.chat_id,
-            action=ChatAction.UPLOAD_AUDIO
+            action=ChatAction.UPLOAD_VOICE
         )
-        context.bot.send_audio(
+        context.bot.send_voice(
             chat_id=update.message.chat_id,
-            title='audio.mp3',
-            audio=audio
+            voice=audio
         )
 
         # Deletes waiting message
@@ -422,58 +556,115 @@ class Bot:
         """
         Handler for `/surveillance_start` command.
 
-        It starts the surveillance mode. In this mode the is waiting for
-        motion detection, when this happens it sends a message to the user
-        and start to record a video, sending pictures in regular intervals
-        during the video recording. After that it goes back to the waiting
-        state.
+        It starts the surveillance mode on every selected camera. In this
+        mode the camera is waiting for motion detection, when this happens it
+        sends a message to the user and start to record a video, sending
+        pictures in regular intervals during the video recording. After that
+        it goes back to the waiting state.
 
         Args:
             update: The update to be handled.
             context: The context object for the update.
         """
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
         # Check if surveillance is already started
-        if self.camera.is_surveillance_active:
+        cameras = [
+            (cam_id, camera) for cam_id, camera in cameras
+            if not camera.is_surveillance_active
+        ]
+        if not cameras:
             update.message.reply_text(
                 text='Error! Surveillance is already started'
             )
             self.logger.warning("Surveillance already started")
             return
 
+        # Starts surveillance
+        self.logger.info('Surveillance mode start')
+        update.message.reply_text(
+            text="Surveillance mode started",
+            reply_markup=self._get_reply_keyboard(True)
+        )
+        threads = [
+            Thread(target=self._surveillance, args=(update, context, *camera))
+            for camera in cameras[1:]
+        ]
+        for thread in threads:
+            thread.start()
+        self._surveillance(update, context, *cameras[0])
+        for thread in threads:
+            thread.join()
+
+        update.message.reply_text(
+            text="Surveillance mode stopped",
+            reply_markup=self._get_reply_keyboard()
+        )
+        self.logger.info('Surveillance mode stop')
+
+    def _surveillance(  # pylint: disable=too-many-locals
+            self,
+            update: Update,
+            context: CallbackContext,
+            cam_id: int,
+            camera: Camera
+    ) -> None:
+        """
+        Runs the surveillance mode of a camera until it is stopped.
+
+        The surveillance mode runs as a pipeline (see `SurveillancePipeline`)
+        so results are sent to the user while frames are still analysed and
+        recorded.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            cam_id: ID of the camera.
+            camera: The camera to watch.
+        """
+        name = self._camera_name(cam_id)
+        prefix = f'{name}: ' if name else ''
+
         # Retrieve configuration
         timestamp = context.bot_data[BotConfig.TIMESTAMP]
         video_seconds = context.bot_data[BotConfig.SRV_VIDEO_DURATION]
         audio_seconds = context.bot_data[BotConfig.SRV_AUDIO_DURATION]
+        audio_preroll = context.bot_data[BotConfig.SRV_AUDIO_PREROLL]
         picture_interval = context.bot_data[BotConfig.SRV_PICTURE_INTERVAL]
         motion_contours = context.bot_data[BotConfig.SRV_MOTION_CONTOURS]
         video_threshold = context.bot_data[BotConfig.SRV_VIDEO_THRESHOLD]
         audio_threshold = context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD]
+        detector = context.bot_data[BotConfig.SRV_MOTION_DETECTOR].get(
+            cam_id,
+            DEFAULT_DETECTOR
+        )
+        idle_fps = context.bot_data[BotConfig.SRV_IDLE_ANALYSIS_FPS].get(
+            cam_id,
+            camera.IDLE_ANALYSIS_FPS
+        )
+        regions = parse_regions(
+            context.bot_data[BotConfig.SRV_MOTION_REGIONS].get(cam_id, '')
+        )
+        audio_bands = parse_bands(context.bot_data[BotConfig.SRV_AUDIO_BANDS])
 
-        # Starts surveillance
         waiting_message = None
-        self.logger.info('Surveillance mode start')
-        update.message.reply_text(
-            text="Surveillance mode started",
-            reply_markup=self._get_reply_keyboard(True)
-        )
-        for data in self.camera.surveillance_start(
-                timestamp=timestamp,
-                video_seconds=video_seconds,
-                picture_seconds=picture_interval,
-                audio_seconds=audio_seconds,
-                contours=motion_contours,
-                video_threshold=video_threshold,
-                audio_threshold=audio_threshold
-        ):
+
+        def deliver(data: Dict[str, Any]) -> None:
+            """Sends a surveillance result to the user."""
+            nonlocal waiting_message
             if 'detected' in data:
                 update.message.reply_text(
-                    text='*SOUND OR MOTION DETECTED|!*'.replace('|', '\\'),
+                    text=f'{prefix}*SOUND OR MOTION DETECTED|!*'.replace(
+                        '|', '\\'
+                    ),
                     parse_mode=ParseMode.MARKDOWN_V2
                 )
                 waiting_message = update.message.reply_text(
-                    text=f'Recording a {video_seconds} seconds video, '
-                         f'a {audio_seconds} seconds audio and '
-                         f'taking {video_seconds // picture_interval} '
+                    text=f'{prefix}Recording a {video_seconds} seconds '
+                         f'video, a {audio_preroll + audio_seconds} seconds '
+                         f'audio and taking {video_seconds // picture_interval} '
                          f'photos...'
                 )
                 context.bot.send_chat_action(
@@ -488,7 +679,7 @@ class Bot:
                 context.bot.send_photo(
                     chat_id=update.message.chat_id,
                     photo=data['photo'],
-                    caption=f'Capture {data["id"]}/{data["total"]}'
+                    caption=f'{prefix}Capture {data["id"]}/{data["total"]}'
                 )
                 context.bot.send_chat_action(
                     chat_id=update.message.chat_id,
@@ -501,7 +692,8 @@ class Bot:
                 )
                 context.bot.send_video(
                     chat_id=update.message.chat_id,
-                    video=data['video']
+                    video=data['video'],
+                    caption=name or None
                 )
                 if waiting_message:
                     context.bot.delete_message(
@@ -512,12 +704,12 @@ class Bot:
             if 'audio' in data:
                 context.bot.send_chat_action(
                     chat_id=update.message.chat_id,
-                    action=ChatAction.UPLOAD_AUDIO
+                    action=ChatAction.UPLOAD_VOICE
                 )
-                context.bot.send_audio(
+                context.bot.send_voice(
                     chat_id=update.message.chat_id,
-                    title="audio.mp3",
-                    audio=data['audio']
+                    voice=data['audio'],
+                    caption=name or None
                 )
                 if waiting_message:
                     context.bot.delete_message(
@@ -526,32 +718,59 @@ class Bot:
                     )
                     waiting_message = None
 
+        pipeline = SurveillancePipeline(
+            camera,
+            deliver,
+            timestamp=timestamp,
+            video_seconds=video_seconds,
+            picture_seconds=picture_interval,
+            audio_seconds=audio_seconds,
+            contours=motion_contours,
+            video_threshold=video_threshold,
+            audio_threshold=audio_threshold,
+            detector=detector,
+            idle_fps=idle_fps,
+            regions=regions,
+            audio_bands=audio_bands,
+            audio_preroll=audio_preroll
+        )
+        self._pipelines[cam_id] = pipeline
+        try:
+            pipeline.run()
+        finally:
+            del self._pipelines[cam_id]
+            self._save_heatmap(cam_id)
+
         if waiting_message:
             context.bot.delete_message(
                 chat_id=update.message.chat_id,
                 message_id=waiting_message.message_id
             )
-        update.message.reply_text(
-            text="Surveillance mode stopped",
-            reply_markup=self._get_reply_keyboard()
-        )
-        self.logger.info('Surveillance mode stop')
 
     def _command_surveillance_stop(
             self,
             update: Update,
-            _: CallbackContext
+            context: CallbackContext
     ) -> None:
         """
         Handler for `/surveillance_stop` command.
 
-        This method stops the surveillance mode.
+        This method stops the surveillance mode on every selected camera.
 
         Args:
             update: The update to be handled.
+            context: The context object for the update.
         """
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
         # Checks if surveillance is not running.
-        if not self.camera.is_surveillance_active:
+        cameras = [
+            (cam_id, camera) for cam_id, camera in cameras
+            if camera.is_surveillance_active
+        ]
+        if not cameras:
             update.message.reply_text(
                 text="Error! Surveillance is not started"
             )
@@ -559,23 +778,131 @@ class Bot:
             return
 
         # Stop surveillance.
-        self.camera.surveillance_stop()
+        for _, camera in cameras:
+            camera.surveillance_stop()
+
+    def _command_heatmap(
+            self,
+            update: Update,
+            context: CallbackContext
+    ) -> None:
+        """
+        Handler for `/heatmap` command.
+
+        It sends the motion accumulated by the surveillance mode of every
+        selected camera, drawn on its latest frame.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+        """
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
+        for cam_id, camera in cameras:
+            name = self._camera_name(cam_id)
+            if not camera.heatmap.heat.any():
+                prefix = f'{name}: ' if name else ''
+                update.message.reply_text(
+                    text=f"{prefix}No motion has been detected yet"
+                )
+                continue
+            context.bot.send_chat_action(
+                chat_id=update.message.chat_id,
+                action=ChatAction.UPLOAD_PHOTO
+            )
+            context.bot.send_photo(
+                chat_id=update.message.chat_id,
+                photo=camera.get_heatmap(),
+                caption=name or None
+            )
+
+    def _command_heatmap_reset(
+            self,
+            update: Update,
+            context: CallbackContext
+    ) -> None:
+        """
+        Handler for `/heatmap_reset` command.
+
+        It clears the motion accumulated by every selected camera.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+        """
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
+        for cam_id, camera in cameras:
+            camera.heatmap.reset()
+            self._save_heatmap(cam_id)
+            name = self._camera_name(cam_id)
+            prefix = f'{name}: ' if name else ''
+            update.message.reply_text(text=f"{prefix}Heatmap cleared")
+
+    def _stage_stats(self, cam_id: int) -> List[StageStats]:
+        """
+        Gets the statistics of the surveillance pipeline of a camera.
+
+        Args:
+            cam_id: ID of the camera.
+
+        Returns:
+            The statistics of every stage, empty if the pipeline is not
+            running.
+        """
+        pipeline = self._pipelines.get(cam_id)
+        return pipeline.stats if pipeline else []
 
     def _command_surveillance_status(
             self,
             update: Update,
-            _: CallbackContext
+            context: CallbackContext
     ) -> None:
         """
         Handler for `/surveillance_stats` command.
 
         This method informs to the user whether surveillance mode is active
-        or not.
+        or not on every selected camera, along with the motion analysis
+        statistics of the active ones: the analysis rate, the share of
+        frames analysed, the analysis time and the detection latency while
+        idle, along with the queue depth and latency of every stage.
 
         Args:
             update: The update to be handled.
+            context: The context object for the update.
         """
-        if self.camera.is_surveillance_active:
-            update.message.reply_text(text="Surveillance mode is active")
-        else:
-            update.message.reply_text(text="Surveillance mode is not active")
+        cameras = self._select_cameras(update, context)
+        if cameras is None:
+            return
+
+        for cam_id, camera in cameras:
+            name = self._camera_name(cam_id)
+            prefix = f'{name}: ' if name else ''
+            if camera.is_surveillance_active:
+                stats = camera.analysis_stats
+                rate = 'every frame' if stats.full_rate \
+                    else f'{stats.idle_fps:g} fps (idle)'
+                update.message.reply_text(
+                    text=f"{prefix}Surveillance mode is active\n"
+                         f"Analysing {rate}, "
+                         f"{stats.analysed_ratio:.0%} of frames analysed, "
+                         f"{stats.mean_analysis_time * 1000:.1f} ms "
+                         f"per frame, "
+                         f"idle detection latency up to "
+                         f"{stats.idle_latency:.2f} s"
+                         + ''.join(
+                             f"\n{stage.name.capitalize()} stage: "
+                             f"{stage.depth} queued, "
+                             f"{stage.latency:.2f} s latency, "
+                             f"{stage.dropped} dropped"
+                             for stage in self._stage_stats(cam_id)
+                         )
+                )
+            else:
+                update.message.reply_text(
+                    text=f"{prefix}Surveillance mode is not active"
+                )
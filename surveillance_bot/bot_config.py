@@ -4,14 +4,11 @@ Module for bot configuration functionality.
 This module contains the `BotConfig` class that implements a conversational
 sequence in order to configure the bot behavior.
 """
-from typing import TYPE_CHECKING, Callable, List
+from functools import partial
+from math import log10
+from typing import TYPE_CHECKING
 
-from telegram import (
-    InlineKeyboardButton,
-    InlineKeyboardMarkup,
-    ParseMode,
-    Update
-)
+from telegram import InlineKeyboardButton, Update
 from telegram.ext import (
     CallbackContext,
     CallbackQueryHandler,
@@ -19,18 +16,26 @@ from telegram.ext import (
     Filters,
     MessageHandler
 )
+from telegram.utils.helpers import escape_markdown
+
+from surveillance_bot.audio import MIN_DBFS
+from surveillance_bot.camera import Camera
+from surveillance_bot.detection_config import DetectionConfig
+from surveillance_bot.motion import DEFAULT_DETECTOR, DETECTORS
 
 if TYPE_CHECKING:  # pragma: no cover
     from surveillance_bot.bot import Bot  # pylint: disable=cyclic-import
 
 
-class BotConfig:
+class BotConfig(DetectionConfig):
     """
     Class for bot configuration process implementation.
 
     This class contains all constants and static methods needed to implements
     a conversational sequence with the user in order to the bot behavior will
-    be configured.
+    be configured. The states of the conversation, the settings of the motion
+    and sound detection, and the questions and inputs of every setting, are
+    inherited from `DetectionConfig`.
 
     It doesn't have any instance method so it doesn't need to be instantiated.
     """
@@ -42,31 +47,7 @@ class BotConfig:
     SRV_PICTURE_INTERVAL = 'srv_picture_interval'
     SRV_MOTION_CONTOURS = 'srv_motion_contours'
     SRV_VIDEO_THRESHOLD = 'srv_video_threshold'
-    SRV_AUDIO_THRESHOLD = 'srv_audio_threshold'
-
-    # State definitions for top level conversation
-    MAIN_MENU, GENERAL_CONFIG, SURVEILLANCE_CONFIG = map(chr, range(3))
-
-    # State definitions for second level conversation
-    (
-        CHANGE_TIMESTAMP,
-        CHANGE_OD_VIDEO_DURATION,
-        CHANGE_SRV_VIDEO_DURATION,
-        CHANGE_SRV_AUDIO_DURATION,
-        CHANGE_SRV_PICTURE_INTERVAL,
-        CHANGE_SRV_MOTION_CONTOURS,
-        CHANGE_SRV_VIDEO_THRESHOLD,
-        CHANGE_SRV_AUDIO_THRESHOLD
-    ) = map(chr, range(3, 11))
-
-    # State definitions for input conversation
-    BOOLEAN_INPUT, INTEGER_INPUT, FLOAT_INPUT = map(chr, range(11, 14))
-
-    # Shortcut for ConversationHandler.END
-    END = ConversationHandler.END
-
-    # Auxiliary constants
-    CURRENT_VARIABLE, RETURN_HANDLER, ENABLE, DISABLE = map(chr, range(14, 18))
+    SRV_AUDIO_PREROLL = 'srv_audio_preroll'
 
     @staticmethod
     def get_config_handler(bot: 'Bot') -> ConversationHandler:
@@ -146,11 +127,59 @@ class BotConfig:
                         + '$'
                     ),
                     CallbackQueryHandler(
-                        BotConfig._change_srv_audio_threshold,
+                        partial(
+                            BotConfig._change_srv_audio_threshold,
+                            return_handler=BotConfig._surveillance_config
+                        ),
                         pattern='^'
                         + str(BotConfig.CHANGE_SRV_AUDIO_THRESHOLD)
                         + '$'
                     ),
+                    CallbackQueryHandler(
+                        partial(
+                            BotConfig._change_srv_motion_detector,
+                            cam_ids=list(bot.cameras),
+                            return_handler=BotConfig._surveillance_config
+                        ),
+                        pattern='^'
+                        + str(BotConfig.CHANGE_SRV_MOTION_DETECTOR)
+                        + '$'
+                    ),
+                    CallbackQueryHandler(
+                        partial(
+                            BotConfig._change_srv_idle_analysis_fps,
+                            cam_ids=list(bot.cameras),
+                            return_handler=BotConfig._surveillance_config
+                        ),
+                        pattern='^'
+                        + str(BotConfig.CHANGE_SRV_IDLE_ANALYSIS_FPS)
+                        + '$'
+                    ),
+                    CallbackQueryHandler(
+                        partial(
+                            BotConfig._change_srv_motion_regions,
+                            cam_ids=list(bot.cameras),
+                            return_handler=BotConfig._surveillance_config
+                        ),
+                        pattern='^'
+                        + str(BotConfig.CHANGE_SRV_MOTION_REGIONS)
+                        + '$'
+                    ),
+                    CallbackQueryHandler(
+                        partial(
+                            BotConfig._change_srv_audio_bands,
+                            return_handler=BotConfig._surveillance_config
+                        ),
+                        pattern='^'
+                        + str(BotConfig.CHANGE_SRV_AUDIO_BANDS)
+                        + '$'
+                    ),
+                    CallbackQueryHandler(
+                        BotConfig._change_srv_audio_preroll,
+                        pattern='^'
+                        + str(BotConfig.CHANGE_SRV_AUDIO_PREROLL)
+                        + '$'
+                    ),
                     CallbackQueryHandler(
                         BotConfig._main_menu,
                         pattern='^' + str(BotConfig.END) + '$'
@@ -177,6 +206,42 @@ class BotConfig:
                         Filters.text,
                         BotConfig._float_input
                     )
+                ],
+                BotConfig.DBFS_INPUT: [
+                    MessageHandler(
+                        Filters.text,
+                        BotConfig._dbfs_input
+                    )
+                ],
+                BotConfig.PREROLL_INPUT: [
+                    MessageHandler(
+                        Filters.text,
+                        BotConfig._preroll_input
+                    )
+                ],
+                BotConfig.CAMERA_INPUT: [
+                    CallbackQueryHandler(
+                        BotConfig._camera_input,
+                        pattern='^[0-9]+$'
+                    )
+                ],
+                BotConfig.DETECTOR_INPUT: [
+                    CallbackQueryHandler(
+                        BotConfig._detector_input,
+                        pattern='^(' + '|'.join(DETECTORS) + ')$'
+                    )
+                ],
+                BotConfig.REGIONS_INPUT: [
+                    MessageHandler(
+                        Filters.text,
+                        BotConfig._regions_input
+                    )
+                ],
+                BotConfig.BANDS_INPUT: [
+                    MessageHandler(
+                        Filters.text,
+                        BotConfig._bands_input
+                    )
                 ]
             },
             fallbacks=[bot.command_handler('stop_config', BotConfig._end)],
@@ -185,7 +250,7 @@ class BotConfig:
         return main_handler
 
     @staticmethod
-    def ensure_defaults(context: CallbackContext) -> None:
+    def ensure_defaults(context: CallbackContext) -> None:  # pylint: disable=too-many-branches
         """
         Creates non-existent variables and populates with default values.
 
@@ -213,8 +278,37 @@ class BotConfig:
         if BotConfig.SRV_VIDEO_THRESHOLD not in context.bot_data:
             context.bot_data[BotConfig.SRV_VIDEO_THRESHOLD] = 5
 
-        if BotConfig.SRV_AUDIO_THRESHOLD not in context.bot_data:
-            context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD] = 0.1
+        audio_threshold = context.bot_data.get(BotConfig.SRV_AUDIO_THRESHOLD)
+        if audio_threshold is None or not MIN_DBFS <= audio_threshold <= 1:
+            context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD] = \
+                Camera.AUDIO_THRESHOLD
+        elif audio_threshold > 0:
+            # Thresholds used to be fractions of the full scale, not dBFS
+            context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD] = max(
+                MIN_DBFS,
+                20 * log10(audio_threshold)
+            )
+
+        if BotConfig.SRV_MOTION_DETECTOR not in context.bot_data:
+            context.bot_data[BotConfig.SRV_MOTION_DETECTOR] = {}
+
+        if BotConfig.SRV_IDLE_ANALYSIS_FPS not in context.bot_data:
+            context.bot_data[BotConfig.SRV_IDLE_ANALYSIS_FPS] = {}
+
+        if BotConfig.SRV_MOTION_REGIONS not in context.bot_data:
+            context.bot_data[BotConfig.SRV_MOTION_REGIONS] = {}
+
+        if BotConfig.SRV_AUDIO_BANDS not in context.bot_data:
+            context.bot_data[BotConfig.SRV_AUDIO_BANDS] = ''
+
+        audio_preroll = context.bot_data.get(BotConfig.SRV_AUDIO_PREROLL)
+        if audio_preroll is None:
+            context.bot_data[BotConfig.SRV_AUDIO_PREROLL] = \
+                Camera.AUDIO_PREROLL
+        elif audio_preroll > Camera.MAX_AUDIO_PREROLL:
+            # Pre-rolls used to be accepted up to 255 seconds
+            context.bot_data[BotConfig.SRV_AUDIO_PREROLL] = \
+                Camera.MAX_AUDIO_PREROLL
 
     # Menus
 
@@ -310,7 +404,10 @@ class BotConfig:
         return BotConfig.GENERAL_CONFIG
 
     @staticmethod
-    def _surveillance_config(update: Update, context: CallbackContext) -> str:
+    def _surveillance_config(  # pylint: disable=too-many-locals
+            update: Update,
+            context: CallbackContext
+    ) -> str:
         """
         Creates the menu for the surveillance mode configuration and send it
         to the user.
@@ -328,6 +425,30 @@ class BotConfig:
         motion_contours = context.bot_data[BotConfig.SRV_MOTION_CONTOURS]
         video_threshold = context.bot_data[BotConfig.SRV_VIDEO_THRESHOLD]
         audio_threshold = context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD]
+        audio_preroll = context.bot_data[BotConfig.SRV_AUDIO_PREROLL]
+        motion_detector_str = BotConfig._per_camera_str(
+            context,
+            BotConfig.SRV_MOTION_DETECTOR,
+            DEFAULT_DETECTOR
+        )
+        idle_analysis_fps_str = BotConfig._per_camera_str(
+            context,
+            BotConfig.SRV_IDLE_ANALYSIS_FPS,
+            Camera.IDLE_ANALYSIS_FPS
+        )
+        motion_regions_str = escape_markdown(
+            BotConfig._per_camera_str(
+                context,
+                BotConfig.SRV_MOTION_REGIONS,
+                'whole frame'
+            ),
+            version=2
+        )
+        audio_bands = context.bot_data[BotConfig.SRV_AUDIO_BANDS]
+        audio_bands_str = escape_markdown(
+            f'{audio_bands} Hz' if audio_bands else 'disabled',
+            version=2
+        )
 
         motion_contours_str = 'Enabled' if motion_contours else 'Disabled'
 
@@ -343,6 +464,11 @@ class BotConfig:
                f"or sound is detected|.\n" \
                f" |- _Current value_: *{audio_duration} seconds*\n" \
                f"\n" \
+               f"__Audio pre|-roll__:\n" \
+               f" |- _Description_: Duration of the audio recorded before " \
+               f"motion or sound is detected|.\n" \
+               f" |- _Current value_: *{audio_preroll} seconds*\n" \
+               f"\n" \
                f"__Picture Interval__:\n" \
                f" |- _Description_: Interval between photos taken after " \
                f"motion is detected|.\n" \
@@ -358,8 +484,33 @@ class BotConfig:
                f" |- _Current value_: *{video_threshold}*\n" \
                f"\n" \
                f"__Audio threshold__:\n" \
-               f" |- _Description_: Sensitivity of sound detection|.\n" \
-               f" |- _Current value_: *{str(audio_threshold).replace('.', '|.')}*\n" \
+               f" |- _Description_: Sensitivity of sound detection, the " \
+               f"minimum loudness of sound|.\n" \
+               f" |- _Current value_: " \
+               f"*{str(audio_threshold).replace('.', '|.').replace('-', '|-')} " \
+               f"dBFS*\n" \
+               f"\n" \
+               f"__Motion detector__:\n" \
+               f" |- _Description_: Motion detection strategy of every " \
+               f"camera|.\n" \
+               f" |- _Current value_: *{motion_detector_str}*\n" \
+               f"\n" \
+               f"__Idle analysis rate__:\n" \
+               f" |- _Description_: Frames analysed per second while there " \
+               f"is no motion, 0 analyses every frame|. Lower rates save " \
+               f"CPU but delay the detection|.\n" \
+               f" |- _Current value_: *{idle_analysis_fps_str}*\n" \
+               f"\n" \
+               f"__Motion regions__:\n" \
+               f" |- _Description_: Areas of every camera where motion is " \
+               f"detected or ignored|.\n" \
+               f" |- _Current value_: *{motion_regions_str}*\n" \
+               f"\n" \
+               f"__Audio bands__:\n" \
+               f" |- _Description_: Frequency bands where sound is detected " \
+               f"over their background noise, instead of by the audio " \
+               f"threshold|.\n" \
+               f" |- _Current value_: *{audio_bands_str}*\n" \
                f"".replace('|', '\\')
         buttons = [
             [InlineKeyboardButton(
@@ -370,6 +521,10 @@ class BotConfig:
                 text='Audio duration',
                 callback_data=str(BotConfig.CHANGE_SRV_AUDIO_DURATION)
             )],
+            [InlineKeyboardButton(
+                text='Audio pre-roll',
+                callback_data=str(BotConfig.CHANGE_SRV_AUDIO_PREROLL)
+            )],
             [InlineKeyboardButton(
                 text='Picture Interval',
                 callback_data=str(BotConfig.CHANGE_SRV_PICTURE_INTERVAL)
@@ -386,6 +541,22 @@ class BotConfig:
                 text='Audio threshold',
                 callback_data=str(BotConfig.CHANGE_SRV_AUDIO_THRESHOLD)
             )],
+            [InlineKeyboardButton(
+                text='Motion detector',
+                callback_data=str(BotConfig.CHANGE_SRV_MOTION_DETECTOR)
+            )],
+            [InlineKeyboardButton(
+                text='Idle analysis rate',
+                callback_data=str(BotConfig.CHANGE_SRV_IDLE_ANALYSIS_FPS)
+            )],
+            [InlineKeyboardButton(
+                text='Motion regions',
+                callback_data=str(BotConfig.CHANGE_SRV_MOTION_REGIONS)
+            )],
+            [InlineKeyboardButton(
+                text='Audio bands',
+                callback_data=str(BotConfig.CHANGE_SRV_AUDIO_BANDS)
+            )],
             [InlineKeyboardButton(
                 text='Back',
                 callback_data=str(BotConfig.END)
@@ -396,37 +567,6 @@ class BotConfig:
 
         return BotConfig.SURVEILLANCE_CONFIG
 
-    @staticmethod
-    def _render_menu(
-            update: Update,
-            text: str,
-            buttons: List[List[InlineKeyboardButton]]
-    ) -> None:
-        """
-        Builds the inline keyboard for the menu and sends all to the user.
-
-        Args:
-            update: The update to be handled.
-            text: Text for the menu caption.
-            buttons: Array of button rows,
-                each represented by an Array of InlineKeyboardButton objects.
-        """
-        keyboard = InlineKeyboardMarkup(buttons)
-
-        if update.message:
-            update.message.reply_text(
-                text=text,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN_V2
-            )
-        else:
-            update.callback_query.answer()
-            update.callback_query.edit_message_text(
-                text=text,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN_V2
-            )
-
     # General configuration options.
 
     @staticmethod
@@ -561,6 +701,40 @@ class BotConfig:
             BotConfig._surveillance_config
         )
 
+    @staticmethod
+    def _change_srv_audio_preroll(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Prepares all required data to request the SRV_AUDIO_PREROLL
+        configuration to the user.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The state PREROLL_INPUT.
+        """
+        audio_preroll = context.bot_data[BotConfig.SRV_AUDIO_PREROLL]
+
+        text = f'*Surveillance audio pre\\-roll*\n' \
+               f'\n' \
+               f'Current value: *{audio_preroll}*\n' \
+               f'\n' \
+               f'Type seconds of audio recorded before the events, from 0 ' \
+               f'to {Camera.MAX_AUDIO_PREROLL}:'
+
+        BotConfig._integer_question(
+            update,
+            context,
+            text,
+            BotConfig.SRV_AUDIO_PREROLL,
+            BotConfig._surveillance_config
+        )
+        return BotConfig.PREROLL_INPUT
+
     @staticmethod
     def _change_srv_picture_interval(
             update: Update,
@@ -659,228 +833,6 @@ class BotConfig:
             BotConfig._surveillance_config
         )
 
-    @staticmethod
-    def _change_srv_audio_threshold(
-            update: Update,
-            context: CallbackContext
-    ) -> str:
-        """
-        Prepares all required data to request the SRV_AUDIO_THRESHOLD
-        configuration to the user.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-
-        Returns:
-            The state FLOAT_INPUT through `_float_question` method.
-        """
-        audio_threshold = context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD]
-
-        text = '*Audio threshold*\n' \
-               '\n' \
-               'Current value: *' + str(audio_threshold).replace(".", "\\.") + '*\n' \
-               '\n' \
-               'Type value for audio threshold \\(e\\.g\\., 0\\.1\\):'
-
-        return BotConfig._float_question(
-            update,
-            context,
-            text,
-            BotConfig.SRV_AUDIO_THRESHOLD,
-            BotConfig._surveillance_config
-        )
-
-    # Questions helpers.
-
-    @staticmethod
-    def _boolean_question(
-            update: Update,
-            context: CallbackContext,
-            text: str,
-            current_variable: str,
-            return_handler: Callable[[Update, CallbackContext], str]
-    ) -> str:
-        """
-        Builds a boolean question to send it to the user using received data.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-            text: Message to be shown to the users.
-            current_variable: Variable to be set.
-            return_handler: Handler to be called with the user response.
-
-        Returns:
-            The state BOOLEAN_INPUT.
-        """
-        context.user_data[BotConfig.CURRENT_VARIABLE] = current_variable
-        context.user_data[BotConfig.RETURN_HANDLER] = return_handler
-
-        buttons = [[
-            InlineKeyboardButton(
-                text='Enable',
-                callback_data=str(BotConfig.ENABLE)
-            ),
-            InlineKeyboardButton(
-                text='Disable',
-                callback_data=str(BotConfig.DISABLE)
-            ),
-        ]]
-        keyboard = InlineKeyboardMarkup(buttons)
-
-        update.callback_query.answer()
-        update.callback_query.edit_message_text(
-            text=text,
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
-
-        return BotConfig.BOOLEAN_INPUT
-
-    @staticmethod
-    def _integer_question(
-            update: Update,
-            context: CallbackContext,
-            text: str,
-            current_variable: str,
-            return_handler: Callable[[Update, CallbackContext], str]
-    ) -> str:
-        """
-        Builds a integer question to send it to the user using received data.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-            text: Message to be shown to the users.
-            current_variable: Variable to be set.
-            return_handler: Handler to be called with the user response.
-
-        Returns:
-            The state INTEGER_INPUT.
-        """
-        context.user_data[BotConfig.CURRENT_VARIABLE] = current_variable
-        context.user_data[BotConfig.RETURN_HANDLER] = return_handler
-
-        update.callback_query.answer()
-        update.callback_query.edit_message_text(
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
-
-        return BotConfig.INTEGER_INPUT
-
-    @staticmethod
-    def _float_question(
-            update: Update,
-            context: CallbackContext,
-            text: str,
-            current_variable: str,
-            return_handler: Callable[[Update, CallbackContext], str]
-    ) -> str:
-        """
-        Builds a floating point question to send it to the user using received data.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-            text: Message to be shown to the users.
-            current_variable: Variable to be set.
-            return_handler: Handler to be called with the user response.
-
-        Returns:
-            The state FLOAT_INPUT.
-        """
-        context.user_data[BotConfig.CURRENT_VARIABLE] = current_variable
-        context.user_data[BotConfig.RETURN_HANDLER] = return_handler
-
-        update.callback_query.answer()
-        update.callback_query.edit_message_text(
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
-
-        return BotConfig.FLOAT_INPUT
-
-    # Input handlers.
-
-    @staticmethod
-    def _boolean_input(update: Update, context: CallbackContext) -> str:
-        """
-        Receive a boolean input from the user and saves the value into
-        corresponding variable.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-
-        Returns:
-            The execution of the previously stored handler.
-        """
-        context.bot_data[
-            context.user_data[BotConfig.CURRENT_VARIABLE]
-        ] = update.callback_query.data == BotConfig.ENABLE
-
-        return context.user_data[BotConfig.RETURN_HANDLER](update, context)
-
-    @staticmethod
-    def _integer_input(update: Update, context: CallbackContext) -> str:
-        """
-        Receive a integer input from the user, validates it, and saves the
-        value into corresponding variable.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-
-        Returns:
-            The execution of the previously stored handler or the state
-                INTEGER_INPUT in case of validation error.
-        """
-        try:
-            value = int(update.message.text)
-            assert value >= 0
-            assert value <= 255
-        except (ValueError, AssertionError):
-            update.message.reply_text(
-                text='Invalid value, insert an integer number between 0 and 255'
-            )
-            return BotConfig.INTEGER_INPUT
-
-        context.bot_data[
-            context.user_data[BotConfig.CURRENT_VARIABLE]
-        ] = value
-
-        return context.user_data[BotConfig.RETURN_HANDLER](update, context)
-
-    @staticmethod
-    def _float_input(update: Update, context: CallbackContext) -> str:
-        """
-        Receive a floatng point input from the user, validates it, and saves the
-        value into corresponding variable.
-
-        Args:
-            update: The update to be handled.
-            context: The context object for the update.
-
-        Returns:
-            The execution of the previously stored handler or the state
-                FLOAT_INPUT in case of validation error.
-        """
-        try:
-            value = float(update.message.text)
-        except (ValueError, AssertionError):
-            update.message.reply_text(
-                text='Invalid value, insert a floating point number'
-            )
-            return BotConfig.FLOAT_INPUT
-
-        context.bot_data[
-            context.user_data[BotConfig.CURRENT_VARIABLE]
-        ] = value
-
-        return context.user_data[BotConfig.RETURN_HANDLER](update, context)
-
     @staticmethod
     def _end(update: Update, context: CallbackContext) -> int:
         """
@@ -9,139 +9,94 @@ import os
 from datetime import datetime
 from io import BytesIO
 from tempfile import TemporaryDirectory
-from threading import Lock, Thread
-from time import time
-from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+from time import monotonic, sleep
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union
+)
 
 import cv2
 import numpy as np
 
 import sounddevice as sd
-from pydub import AudioSegment
 
-
-# Exceptions
-class CameraError(Exception):
-    """Base class for Camera related errors."""
-
-
-class CameraConnectionError(CameraError):
-    """Raised when connection with the camera fails."""
+from surveillance_bot.audio import AudioMonitor, Band
+from surveillance_bot.capture import (
+    CameraDevice,
+    CameraError,
+    ProcessCameraDevice,
+    TimedVideoWriter
+)
+from surveillance_bot.frames import Frame
+from surveillance_bot.motion import (
+    DEFAULT_DETECTOR,
+    DISABLED_TIMER,
+    MotionHeatmap,
+    Region,
+    StageTimer,
+    create_detector
+)
+from surveillance_bot.sources import SourceType
+from surveillance_bot.voice import create_encoder, encode_voice
 
 
+# Exceptions
 class CodecNotAvailable(CameraError):
     """Raised when a suitable video codec is not available."""
 
 
-# Classes
-class CameraDevice:
-    """
-    Class for camera hardware handling.
+class CameraNotFound(CameraError):
+    """Raised when a camera selector does not match any camera."""
 
-    This class handles camera hardware using threading to perform reading
-    operations on the camera.
 
-    Args:
-        cam_id: ID of the video capturing device to open.
+# Classes
+class AnalysisStats(NamedTuple):
     """
-    def __init__(self, cam_id=0) -> None:
-        self._device = cv2.VideoCapture(cam_id)
-        if not self._device.isOpened():
-            raise CameraConnectionError
-        self._frame = self._device.read()[1]
-
-        self._frame_count = 0
-        self._start_time = 0.0
-
-        self._running = False
-        self._thread: Optional[Thread] = None
-        self._lock = Lock()
-
-    def start(self) -> None:
-        """Starts frame grabbing process."""
-        if not self._running:
-            self._frame_count = 0
-            self._start_time = time()
-            self._running = True
-            self._thread = Thread(target=self._update, daemon=True)
-            self._thread.start()
-
-    def _update(self) -> None:
-        """
-        Updates data with latest frame available.
-
-        This functions is executed in a separated thread because frame
-        reading is a blocking operation. Every frame grabbed is stored
-        temporarily.
-        """
-        while self._running:
-            frame = self._device.read()[1]
-            with self._lock:
-                self._frame = frame
-                self._frame_count += 1
-
-    def read(self, timestamp=True) -> Tuple[int, np.ndarray]:
-        """
-        Returns the latest stored frame.
-
-        Args:
-            timestamp: If True a timestamp is printed on the returned frame.
-
-        Returns:
-            A tuple with the unique identifier of the frame and the frame
-            itself.
-        """
-        with self._lock:
-            frame_id = self._frame_count
-            frame = self._frame.copy()
-        if timestamp:
-            self._add_timestamp(frame)
-        return frame_id, frame
-
-    def stop(self) -> None:
-        """Stops frame grabbing process."""
-        self._running = False
-        if self._thread:
-            self._thread.join()
+    Statistics of the motion analysis of the surveillance mode.
+
+    Attributes:
+        full_rate: True if every frame is being analysed, False if frames
+            are sampled at the idle analysis rate.
+        idle_fps: Analysis rate (frames per second) while idle, 0 if every
+            frame is always analysed.
+        analysed: Number of frames analysed.
+        skipped: Number of captured frames not analysed, estimated from
+            the camera frame rate (skipped frames are not even decoded).
+        analysis_time: Total time (in seconds) spent analysing frames.
+    """
+    full_rate: bool = True
+    idle_fps: float = 0.0
+    analysed: int = 0
+    skipped: int = 0
+    analysis_time: float = 0.0
 
     @property
-    def fps(self) -> float:
-        """
-        Calculates actual frames per seconds value.
+    def analysed_ratio(self) -> float:
+        """Fraction of the captured frames that were analysed."""
+        total = self.analysed + self.skipped
+        return self.analysed / total if total else 0.0
 
-        Note:
-            This is necessary because FPS value returned by OpenCV could be
-            not accurate.
-
-        Returns:
-            Current FPS value.
-        """
-        return self._frame_count / (time() - self._start_time)
+    @property
+    def mean_analysis_time(self) -> float:
+        """Mean time (in seconds) spent analysing a frame."""
+        return self.analysis_time / self.analysed if self.analysed else 0.0
 
     @property
-    def frame_size(self) -> Tuple[int, int]:
+    def idle_latency(self) -> float:
         """
-        Gets the frame resolution based in the last grabbed frame.
-
-        Returns:
-            Tuple with frame width and height.
+        Maximum delay (in seconds) between the start of motion and its
+        analysis while idle, 0 if every frame is analysed.
         """
-        height, width, _ = self._frame.shape
-        return width, height
-
-    @staticmethod
-    def _add_timestamp(frame: np.ndarray) -> None:
-        """Prints timestamp on the given frame."""
-        now = str(datetime.now())[:-7]
-        org = (1, frame.shape[0] - 3)
-        font = cv2.FONT_HERSHEY_PLAIN
-        size = 1
-        cv2.putText(frame, now, org, font, size, (0, 0, 0), 2)
-        cv2.putText(frame, now, org, font, size, (255, 255, 255), 1)
-
-    def __del__(self) -> None:
-        """Releases video capture before object is destroyed."""
-        self._device.release()
+        return 1 / self.idle_fps if self.idle_fps else 0.0
 
 
 class Camera:
@@ -149,12 +104,19 @@ class Camera:
     Top level class for camera operations performing.
 
     This class provide high level operations returning images and videos in
-    a file object.
+    a file object. Stages of the motion analysis are measured by the
+    `timer` property.
 
     Args:
-        cam_id: ID of the video capturing device to open.
-        video_threshold: sensitivity of motion detection.
-        audio_threshold: sensitivity of audio detection.
+        source: Video source, a video capturing device ID, a source spec or
+            a `sources.FrameSource` (see `sources.open_source`).
+        codec: FourCC string of the video codec to use, if not given the
+            best available codec is detected.
+        capture_process: Grabs frames in a separate process (see
+            `capture.ProcessCameraDevice`).
+
+    Attributes:
+        heatmap: Motion accumulated in surveillance mode.
     """
 
     STATE_IDLE = 'idle'
@@ -163,16 +125,70 @@ class Camera:
     STATE_MOTION_DETECTED = 'motion_detected'
     """After motion have been detected."""
 
-    SAMPLE_RATE = 44100
+    SAMPLE_RATE = 48000
+    """Sample rate of the microphone, native to the Opus voice notes."""
+
+    FRAME_TIMEOUT = 1.0
+    """Maximum time (in seconds) to wait for a new frame."""
+
+    DEFAULT_FPS = 30.0
+    """Frame rate of the videos when the camera rate is not known yet."""
+
+    IDLE_ANALYSIS_FPS = 4
+    """Frames analysed per second in surveillance mode while idle."""
 
-    def __init__(self, cam_id=0) -> None:
-        self._camera = CameraDevice(cam_id)
+    AUDIO_THRESHOLD = -40.0
+    """Default minimum level (in dBFS) of sound in surveillance mode."""
+
+    AUDIO_PREROLL = 2
+    """Default seconds of audio recorded before the events."""
+
+    MAX_AUDIO_PREROLL = 30
+    """Maximum seconds of audio recorded before the events, as the audio
+    monitor keeps them in memory and every clip copies them."""
+
+    def __init__(
+            self,
+            source: SourceType = 0,
+            codec: Optional[str] = None,
+            capture_process=False
+    ) -> None:
+        device_class = ProcessCameraDevice if capture_process else CameraDevice
+        self._camera = device_class(source)
         self._surveillance_mode = False
+        self._analysis_stats = AnalysisStats()
+        self.heatmap = MotionHeatmap()
+        self._timer = DISABLED_TIMER
         self._tempdir = TemporaryDirectory()  # pylint: disable=R1732
-        self._codec = self.get_supported_codec()
+        self._codec = codec or self.get_supported_codec()
         if not self._codec:
             raise CodecNotAvailable
 
+    @property
+    def codec(self) -> str:
+        """FourCC string of the video codec in use."""
+        return self._codec
+
+    @property
+    def frame_size(self) -> Tuple[int, int]:
+        """Width and height of the frames."""
+        return self._camera.frame_size
+
+    @property
+    def timer(self) -> StageTimer:
+        """
+        Timer measuring the stages of the motion analysis.
+
+        It measures the grayscale stage of the device (unless frames are
+        grabbed in a separate process), the stages of the motion detector,
+        and the overlay, encode and record stages of the surveillance mode.
+        """
+        return self._timer
+
+    @timer.setter
+    def timer(self, timer: StageTimer) -> None:
+        self._timer = self._camera.timer = timer
+
     def start(self) -> None:
         """ Starts camera device."""
         self._camera.start()
@@ -191,77 +207,127 @@ class Camera:
         Returns:
             File object with the photo taken.
         """
-        frame = self._camera.read(timestamp=timestamp)[1]
-        return BytesIO(cv2.imencode(".jpg", frame)[1])
+        return self.encode_photo(self._camera.read_frame(timestamp=timestamp))
 
-    def get_video(self, timestamp=True, seconds=5) -> IO:
-        """Takes a video.
+    def get_heatmap(self) -> IO:
+        """
+        Draws the motion accumulated in surveillance mode on the latest frame.
+
+        Returns:
+            File object with the photo.
+        """
+        frame = self._camera.read_frame(timestamp=False)
+        image = self.heatmap.overlay(frame.image)
+        return BytesIO(cv2.imencode(".jpg", image)[1])
+
+    def encode_photo(self, frame: Frame) -> IO:
+        """
+        Encodes a frame as a JPEG photo.
+
+        Frames that have not been modified (their image is the read-only
+        view of the frame ring) are sent as delivered by the device when it
+        is in MJPEG passthrough mode.
 
         Args:
-            timestamp: Adds time stamping on the video.
-            seconds: Video duration.
+            frame: The frame to be encoded.
 
         Returns:
-            File object with the video taken.
+            File object with the photo.
         """
-        path, video_writer = self._create_video_file('on_demand')
-        n_frames = self._camera.fps * seconds
+        if not frame.image.flags.writeable:
+            encoded = self._camera.get_encoded(frame.id)
+            if encoded is not None:
+                return BytesIO(encoded)
+        started = self._timer.start()
+        photo = BytesIO(cv2.imencode(".jpg", frame.image)[1])
+        self._timer.record('encode', started)
+        return photo
+
+    def _detach_photo(self, frame: Frame) -> Dict[str, Any]:
+        """
+        Prepares a frame to be encoded as a photo later.
 
-        processed: List[int] = []
-        while len(processed) < n_frames:
-            frame_id, frame = self._camera.read(timestamp=timestamp)
-            if frame_id not in processed:
-                processed.append(frame_id)
-                video_writer.write(frame)
+        The frame buffers are reused by the following frames, so the image
+        is copied unless the frame is available as delivered by the device.
 
-        video_writer.release()
-        return open(path, 'rb')
+        Args:
+            frame: The frame to be encoded.
 
-    @staticmethod
-    def _get_motion_contours(
-            frame_1: np.ndarray,
-            frame_2: np.ndarray,
-            video_threshold: int,
-    ) -> List[np.ndarray]:
+        Returns:
+            A dict with the encoded photo (``{'photo': <IO>}``) or the frame
+            to be encoded (``{'frame': <Frame>}``).
         """
-        Detects motion and find the contours for every motion detected.
+        if not frame.image.flags.writeable:
+            encoded = self._camera.get_encoded(frame.id)
+            if encoded is not None:
+                return {'photo': BytesIO(encoded)}
+        return {'frame': Frame(frame.id, frame.timestamp, frame.image.copy())}
 
-        This method receives two consecutive frames and detects changes
-        between them.
+    def encode_audio(self, segments: Sequence[np.ndarray]) -> IO:
+        """
+        Encodes a completed audio recording as an Opus voice note (see
+        `voice`).
 
         Args:
-            frame_1: First of the two consecutive frames.
-            frame_2: Second of the two consecutive frames.
-            video_threshold: Sensitivity of camera.
+            segments: Consecutive segments of the recorded samples.
 
         Returns:
-            A list with the contours found.
+            File object with the voice note.
         """
-        frame_delta = cv2.absdiff(frame_1, frame_2)
-        thresh = cv2.threshold(frame_delta, video_threshold, 255, cv2.THRESH_BINARY)[1]  # 5
+        return encode_voice(segments, self.SAMPLE_RATE)
+
+    def get_video(self, timestamp=True, seconds=5) -> IO:
+        """Takes a video.
 
-        kernel = np.ones((40, 40), np.uint8)
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        return cv2.findContours(
-            thresh.copy(),
-            cv2.RETR_EXTERNAL,
-            cv2.CHAIN_APPROX_SIMPLE
-        )[-2]
+        Args:
+            timestamp: Adds time stamping on the video.
+            seconds: Video duration.
+
+        Returns:
+            File object with the video taken.
+        """
+        path, video_writer = self._create_video_file('on_demand')
+
+        last_frame_id = -1
+        while video_writer.duration < seconds:
+            frame = self._camera.read_frame(
+                timestamp=timestamp,
+                after_id=last_frame_id,
+                timeout=self.FRAME_TIMEOUT
+            )
+            if frame.id != last_frame_id:
+                last_frame_id = frame.id
+                video_writer.write(frame.image, frame.timestamp)
+
+        video_writer.release()
+        return open(path, 'rb')
 
     @staticmethod
-    def _draw_contours(frame: np.ndarray, contour: np.ndarray) -> None:
+    def _draw_boxes(
+            frame: np.ndarray,
+            boxes: np.ndarray,
+            scale=1.0
+    ) -> None:
         """
-        Draws a rectangle on the frame that marks a contour.
+        Draws rectangles on the frame that mark areas in motion.
 
-        This method gets a bounding rectangle for a given contour and
-        draws this rectangle on the frame.
+        All the rectangles are drawn at once as polygons.
 
         Args:
             frame: Frame on which to draw the rectangles.
-            contour: Contour to be marked.
+            boxes: Array of `motion.MOTION_BOX` records.
+            scale: Scale of the image the boxes were found in relative to
+                the frame.
         """
-        (x, y, width, height) = cv2.boundingRect(contour)
-        cv2.rectangle(frame, (x, y), (x + width, y + height), (0, 255, 0), 1)
+        corners = np.stack((
+            boxes['x'],
+            boxes['y'],
+            boxes['x'] + boxes['width'],
+            boxes['y'] + boxes['height']
+        ), axis=1)
+        corners = np.round(corners / scale).astype(np.int32)
+        polygons = corners[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        cv2.polylines(frame, polygons, True, (0, 255, 0), 1)
 
     @staticmethod
     def _record_buffer(buffer, **kwargs):
@@ -281,6 +347,7 @@ class Camera:
             """Class to mark an event.
             """
             _set = False
+            recorded = 0
 
             def set(self):
                 """Signals event completion.
@@ -307,6 +374,7 @@ class Camera:
             indata = indata[:remainder]
             buffer[idx:idx + len(indata)] = indata
             idx += len(indata)
+            event.recorded = idx
 
         stream = sd.InputStream(callback=callback,
                                 dtype=buffer.dtype,
@@ -315,104 +383,197 @@ class Camera:
         return stream, event
 
     async def get_audio(self, seconds=5):
-        """Records an audio from the microphone as an MP3.
+        """Records an audio from the microphone as an Opus voice note.
+
+        Samples are encoded while they are recorded, so the voice note is
+        ready as soon as the recording ends.
 
         Args:
             seconds (int, optional): Number of seconds to record. Defaults to 5.
 
         Returns:
-            bytes: MP3.
+            IO: File object with the voice note.
         """
         buffer = np.empty((int(seconds * self.SAMPLE_RATE), 1),
                           dtype=np.int32)
+        encoder = create_encoder(self.SAMPLE_RATE, buffer.shape[1])
+        encoded = 0
         stream, event = self._record_buffer(buffer,
                                             samplerate=self.SAMPLE_RATE)
         with stream:
             while not event.is_set():
                 sd.sleep(10)
-        with BytesIO(buffer) as wav:
-            sound = AudioSegment.from_raw(wav,
-                                          frame_rate=self.SAMPLE_RATE,
-                                          channels=buffer.shape[1],
-                                          sample_width=buffer.itemsize)
-        audio = BytesIO()
-        sound.export(audio, format='mp3')
-        return audio
-
-    def _motion_detection(  # pylint: disable=too-many-arguments, too-many-locals
+                recorded = event.recorded
+                encoder.write(buffer[encoded:recorded])
+                encoded = recorded
+        encoder.write(buffer[encoded:event.recorded])
+        return encoder.close()
+
+    def _motion_detection(  # pylint: disable=too-many-arguments, too-many-locals, too-many-branches, too-many-statements
             self,
-            timestamp=True,
             contours=True,
             audio_seconds=5,
             video_threshold=5,
-            audio_threshold=0.1
-    ) -> Iterator[Tuple[bool, int, np.ndarray]]:
+            audio_threshold=AUDIO_THRESHOLD,
+            detector=DEFAULT_DETECTOR,
+            idle_fps: float = IDLE_ANALYSIS_FPS,
+            full_rate_seconds=0.0,
+            regions: Sequence[Region] = (),
+            audio_bands: Sequence[Band] = (),
+            audio_preroll: float = AUDIO_PREROLL,
+            audio=True
+    ) -> Iterator[Tuple[bool, Frame, Optional[Tuple[np.ndarray, ...]]]]:
         """
         Executes motion detection operation during surveillance mode.
 
         This generator grabs frames continuously and search for motion
-        yielding every frame grabbed even motion is detected or not. In
-        frames with motion detected the contour is drawn on it.
+        yielding every frame analysed even motion is detected or not. In
+        frames with motion detected the areas in motion are marked. Frames are
+        not time stamped, so stamping is only paid for the frames sent.
+        Areas are drawn on a copy of the frame kept in a buffer reused by
+        the following frames, so yielded frames are only valid until the
+        next iteration.
+
+        While idle only `idle_fps` frames per second are analysed (the
+        frames in between are not even decoded). Once motion is detected,
+        or suspected (foreground too small to be reported), every frame is
+        analysed until `full_rate_seconds` after the latest motion. The
+        foreground masks are accumulated into the motion heatmap of the
+        camera (see `heatmap`).
+
+        The microphone is listened by the `audio.AudioMonitor` shared by
+        every camera of the process while the generator runs. Sound is
+        picked up by the next frame analysed. Both sound and motion start an
+        audio clip, from `audio_preroll` seconds before the event to
+        `audio_seconds` after it, which is yielded once it is completed.
+        Without `audio` the microphone is not opened and only motion is
+        detected.
 
         Args:
-            timestamp: Adds time stamping on the frames.
             contours: Draws motion contours on the frames.
-            audio_seconds: Duration of audio for monitoring.
+            audio_seconds: Duration of audio after the events.
             video_threshold: Sensitivity of camera.
-            audio_threshold: Sensitivity of microphone.
+            audio_threshold: Sensitivity of microphone, the minimum level
+                (in dBFS) of sound.
+            detector: Name of the motion detection strategy (see
+                `motion.DETECTORS`).
+            idle_fps: Frames analysed per second while idle, if it is 0
+                every frame is analysed.
+            full_rate_seconds: Time (in seconds) every frame is analysed
+                after motion.
+            regions: Regions where motion is detected or ignored.
+            audio_bands: Frequency bands where sound is detected against
+                their noise floor, instead of by `audio_threshold`.
+            audio_preroll: Duration of audio before the events.
+            audio: Listens to the microphone.
 
         Yields:
             A tuple with three values.
                 * True if motion is detected or False if not.
-                * The unique identifier of the frame.
-                * The frame itself.
+                * The frame itself, along with its identifier and capture
+                  time.
+                * The segments of the samples of the audio clip of an event
+                  completed since the previous frame, as views of the audio
+                  buffer (see `audio.AudioListener.poll`), or None.
         """
         self._surveillance_mode = True
-        previous_frame = None
+        self._analysis_stats = stats = AnalysisStats(idle_fps=idle_fps)
+        idle_interval = 1 / idle_fps if idle_fps else 0.0
+        full_rate_until = next_analysis = 0.0
+        motion_detector = None
+        annotated = np.empty(0, np.uint8)
         last_frame_id = 0
-        last_buffer = None
-        event = None
-
-        while self._surveillance_mode:
-            frame_id, frame = self._camera.read(timestamp=timestamp)
-            if frame_id == last_frame_id:
-                continue
-            last_frame_id = frame_id
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (21, 21), 0)
-
-            if previous_frame is None:
-                previous_frame = gray
-                continue
-
-            motion_contours = self._get_motion_contours(previous_frame, gray, video_threshold)
+        last_timestamp = 0.0
+        listener = None
+        if audio:
+            listener = AudioMonitor.shared_listener(
+                audio_seconds,
+                audio_threshold,
+                self.SAMPLE_RATE,
+                bands=audio_bands,
+                pre_seconds=audio_preroll
+            )
 
-            detected = False
-            for contour in motion_contours:
-                if cv2.contourArea(contour) < 2000:
+        try:
+            while self._surveillance_mode:
+                full_rate = not idle_interval or monotonic() < full_rate_until
+                if not full_rate:
+                    # Frames are not requested until the next analysis is due
+                    delay = next_analysis - monotonic()
+                    if delay > 0:
+                        sleep(min(delay, self.FRAME_TIMEOUT))
+                        continue
+
+                captured = self._camera.read_frame(
+                    timestamp=False,
+                    after_id=last_frame_id,
+                    timeout=self.FRAME_TIMEOUT
+                )
+                if captured.id == last_frame_id:
                     continue
-                if contours:
-                    self._draw_contours(frame, contour)
-                detected = True
-
-            if event is None:
-                buffer = np.empty((int(audio_seconds * self.SAMPLE_RATE), 1),
-                                  dtype=np.int32)
-                stream, event = self._record_buffer(
-                    buffer, samplerate=self.SAMPLE_RATE)
-                stream.__enter__()
-            elif event.is_set():
-                stream.__exit__()
-                event = None
-                if np.linalg.norm(buffer) > audio_threshold * pow(2, 31):
-                    detected = True
-                    last_buffer = buffer
-
-            previous_frame = gray
-            yield detected, frame_id, frame, last_buffer
-
-    def surveillance_start(  # pylint: disable=too-many-arguments, too-many-locals
+                skipped = 0
+                if last_frame_id:
+                    elapsed = captured.timestamp - last_timestamp
+                    skipped = max(0, round(elapsed * self._camera.fps) - 1)
+                last_frame_id, last_timestamp = captured.id, captured.timestamp
+                frame, proxy = captured.image, captured.proxy
+
+                # Motion analysis runs on the proxy, sizes are scaled to it
+                started = monotonic()
+                scale = proxy.shape[1] / frame.shape[1]
+                if motion_detector is None or motion_detector.scale != scale:
+                    motion_detector = create_detector(
+                        detector,
+                        video_threshold,
+                        scale,
+                        regions
+                    )
+                    motion_detector.timer = self._timer
+
+                motion_boxes = motion_detector.detect(proxy)
+                detected = bool(motion_boxes.size)
+                foreground = motion_detector.foreground
+                if foreground is not None:
+                    self.heatmap.update(
+                        foreground,
+                        captured.timestamp,
+                        proxy.shape,
+                        motion_detector.crop
+                    )
+                finished = monotonic()
+                next_analysis = started + idle_interval
+                self._analysis_stats = stats = stats._replace(
+                    full_rate=full_rate,
+                    analysed=stats.analysed + 1,
+                    skipped=stats.skipped + skipped,
+                    analysis_time=stats.analysis_time + finished - started
+                )
+
+                if detected and contours:
+                    started = self._timer.start()
+                    if not frame.flags.writeable:
+                        if annotated.shape != frame.shape:
+                            annotated = np.empty_like(frame)
+                        np.copyto(annotated, frame)
+                        frame = annotated
+                    self._draw_boxes(frame, motion_boxes, scale)
+                    self._timer.record('overlay', started)
+
+                recording = None
+                if listener is not None:
+                    if detected:
+                        listener.trigger()
+                    heard, recording = listener.poll()
+                    detected = detected or heard
+
+                if detected or motion_detector.suspected:
+                    full_rate_until = monotonic() + full_rate_seconds
+                yield detected, captured._replace(image=frame), recording
+        finally:
+            if listener is not None:
+                listener.close()
+
+    def surveillance_start(  # pylint: disable=too-many-arguments, too-many-locals, too-many-branches
             self,
             timestamp=True,
             video_seconds=30,
@@ -420,7 +581,14 @@ class Camera:
             picture_seconds=5,
             contours=True,
             video_threshold=5,
-            audio_threshold=0.1
+            audio_threshold=AUDIO_THRESHOLD,
+            detector=DEFAULT_DETECTOR,
+            idle_fps: float = IDLE_ANALYSIS_FPS,
+            regions: Sequence[Region] = (),
+            audio_bands: Sequence[Band] = (),
+            audio_preroll: float = AUDIO_PREROLL,
+            encode=True,
+            audio=True
     ) -> Iterator[Dict[str, Any]]:
         """
         Starts surveillance mode, waiting for motion detection.
@@ -428,70 +596,107 @@ class Camera:
         In this mode it waits until motion is detected, when this happens a
         message is yielded and it starts to record a video, yielding single
         photos during this process until video is yielded. After that it
-        goes back to the initial state.
+        goes back to the initial state. Video duration and photo intervals
+        are both measured with the capture time of the frames, so the last
+        photo is yielded before the video. While idle frames
+        are analysed at a reduced rate, every frame is analysed (and
+        recorded) from the moment motion is detected.
+
+        Encoding of photos and audio can be left to the caller (see
+        `pipeline.SurveillancePipeline`), so it does not delay the
+        analysis.
 
         Args:
             timestamp: Adds time stamping on the frames.
             video_seconds: Video duration.
             picture_seconds: Time elapsed between pictures.
-            audio_seconds: Audio duration.
+            audio_seconds: Duration of audio after the events.
             contours: Draws motion contours on the frames.
             video_threshold: Sensitivy of camera.
-            audio_threshold: Sensitivy of microphone.
+            audio_threshold: Sensitivity of microphone, the minimum level
+                (in dBFS) of sound.
+            detector: Name of the motion detection strategy.
+            idle_fps: Frames analysed per second while idle, if it is 0
+                every frame is analysed.
+            regions: Regions where motion is detected or ignored (see
+                `motion.Region`).
+            audio_bands: Frequency bands where sound is detected against
+                their noise floor, instead of by `audio_threshold` (see
+                `audio.SpectralDetector`).
+            audio_preroll: Duration of audio before the events, the audio
+                of an event is yielded once recorded, even after its video.
+            encode: Encodes photos and audio, otherwise the frames and the
+                samples are yielded instead.
+            audio: Listens to the microphone, otherwise only motion is
+                detected and no audio is yielded.
 
         Yields:
-            A dict with three possible configurations
+            A dict with these possible configurations
                 * ``{'detected': True}``
                 * ``{'video': <IO>}``
                 * ``{'photo': <IO>, 'id': <int>, 'total': <int>}``
+                * ``{'audio': <IO>}``
+                * ``{'frame': <Frame>, 'id': <int>, 'total': <int>}`` (a
+                  photo to be encoded, only if `encode` is False)
+                * ``{'samples': <tuple of ndarray>}`` (the segments of an
+                  audio to be encoded, only if `encode` is False)
+
+            Videos are yielded as open files, they are closed when the
+            generator is resumed.
         """
         status = Camera.STATE_IDLE
-        fps = self._camera.fps
-        processed = []
-        n_frames = 0
+        total = video_seconds // picture_seconds if picture_seconds else 0
+        start = 0.0
+        photo_id = 0
         path = ''
-        video_writer: cv2.VideoWriter = cv2.VideoWriter()
-        exported_sound = False
+        video_writer: Optional[TimedVideoWriter] = None
+        pending_sound = False
 
-        for detected, frame_id, frame, buffer in self._motion_detection(
-                timestamp=timestamp,
+        for detected, frame, buffer in self._motion_detection(
                 contours=contours,
                 audio_seconds=audio_seconds,
                 video_threshold=video_threshold,
-                audio_threshold=audio_threshold
+                audio_threshold=audio_threshold,
+                detector=detector,
+                idle_fps=idle_fps,
+                full_rate_seconds=video_seconds,
+                regions=regions,
+                audio_bands=audio_bands,
+                audio_preroll=audio_preroll,
+                audio=audio
         ):
             if status == Camera.STATE_IDLE:
                 if detected:
                     yield {'detected': True}
                     status = Camera.STATE_MOTION_DETECTED
                     path, video_writer = self._create_video_file('on_motion')
-                    n_frames = fps * video_seconds
-                    processed = [frame_id]
-                    video_writer.write(frame)
-                    exported_sound = False
+                    start = frame.timestamp
+                    photo_id = 0
+                    pending_sound = True
+            if buffer is not None and pending_sound:
+                pending_sound = False
+                if encode:
+                    yield {'audio': self.encode_audio(buffer)}
+                else:
+                    yield {'samples': buffer}
             if status == Camera.STATE_MOTION_DETECTED:
-                if buffer is not None and not exported_sound:
-                    with BytesIO(buffer) as wav:
-                        sound = AudioSegment.from_raw(
-                                wav,
-                                frame_rate=self.SAMPLE_RATE,
-                                channels=buffer.shape[1],
-                                sample_width=buffer.itemsize
-                        )
-                    audio = BytesIO()
-                    sound.export(audio, format='mp3')
-                    exported_sound = True
-                    yield {'audio': audio}
-                if not len(processed) % int(fps * picture_seconds):
-                    yield {
-                        'photo': BytesIO(cv2.imencode(".jpg", frame)[1]),
-                        'id': (len(processed) // int(fps * picture_seconds)),
-                        'total': video_seconds // picture_seconds
-                    }
-                if len(processed) < n_frames:
-                    if frame_id not in processed:
-                        processed.append(frame_id)
-                        video_writer.write(frame)
+                if timestamp:
+                    frame = self._camera.add_timestamp(frame)
+                elapsed = frame.timestamp - start
+                if total:
+                    current_id = min(int(elapsed // picture_seconds), total)
+                    if current_id > photo_id:
+                        photo_id = current_id
+                        if encode:
+                            photo = {'photo': self.encode_photo(frame)}
+                        else:
+                            photo = self._detach_photo(frame)
+                        yield {**photo, 'id': photo_id, 'total': total}
+                # The frame ending the video still takes the last photo
+                if elapsed < video_seconds:
+                    started = self._timer.start()
+                    video_writer.write(frame.image, frame.timestamp)
+                    self._timer.record('record', started)
                 else:
                     video_writer.release()
                     with open(path, 'rb') as file_handler:
@@ -507,29 +712,35 @@ class Camera:
         """Return if surveillance mode is active or not."""
         return self._surveillance_mode
 
+    @property
+    def analysis_stats(self) -> AnalysisStats:
+        """Statistics of the motion analysis of the surveillance mode."""
+        return self._analysis_stats
+
     def _create_video_file(
             self,
             event_type: str
-    ) -> Tuple[str, cv2.VideoWriter]:
+    ) -> Tuple[str, TimedVideoWriter]:
         """
         Initializes a temporary video file and a video writer.
 
+        The video frame rate is the current camera frame rate estimation.
 
         Args:
             event_type: Event type string for filename generation.
 
         Returns:
-            A tuple with the file path and the OpenCV video writer object.
+            A tuple with the file path and the video writer object.
         """
         now_str = str(datetime.now())[:-7]
         table = str.maketrans(': ', '-_')
         filename = now_str.translate(table) + f'_{event_type}.mp4'
 
         path = os.path.join(self._tempdir.name, filename)
-        writer = cv2.VideoWriter(
+        writer = TimedVideoWriter(
             path,
-            cv2.VideoWriter_fourcc(*self._codec),
-            self._camera.fps,
+            self._codec,
+            self._camera.fps or self.DEFAULT_FPS,
             self._camera.frame_size
         )
         return path, writer
@@ -556,3 +767,93 @@ class Camera:
                 writer.release()
                 return codec
         return None
+
+
+class CameraPool:
+    """
+    Class for handling several cameras from a single process.
+
+    Every camera runs its own capture thread and surveillance mode, while
+    the codec detection, the bot and its upload path are shared by all of
+    them.
+
+    Args:
+        cam_ids: IDs of the video capturing devices to open, or a mapping
+            from camera ID to its video source (see `open_source`).
+        capture_process: Grabs the frames of every camera in a separate
+            process.
+    """
+    SELECT_ALL = 'all'
+    """Selector for all the cameras in the pool."""
+
+    def __init__(
+            self,
+            cam_ids: Union[Sequence[int], Mapping[int, SourceType]] = (0,),
+            capture_process=False
+    ) -> None:
+        if not isinstance(cam_ids, Mapping):
+            cam_ids = {cam_id: cam_id for cam_id in cam_ids}
+        self._cameras: Dict[int, Camera] = {}
+        codec = None
+        for cam_id, source in cam_ids.items():
+            camera = Camera(
+                source,
+                codec=codec,
+                capture_process=capture_process
+            )
+            codec = camera.codec
+            self._cameras[cam_id] = camera
+
+    def __len__(self) -> int:
+        return len(self._cameras)
+
+    def __getitem__(self, cam_id: int) -> Camera:
+        return self._cameras[cam_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._cameras)
+
+    @property
+    def default(self) -> Camera:
+        """First camera of the pool."""
+        return next(iter(self._cameras.values()))
+
+    def select(self, selector: Optional[str] = None) -> List[Tuple[int, Camera]]:
+        """
+        Gets the cameras matching a selector.
+
+        Args:
+            selector: A camera ID or `SELECT_ALL`. All cameras are selected
+                if it is not given.
+
+        Raises:
+            CameraNotFound: If the selector does not match any camera.
+
+        Returns:
+            A list of tuples with the camera ID and the camera itself.
+        """
+        if selector is None or selector.lower() == self.SELECT_ALL:
+            return list(self._cameras.items())
+        try:
+            cam_id = int(selector)
+            return [(cam_id, self._cameras[cam_id])]
+        except (ValueError, KeyError) as error:
+            raise CameraNotFound(selector) from error
+
+    def start(self) -> None:
+        """Starts all camera devices."""
+        for camera in self._cameras.values():
+            camera.start()
+
+    def stop(self) -> None:
+        """Stops all camera devices."""
+        for camera in self._cameras.values():
+            camera.stop()
+
+    @property
+    def is_surveillance_active(self) -> bool:
+        """Return if surveillance mode is active in any camera."""
+        return any(
+            camera.is_surveillance_active
+            for camera in self._cameras.values()
+        )
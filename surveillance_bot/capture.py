@@ -0,0 +1,650 @@
+"""
+Module for frame capture and recording.
+
+This module implements the camera devices grabbing frames into a frame ring
+(see `frames`), in a thread of the process (`CameraDevice`) or in a
+separate process (`ProcessCameraDevice`), and the video writer recording
+frames by their capture time (`TimedVideoWriter`).
+"""
+import multiprocessing
+from datetime import datetime
+from multiprocessing.connection import Connection
+from threading import Thread
+from time import monotonic, time
+from typing import Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from surveillance_bot.frames import (
+    Frame,
+    FrameRing,
+    SharedFrameRing,
+    shared_memory
+)
+from surveillance_bot.motion import DISABLED_TIMER
+from surveillance_bot.sources import FrameSource, SourceType, open_source
+
+# Exceptions
+class CameraError(Exception):
+    """Base class for Camera related errors."""
+
+
+class CameraConnectionError(CameraError):
+    """Raised when connection with the camera fails."""
+
+
+class CaptureProcessNotAvailable(CameraError):
+    """Raised when out-of-process capture is not supported (Python < 3.8)."""
+
+
+# Classes
+class ProxyScaler:  # pylint: disable=too-few-public-methods
+    """
+    Generates the analysis proxies of the frames.
+
+    A proxy is a downscaled grayscale version of a frame, it is computed
+    once per grabbed frame so motion analysis does not work on the full
+    resolution. Frames narrower than the proxy width are only converted to
+    grayscale.
+
+    Args:
+        shape: Shape of the frames to be scaled.
+        width: Width of the proxies.
+    """
+    def __init__(self, shape: Tuple[int, ...], width: int) -> None:
+        height, frame_width = shape[:2]
+        if frame_width > width:
+            height = max(1, round(height * width / frame_width))
+        else:
+            width = frame_width
+        self.shape = (height, width)
+        self._resize = width != frame_width
+        self._work = np.empty((height, width) + tuple(shape[2:]), np.uint8)
+
+    def __call__(self, image: np.ndarray, proxy: np.ndarray) -> None:
+        """
+        Writes the proxy of a frame.
+
+        Args:
+            image: The frame to be scaled.
+            proxy: Buffer where the proxy is written.
+        """
+        if self._resize:
+            cv2.resize(
+                image,
+                (self.shape[1], self.shape[0]),
+                dst=self._work,
+                interpolation=cv2.INTER_AREA
+            )
+            image = self._work
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=proxy)
+
+
+class TimestampOverlay:  # pylint: disable=too-few-public-methods
+    """
+    Prints the capture time on frames.
+
+    The text of every second is rendered once into a small sprite along with
+    its mask (the outlined text), and stamping a frame only blits the sprite
+    onto the bottom-left corner of the frame. Stamping is a separate stage
+    applied to the frames being sent or recorded, the analysis never sees
+    it.
+    """
+    FONT = cv2.FONT_HERSHEY_PLAIN
+    """Font of the time stamp."""
+
+    FORMAT = '%Y-%m-%d %H:%M:%S'
+    """Format of the time stamp."""
+
+    def __init__(self) -> None:
+        self._cache: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+
+    def _sprite(self, second: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the sprite of a time stamp, rendering it if it is not cached.
+
+        Args:
+            second: Time stamp (in seconds since the epoch) to be rendered.
+
+        Returns:
+            A tuple with the sprite and its mask.
+        """
+        cache = self._cache
+        if cache is not None and cache[0] == second:
+            return cache[1], cache[2]
+
+        text = datetime.fromtimestamp(second).strftime(self.FORMAT)
+        (width, height), _ = cv2.getTextSize(text, self.FONT, 1, 2)
+        # Text baseline is 3 pixels above the bottom of the frame
+        shape = (height + 7, width + 4)
+        org = (1, shape[0] - 3)
+        sprite = np.zeros(shape + (3,), np.uint8)
+        mask = np.zeros(shape, np.uint8)
+        cv2.putText(mask, text, org, self.FONT, 1, (255,), 2)
+        cv2.putText(sprite, text, org, self.FONT, 1, (255, 255, 255), 1)
+        mask = mask.astype(bool)[..., np.newaxis]
+
+        self._cache = (second, sprite, mask)
+        return sprite, mask
+
+    def apply(self, image: np.ndarray, timestamp: float) -> None:
+        """
+        Prints a time stamp on a frame.
+
+        Args:
+            image: The frame, it is modified in place.
+            timestamp: Capture time (in seconds of the monotonic clock) of
+                the frame.
+        """
+        sprite, mask = self._sprite(int(timestamp + time() - monotonic()))
+        height = min(sprite.shape[0], image.shape[0])
+        width = min(sprite.shape[1], image.shape[1])
+        np.copyto(
+            image[image.shape[0] - height:, :width],
+            sprite[sprite.shape[0] - height:, :width],
+            where=mask[mask.shape[0] - height:, :width]
+        )
+
+
+class CameraDevice:  # pylint: disable=too-many-instance-attributes
+    """
+    Class for camera hardware handling.
+
+    This class handles camera hardware using threading to perform reading
+    operations on the camera. Frames are grabbed continuously to keep the
+    device queue fresh, but they are only decoded when a reader needs them.
+    Decoded frames are stored into a `FrameRing` along with their analysis
+    proxies, the generation of the proxies is measured by the `timer`
+    attribute (grayscale stage).
+
+    Args:
+        source: Video source, a video capturing device ID, a source spec or
+            a `FrameSource` (see `open_source`).
+        buffer_size: Number of frames kept in the frame ring.
+        proxy_width: Width of the analysis proxies.
+    """
+    PROXY_WIDTH = 320
+    """Default width (in pixels) of the analysis proxies."""
+
+    REQUEST_TIMEOUT = 1.0
+    """Maximum time (in seconds) to wait for a requested frame."""
+
+    def __init__(
+            self,
+            source: SourceType = 0,
+            buffer_size=8,
+            proxy_width=PROXY_WIDTH
+    ) -> None:
+        self._device: FrameSource = open_source(source)
+        if not self._device.is_opened():
+            raise CameraConnectionError
+
+        self._buffer_size = buffer_size
+        self._proxy_width = proxy_width
+        self._overlay = TimestampOverlay()
+        self._encoded: Optional[Tuple[int, bytes]] = None
+        self._scaler: Optional[ProxyScaler] = None
+        self._ring: Optional[FrameRing] = None
+        self.timer = DISABLED_TIMER
+        self._grab()
+
+        self._running = False
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """Starts frame grabbing process."""
+        if not self._running:
+            if self._ring:
+                self._ring.restart_rate()
+            self._running = True
+            self._thread = Thread(target=self._update, daemon=True)
+            self._thread.start()
+
+    def _grab(self) -> None:
+        """
+        Grabs a frame from the device and stores it into the frame ring.
+
+        The frame is only decoded if a reader requested it, straight into
+        the next slot of the ring, and then its analysis proxy is computed.
+        If the device returns a frame with a different shape (or no ring
+        exists yet) the ring is reallocated to fit it, keeping the frame
+        identifiers increasing, and the previous ring is retired.
+        """
+        if not self._device.grab():
+            return
+        timestamp = monotonic()
+        if self._ring and not self._ring.requested:
+            self._ring.skip(timestamp)
+            return
+        slot = self._ring.next_slot() if self._ring else None
+        grabbed, image = self._device.retrieve(slot)
+        if not grabbed:
+            return
+        encoded = self._device.get_encoded()
+        if image is not slot:
+            scaler = ProxyScaler(image.shape, self._proxy_width)
+            previous = self._ring
+            ring = FrameRing(
+                self._buffer_size,
+                image.shape,
+                image.dtype,
+                scaler.shape,
+                last_id=previous.last_id if previous else -1
+            )
+            np.copyto(ring.next_slot(), image)
+            scaler(image, ring.next_proxy())
+            self._encoded = (ring.last_id + 1, encoded) if encoded else None
+            ring.publish(timestamp)
+            self._scaler, self._ring = scaler, ring
+            if previous:
+                previous.retire()
+            return
+        started = self.timer.start()
+        self._scaler(image, self._ring.next_proxy())
+        self.timer.record('grayscale', started)
+        self._encoded = (self._ring.last_id + 1, encoded) if encoded else None
+        self._ring.publish(timestamp)
+
+    def _update(self) -> None:
+        """
+        Updates data with latest frame available.
+
+        This functions is executed in a separated thread because frame
+        reading is a blocking operation. Every frame grabbed is stored
+        temporarily into the frame ring.
+        """
+        while self._running:
+            self._grab()
+
+    def get_frame(self) -> Frame:
+        """
+        Returns the latest stored frame without copying it.
+
+        If the device is grabbing and the latest grabbed frame was not
+        decoded, it waits until it is.
+
+        Returns:
+            The latest frame, its image is a read-only view.
+        """
+        frame = None
+        if self._running:
+            frame = self._ring.wait(-1, self.REQUEST_TIMEOUT)
+        return frame or self._ring.latest()
+
+    def get_encoded(self, frame_id: int) -> Optional[bytes]:
+        """
+        Gets a frame as delivered by a device in MJPEG passthrough mode.
+
+        Args:
+            frame_id: Identifier of the frame.
+
+        Returns:
+            The JPEG image of the frame, or None if it is not available
+            (the device does not deliver compressed frames or the frame is
+            not the latest one).
+        """
+        encoded = self._encoded
+        if encoded is None or encoded[0] != frame_id:
+            return None
+        return encoded[1]
+
+    def wait_for_frame(
+            self,
+            after_id=-1,
+            timeout: Optional[float] = None
+    ) -> Optional[Frame]:
+        """
+        Blocks until a frame newer than the given one is grabbed.
+
+        The frame is decoded on request, so frames are only decoded while
+        someone is waiting for them.
+
+        Args:
+            after_id: Identifier of the last frame known by the caller.
+            timeout: Maximum time to wait in seconds (None waits forever).
+
+        Returns:
+            The latest frame, its image is a read-only view. None if no
+            newer frame is grabbed before the timeout expires.
+        """
+        ring = self._ring
+        if ring is None:
+            return None
+        frame = ring.wait(after_id, timeout)
+        if frame is None and ring is not self._ring:
+            # The ring was reallocated, its first frame is newer
+            return self._ring.latest()
+        return frame
+
+    def read_frame(
+            self,
+            timestamp=True,
+            after_id: Optional[int] = None,
+            timeout: Optional[float] = None
+    ) -> Frame:
+        """
+        Returns the latest stored frame along with its analysis proxy.
+
+        Args:
+            timestamp: If True a timestamp is printed on the returned frame.
+            after_id: If given, blocks until a frame newer than this one is
+                grabbed instead of returning the latest frame right away.
+            timeout: Maximum time to wait for a newer frame, when it expires
+                the latest frame is returned even if it is not newer.
+
+        Returns:
+            The frame. Without timestamp its image is a read-only view, with
+            timestamp it is a copy. The proxy is always a read-only view.
+        """
+        if after_id is None:
+            frame = self.get_frame()
+        else:
+            frame = self.wait_for_frame(after_id, timeout) \
+                or self._ring.latest()
+        if timestamp:
+            frame = self.add_timestamp(frame)
+        return frame
+
+    def add_timestamp(self, frame: Frame) -> Frame:
+        """
+        Prints the capture time on a frame.
+
+        Args:
+            frame: The frame to be stamped. If its image is writable it is
+                stamped in place, otherwise it is copied.
+
+        Returns:
+            The frame with the stamped image.
+        """
+        image = frame.image
+        if not image.flags.writeable:
+            image = image.copy()
+        self._overlay.apply(image, frame.timestamp)
+        return frame._replace(image=image)
+
+    def read(
+            self,
+            timestamp=True,
+            after_id: Optional[int] = None,
+            timeout: Optional[float] = None
+    ) -> Tuple[int, np.ndarray]:
+        """
+        Returns the latest stored frame.
+
+        Args:
+            timestamp: If True a timestamp is printed on the returned frame.
+            after_id: If given, blocks until a frame newer than this one is
+                grabbed instead of returning the latest frame right away.
+            timeout: Maximum time to wait for a newer frame, when it expires
+                the latest frame is returned even if it is not newer.
+
+        Returns:
+            A tuple with the unique identifier of the frame and the frame
+            itself. Without timestamp the frame is a read-only view, with
+            timestamp it is a copy.
+        """
+        frame = self.read_frame(timestamp, after_id, timeout)
+        return frame.id, frame.image
+
+    def stop(self) -> None:
+        """Stops frame grabbing process."""
+        self._running = False
+        if self._thread:
+            self._thread.join()
+
+    @property
+    def fps(self) -> float:
+        """
+        Estimates actual frames per seconds value.
+
+        The value is a moving average of the intervals between the latest
+        grabbed frames (see `FrameRing`).
+
+        Note:
+            This is necessary because FPS value returned by OpenCV could be
+            not accurate.
+
+        Returns:
+            Current FPS value, 0 if it can not be estimated yet.
+        """
+        return self._ring.fps
+
+    @property
+    def frame_size(self) -> Tuple[int, int]:
+        """
+        Gets the frame resolution based in the last grabbed frame.
+
+        Returns:
+            Tuple with frame width and height.
+        """
+        height, width = self._ring.shape[:2]
+        return width, height
+
+    def __del__(self) -> None:
+        """Releases video capture before object is destroyed."""
+        self._device.release()
+
+
+def _capture_process(  # pylint: disable=too-many-arguments
+        source: SourceType,
+        buffer_size: int,
+        proxy_width: int,
+        connection: Connection,
+        condition: Any,
+        grabbing: Any,
+        closed: Any
+) -> None:
+    """
+    Grabs frames from a device into a shared frame ring.
+
+    This function is the entry point of the capture process used by
+    `ProcessCameraDevice`. It sends the frame format through the connection
+    and waits for the name of the shared ring to write into. Frames are
+    only decoded when requested through the ring, and frames with a
+    different resolution are resized to fit it.
+
+    Args:
+        source: Video source to be opened by the process.
+        buffer_size: Number of frames kept in the frame ring.
+        proxy_width: Width of the analysis proxies.
+        connection: Connection with the parent process.
+        condition: Condition of the shared frame ring.
+        grabbing: Event set while frames must be grabbed.
+        closed: Event set when the process must end.
+    """
+    device = open_source(source)
+    grabbed, image = device.read() if device.is_opened() else (False, None)
+    if not grabbed:
+        connection.send(None)
+        return
+    scaler = ProxyScaler(image.shape, proxy_width)
+    connection.send((image.shape, image.dtype.str, scaler.shape))
+    ring = SharedFrameRing(
+        buffer_size,
+        image.shape,
+        image.dtype,
+        scaler.shape,
+        condition,
+        name=connection.recv()
+    )
+    np.copyto(ring.next_slot(), image)
+    scaler(image, ring.next_proxy())
+    ring.publish(monotonic())
+    connection.send(True)
+
+    while not closed.is_set():
+        if not grabbing.wait(ProcessCameraDevice.POLL_INTERVAL):
+            continue
+        if not device.grab():
+            continue
+        timestamp = monotonic()
+        if not ring.requested:
+            ring.skip(timestamp)
+            continue
+        slot = ring.next_slot()
+        grabbed, image = device.retrieve(slot)
+        if not grabbed:
+            continue
+        if image is not slot:
+            cv2.resize(image, (slot.shape[1], slot.shape[0]), dst=slot)
+        scaler(slot, ring.next_proxy())
+        ring.publish(timestamp)
+
+    ring.close()
+    device.release()
+
+
+class ProcessCameraDevice(CameraDevice):  # pylint: disable=too-many-instance-attributes
+    """
+    Camera device grabbing frames in a separate process.
+
+    The device is read by a child process that writes every frame into a
+    `SharedFrameRing`, so capture does not compete for the GIL with motion
+    analysis, encoding or the bot threads. Frames are read from the shared
+    memory without copies, exactly as with `CameraDevice`.
+
+    Note:
+        It requires Python 3.8 or newer. When the ``spawn`` start method is
+        used the source must be picklable.
+
+    Args:
+        source: Video source, a video capturing device ID, a source spec or
+            a `FrameSource` (see `open_source`).
+        buffer_size: Number of frames kept in the frame ring.
+        proxy_width: Width of the analysis proxies.
+    """
+    POLL_INTERVAL = 0.5
+    """Time (in seconds) the capture process waits between state checks."""
+
+    def __init__(  # pylint: disable=super-init-not-called
+            self,
+            source: SourceType = 0,
+            buffer_size=8,
+            proxy_width=CameraDevice.PROXY_WIDTH
+    ) -> None:
+        if shared_memory is None:  # pragma: no cover
+            raise CaptureProcessNotAvailable
+
+        SharedFrameRing.share_tracker()
+        context = multiprocessing.get_context()
+        condition = context.Condition()
+        self._grabbing = context.Event()
+        self._closed = context.Event()
+        connection, child_connection = context.Pipe()
+        self._process = context.Process(
+            target=_capture_process,
+            args=(
+                source,
+                buffer_size,
+                proxy_width,
+                child_connection,
+                condition,
+                self._grabbing,
+                self._closed
+            ),
+            daemon=True
+        )
+        self._process.start()
+
+        self._ring: Optional[SharedFrameRing] = None
+        frame_format = connection.recv()
+        if frame_format is None:
+            self._process.join()
+            raise CameraConnectionError
+        shape, dtype, proxy_shape = frame_format
+        self._ring = SharedFrameRing(
+            buffer_size,
+            shape,
+            dtype,
+            proxy_shape,
+            condition
+        )
+        connection.send(self._ring.name)
+        connection.recv()  # First frame is available
+
+        self._buffer_size = buffer_size
+        self._overlay = TimestampOverlay()
+        self._encoded = None  # MJPEG passthrough is not supported
+        self.timer = DISABLED_TIMER  # Proxies are not measured in the process
+        self._running = False
+
+    def start(self) -> None:
+        """Starts frame grabbing process."""
+        if not self._running:
+            self._ring.restart_rate()
+            self._running = True
+            self._grabbing.set()
+
+    def stop(self) -> None:
+        """Stops frame grabbing process."""
+        self._running = False
+        self._grabbing.clear()
+
+    def __del__(self) -> None:
+        """Ends the capture process and frees the shared frame ring."""
+        self._closed.set()
+        self._grabbing.clear()
+        self._process.join()
+        if self._ring:
+            self._ring.close()
+            self._ring.unlink()
+
+
+class TimedVideoWriter:
+    """
+    Video writer placing frames by their capture timestamps.
+
+    The video has a constant frame rate and every frame is written into the
+    slots matching the time elapsed since the first frame. Frames are
+    repeated when the camera is slower than the video and dropped when it
+    is faster, so the video duration and its playback speed follow the
+    real time even if the camera frame rate changes while recording.
+
+    Args:
+        path: Path of the video file.
+        codec: FourCC string of the video codec.
+        fps: Frame rate of the video.
+        frame_size: Width and height of the frames.
+    """
+    def __init__(
+            self,
+            path: str,
+            codec: str,
+            fps: float,
+            frame_size: Tuple[int, int]
+    ) -> None:
+        self.fps = fps
+        self._writer = cv2.VideoWriter(
+            path,
+            cv2.VideoWriter_fourcc(*codec),
+            fps,
+            frame_size
+        )
+        self._start: Optional[float] = None
+        self._written = 0
+
+    @property
+    def duration(self) -> float:
+        """Duration (in seconds) of the video written so far."""
+        return self._written / self.fps
+
+    def write(self, image: np.ndarray, timestamp: float) -> None:
+        """
+        Writes a frame into the video.
+
+        Args:
+            image: The frame to be written.
+            timestamp: Capture time (in seconds of the monotonic clock) of
+                the frame.
+        """
+        if self._start is None:
+            self._start = timestamp
+        slot = round((timestamp - self._start) * self.fps)
+        while self._written <= slot:
+            self._writer.write(image)
+            self._written += 1
+
+    def release(self) -> None:
+        """Closes the video file."""
+        self._writer.release()
@@ -0,0 +1,911 @@
+"""
+Module for the bot configuration of the detection.
+
+This module contains the `DetectionConfig` class, base of
+`bot_config.BotConfig`, that implements the configuration of the motion and
+sound detection (per camera motion detectors, analysis rates and regions,
+and the audio threshold and bands) along with the questions and input
+handlers shared by every setting.
+"""
+from math import isfinite
+from typing import Callable, List, Sequence
+
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    ParseMode,
+    Update
+)
+from telegram.ext import CallbackContext, ConversationHandler
+from telegram.utils.helpers import escape_markdown
+
+from surveillance_bot.audio import MIN_DBFS, format_bands, parse_bands
+from surveillance_bot.camera import Camera
+from surveillance_bot.motion import (
+    DEFAULT_DETECTOR,
+    DETECTORS,
+    format_regions,
+    parse_regions
+)
+
+
+class DetectionConfig:  # pylint: disable=too-few-public-methods
+    """
+    Base class of the bot configuration with the conversation states and
+    the detection settings.
+
+    This class defines every state of the configuration conversation and
+    implements the configuration of the motion and sound detection, along
+    with the questions and input handlers shared by every setting. The
+    settings return to the menu handler given by the caller (see
+    `bot_config.BotConfig`).
+    """
+    # Configuration variables
+    SRV_AUDIO_THRESHOLD = 'srv_audio_threshold'
+    SRV_MOTION_DETECTOR = 'srv_motion_detector'
+    SRV_IDLE_ANALYSIS_FPS = 'srv_idle_analysis_fps'
+    SRV_MOTION_REGIONS = 'srv_motion_regions'
+    SRV_AUDIO_BANDS = 'srv_audio_bands'
+
+    # State definitions for top level conversation
+    MAIN_MENU, GENERAL_CONFIG, SURVEILLANCE_CONFIG = map(chr, range(3))
+
+    # State definitions for second level conversation
+    (
+        CHANGE_TIMESTAMP,
+        CHANGE_OD_VIDEO_DURATION,
+        CHANGE_SRV_VIDEO_DURATION,
+        CHANGE_SRV_AUDIO_DURATION,
+        CHANGE_SRV_PICTURE_INTERVAL,
+        CHANGE_SRV_MOTION_CONTOURS,
+        CHANGE_SRV_VIDEO_THRESHOLD,
+        CHANGE_SRV_AUDIO_THRESHOLD
+    ) = map(chr, range(3, 11))
+
+    # State definitions for input conversation
+    BOOLEAN_INPUT, INTEGER_INPUT, FLOAT_INPUT = map(chr, range(11, 14))
+
+    # Shortcut for ConversationHandler.END
+    END = ConversationHandler.END
+
+    # Auxiliary constants
+    CURRENT_VARIABLE, RETURN_HANDLER, ENABLE, DISABLE = map(chr, range(14, 18))
+
+    # State definitions for the detection and audio settings, along with
+    # the keys of the camera selection
+    (
+        CHANGE_SRV_MOTION_DETECTOR,
+        CAMERA_INPUT,
+        DETECTOR_INPUT,
+        CURRENT_CAMERA,
+        CHANGE_SRV_IDLE_ANALYSIS_FPS,
+        CAMERA_QUESTION,
+        CHANGE_SRV_MOTION_REGIONS,
+        REGIONS_INPUT,
+        CHANGE_SRV_AUDIO_BANDS,
+        BANDS_INPUT,
+        CHANGE_SRV_AUDIO_PREROLL,
+        DBFS_INPUT,
+        PREROLL_INPUT
+    ) = map(chr, range(18, 31))
+
+    # Detection configuration options.
+
+    @staticmethod
+    def _change_srv_audio_threshold(
+            update: Update,
+            context: CallbackContext,
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Prepares all required data to request the SRV_AUDIO_THRESHOLD
+        configuration to the user.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state DBFS_INPUT.
+        """
+        audio_threshold = context.bot_data[DetectionConfig.SRV_AUDIO_THRESHOLD]
+
+        text = '*Audio threshold*\n' \
+               '\n' \
+               'Current value: *' + escape_markdown(str(audio_threshold), 2) \
+               + ' dBFS*\n' \
+               '\n' \
+               'Type the minimum loudness of sound in dBFS, from \\-120 ' \
+               '\\(very sensitive\\) to 0 \\(e\\.g\\., \\-40\\):'
+
+        DetectionConfig._float_question(
+            update,
+            context,
+            text,
+            DetectionConfig.SRV_AUDIO_THRESHOLD,
+            return_handler
+        )
+        return DetectionConfig.DBFS_INPUT
+
+    @staticmethod
+    def _change_srv_motion_detector(
+            update: Update,
+            context: CallbackContext,
+            cam_ids: Sequence[int],
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Prepares all required data to request the SRV_MOTION_DETECTOR
+        configuration to the user.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            cam_ids: IDs of the cameras of the bot.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state CAMERA_INPUT through `_camera_question` method.
+        """
+        current = DetectionConfig._per_camera_str(
+            context,
+            DetectionConfig.SRV_MOTION_DETECTOR,
+            DEFAULT_DETECTOR
+        )
+
+        return DetectionConfig._camera_question(
+            update,
+            context,
+            f'*Motion detector*\n'
+            f'\n'
+            f'Current value: *{current}*\n'
+            f'\n'
+            f'Select camera:',
+            DetectionConfig._detector_question,
+            cam_ids,
+            return_handler
+        )
+
+    @staticmethod
+    def _change_srv_idle_analysis_fps(
+            update: Update,
+            context: CallbackContext,
+            cam_ids: Sequence[int],
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Prepares all required data to request the SRV_IDLE_ANALYSIS_FPS
+        configuration to the user.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            cam_ids: IDs of the cameras of the bot.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state CAMERA_INPUT through `_camera_question` method.
+        """
+        current = DetectionConfig._per_camera_str(
+            context,
+            DetectionConfig.SRV_IDLE_ANALYSIS_FPS,
+            Camera.IDLE_ANALYSIS_FPS
+        )
+
+        return DetectionConfig._camera_question(
+            update,
+            context,
+            f'*Idle analysis rate*\n'
+            f'\n'
+            f'Current value: *{current}*\n'
+            f'\n'
+            f'Select camera:',
+            DetectionConfig._idle_analysis_fps_question,
+            cam_ids,
+            return_handler
+        )
+
+    @staticmethod
+    def _change_srv_motion_regions(
+            update: Update,
+            context: CallbackContext,
+            cam_ids: Sequence[int],
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Prepares all required data to request the SRV_MOTION_REGIONS
+        configuration to the user.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            cam_ids: IDs of the cameras of the bot.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state CAMERA_INPUT through `_camera_question` method.
+        """
+        current = escape_markdown(
+            DetectionConfig._per_camera_str(
+                context,
+                DetectionConfig.SRV_MOTION_REGIONS,
+                'whole frame'
+            ),
+            version=2
+        )
+
+        return DetectionConfig._camera_question(
+            update,
+            context,
+            f'*Motion regions*\n'
+            f'\n'
+            f'Current value: *{current}*\n'
+            f'\n'
+            f'Select camera:',
+            DetectionConfig._regions_question,
+            cam_ids,
+            return_handler
+        )
+
+    @staticmethod
+    def _change_srv_audio_bands(
+            update: Update,
+            context: CallbackContext,
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Asks the user for the SRV_AUDIO_BANDS configuration.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state BANDS_INPUT.
+        """
+        context.user_data[DetectionConfig.RETURN_HANDLER] = return_handler
+        audio_bands = context.bot_data[DetectionConfig.SRV_AUDIO_BANDS]
+        current = escape_markdown(
+            f'{audio_bands} Hz' if audio_bands else 'disabled',
+            version=2
+        )
+
+        text = f'*Audio bands*\n' \
+               f'\n' \
+               f'Current value: *{current}*\n' \
+               f'\n' \
+               f'Type the frequency bands in Hz separated by `,`, e\\.g\\. ' \
+               f'`300\\-3400, 4000\\-8000` for voices and breaking glass\\. ' \
+               f'Type `none` to detect sound by the audio threshold:'
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=text,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.BANDS_INPUT
+
+    @staticmethod
+    def _per_camera_str(
+            context: CallbackContext,
+            variable: str,
+            default: object
+    ) -> str:
+        """
+        Describes the value of a per camera variable.
+
+        Args:
+            context: The context object for the update.
+            variable: The variable to be described.
+            default: The value of the cameras not configured.
+
+        Returns:
+            The values of the configured cameras followed by the value of
+                the rest of cameras.
+        """
+        values = [
+            f'camera {cam_id}: {value}'
+            for cam_id, value in sorted(context.bot_data[variable].items())
+        ]
+        if values:
+            values.append(f'others: {default}')
+        return ', '.join(values) or str(default)
+
+    # Questions helpers.
+
+    @staticmethod
+    def _render_menu(
+            update: Update,
+            text: str,
+            buttons: List[List[InlineKeyboardButton]]
+    ) -> None:
+        """
+        Builds the inline keyboard for the menu and sends all to the user.
+
+        Args:
+            update: The update to be handled.
+            text: Text for the menu caption.
+            buttons: Array of button rows,
+                each represented by an Array of InlineKeyboardButton objects.
+        """
+        keyboard = InlineKeyboardMarkup(buttons)
+
+        if update.message:
+            update.message.reply_text(
+                text=text,
+                reply_markup=keyboard,
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+        else:
+            update.callback_query.answer()
+            update.callback_query.edit_message_text(
+                text=text,
+                reply_markup=keyboard,
+                parse_mode=ParseMode.MARKDOWN_V2
+            )
+
+    @staticmethod
+    def _boolean_question(
+            update: Update,
+            context: CallbackContext,
+            text: str,
+            current_variable: str,
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Builds a boolean question to send it to the user using received data.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            text: Message to be shown to the users.
+            current_variable: Variable to be set.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state BOOLEAN_INPUT.
+        """
+        context.user_data[DetectionConfig.CURRENT_VARIABLE] = current_variable
+        context.user_data[DetectionConfig.RETURN_HANDLER] = return_handler
+
+        buttons = [[
+            InlineKeyboardButton(
+                text='Enable',
+                callback_data=str(DetectionConfig.ENABLE)
+            ),
+            InlineKeyboardButton(
+                text='Disable',
+                callback_data=str(DetectionConfig.DISABLE)
+            ),
+        ]]
+        keyboard = InlineKeyboardMarkup(buttons)
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=text,
+            reply_markup=keyboard,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.BOOLEAN_INPUT
+
+    @staticmethod
+    def _integer_question(
+            update: Update,
+            context: CallbackContext,
+            text: str,
+            current_variable: str,
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Builds a integer question to send it to the user using received data.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            text: Message to be shown to the users.
+            current_variable: Variable to be set.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state INTEGER_INPUT.
+        """
+        context.user_data[DetectionConfig.CURRENT_VARIABLE] = current_variable
+        context.user_data[DetectionConfig.RETURN_HANDLER] = return_handler
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=text,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.INTEGER_INPUT
+
+    @staticmethod
+    def _float_question(
+            update: Update,
+            context: CallbackContext,
+            text: str,
+            current_variable: str,
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Builds a floating point question to send it to the user using received data.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            text: Message to be shown to the users.
+            current_variable: Variable to be set.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state FLOAT_INPUT.
+        """
+        context.user_data[DetectionConfig.CURRENT_VARIABLE] = current_variable
+        context.user_data[DetectionConfig.RETURN_HANDLER] = return_handler
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=text,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.FLOAT_INPUT
+
+    @staticmethod
+    def _camera_question(  # pylint: disable=too-many-arguments
+            update: Update,
+            context: CallbackContext,
+            text: str,
+            question: Callable[[Update, CallbackContext], str],
+            cam_ids: Sequence[int],
+            return_handler: Callable[[Update, CallbackContext], str]
+    ) -> str:
+        """
+        Builds a camera selection question to send it to the user.
+
+        If there is only one camera it is selected straight away.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+            text: Message to be shown to the users.
+            question: Handler asking for the value of the selected camera.
+            cam_ids: IDs of the cameras of the bot.
+            return_handler: Handler to be called with the user response.
+
+        Returns:
+            The state CAMERA_INPUT, or the execution of the question handler
+                if there is only one camera.
+        """
+        context.user_data[DetectionConfig.CAMERA_QUESTION] = question
+        context.user_data[DetectionConfig.RETURN_HANDLER] = return_handler
+
+        if len(cam_ids) <= 1:
+            context.user_data[DetectionConfig.CURRENT_CAMERA] = \
+                cam_ids[0] if cam_ids else 0
+            return question(update, context)
+
+        buttons = [[
+            InlineKeyboardButton(
+                text=f'Camera {cam_id}',
+                callback_data=str(cam_id)
+            ) for cam_id in cam_ids
+        ]]
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=text,
+            reply_markup=InlineKeyboardMarkup(buttons),
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.CAMERA_INPUT
+
+    @staticmethod
+    def _detector_question(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Asks the user for the motion detection strategy of a camera.
+
+        The camera is stored into the CURRENT_CAMERA user variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The state DETECTOR_INPUT.
+        """
+        cam_id = context.user_data[DetectionConfig.CURRENT_CAMERA]
+        detector = context.bot_data[DetectionConfig.SRV_MOTION_DETECTOR].get(
+            cam_id,
+            DEFAULT_DETECTOR
+        )
+
+        buttons = [[
+            InlineKeyboardButton(text=name, callback_data=name)
+            for name in DETECTORS
+        ]]
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=f'*Motion detector of camera {cam_id}*\n'
+                 f'\n'
+                 f'Current value: *{detector}*\n'
+                 f'\n'
+                 f'Select motion detection strategy:',
+            reply_markup=InlineKeyboardMarkup(buttons),
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.DETECTOR_INPUT
+
+    @staticmethod
+    def _idle_analysis_fps_question(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Asks the user for the idle analysis rate of the camera stored into
+        the CURRENT_CAMERA user variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The state INTEGER_INPUT through `_integer_question` method.
+        """
+        cam_id = context.user_data[DetectionConfig.CURRENT_CAMERA]
+        idle_fps = context.bot_data[DetectionConfig.SRV_IDLE_ANALYSIS_FPS].get(
+            cam_id,
+            Camera.IDLE_ANALYSIS_FPS
+        )
+
+        text = f'*Idle analysis rate of camera {cam_id}*\n' \
+               f'\n' \
+               f'Current value: *{idle_fps}*\n' \
+               f'\n' \
+               f'Type frames analysed per second while idle \\(0 ' \
+               f'analyses every frame\\):'
+
+        return DetectionConfig._integer_question(
+            update,
+            context,
+            text,
+            DetectionConfig.SRV_IDLE_ANALYSIS_FPS,
+            context.user_data[DetectionConfig.RETURN_HANDLER]
+        )
+
+    @staticmethod
+    def _regions_question(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Asks the user for the motion regions of the camera stored into the
+        CURRENT_CAMERA user variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The state REGIONS_INPUT.
+        """
+        cam_id = context.user_data[DetectionConfig.CURRENT_CAMERA]
+        regions = context.bot_data[DetectionConfig.SRV_MOTION_REGIONS].get(
+            cam_id,
+            'whole frame'
+        )
+
+        text = f'*Motion regions of camera {cam_id}*\n' \
+               f'\n' \
+               f'Current value: *{escape_markdown(regions, version=2)}*\n' \
+               f'\n' \
+               f'Type the polygons separated by `;`, with their vertices ' \
+               f'as `x,y` fractions of the frame size separated by spaces\\. ' \
+               f'Prefix a polygon with `\\!` to ignore its motion, e\\.g\\. ' \
+               f'`0,0 1,0 1,0\\.5; \\!0\\.8,0 1,0 1,0\\.2`\\. ' \
+               f'Type `none` to watch the whole frame:'
+
+        update.callback_query.answer()
+        update.callback_query.edit_message_text(
+            text=text,
+            parse_mode=ParseMode.MARKDOWN_V2
+        )
+
+        return DetectionConfig.REGIONS_INPUT
+
+    # Input handlers.
+
+    @staticmethod
+    def _camera_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive the camera selected by the user and asks for its value of
+        the variable being configured.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored question handler.
+        """
+        context.user_data[DetectionConfig.CURRENT_CAMERA] = int(
+            update.callback_query.data
+        )
+        return context.user_data[DetectionConfig.CAMERA_QUESTION](update, context)
+
+    @staticmethod
+    def _detector_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive the motion detection strategy selected by the user and
+        saves it for the current camera.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler.
+        """
+        context.user_data[
+            DetectionConfig.CURRENT_VARIABLE
+        ] = DetectionConfig.SRV_MOTION_DETECTOR
+        DetectionConfig._store_input(context, update.callback_query.data)
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _regions_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive the motion regions typed by the user, validates them, and
+        saves them for the current camera.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler or the state
+                REGIONS_INPUT in case of validation error.
+        """
+        text = update.message.text.strip()
+        try:
+            regions = [] if text.lower() == 'none' else parse_regions(text)
+        except ValueError:
+            update.message.reply_text(
+                text='Invalid value, insert polygons like '
+                     '"0,0 1,0 1,0.5; !0.8,0 1,0 1,0.2" or "none"'
+            )
+            return DetectionConfig.REGIONS_INPUT
+
+        values = dict(context.bot_data[DetectionConfig.SRV_MOTION_REGIONS])
+        values.pop(context.user_data[DetectionConfig.CURRENT_CAMERA], None)
+        context.bot_data[DetectionConfig.SRV_MOTION_REGIONS] = values
+        if regions:
+            context.user_data[
+                DetectionConfig.CURRENT_VARIABLE
+            ] = DetectionConfig.SRV_MOTION_REGIONS
+            DetectionConfig._store_input(context, format_regions(regions))
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _bands_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive the audio bands typed by the user, validates them, and saves
+        them.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler or the state
+                BANDS_INPUT in case of validation error.
+        """
+        text = update.message.text.strip()
+        try:
+            bands = [] if text.lower() == 'none' else parse_bands(text)
+        except ValueError:
+            update.message.reply_text(
+                text='Invalid value, insert bands like "300-3400, 4000-8000" '
+                     'or "none"'
+            )
+            return DetectionConfig.BANDS_INPUT
+
+        context.bot_data[DetectionConfig.SRV_AUDIO_BANDS] = format_bands(bands)
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _boolean_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive a boolean input from the user and saves the value into
+        corresponding variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler.
+        """
+        context.bot_data[
+            context.user_data[DetectionConfig.CURRENT_VARIABLE]
+        ] = update.callback_query.data == DetectionConfig.ENABLE
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _integer_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive a integer input from the user, validates it, and saves the
+        value into corresponding variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler or the state
+                INTEGER_INPUT in case of validation error.
+        """
+        try:
+            value = int(update.message.text)
+            assert value >= 0
+            assert value <= 255
+        except (ValueError, AssertionError):
+            update.message.reply_text(
+                text='Invalid value, insert an integer number between 0 and 255'
+            )
+            return DetectionConfig.INTEGER_INPUT
+
+        DetectionConfig._store_input(context, value)
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _float_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive a floatng point input from the user, validates it, and saves the
+        value into corresponding variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler or the state
+                FLOAT_INPUT in case of validation error.
+        """
+        try:
+            value = float(update.message.text)
+            assert isfinite(value)
+        except (ValueError, AssertionError):
+            update.message.reply_text(
+                text='Invalid value, insert a floating point number'
+            )
+            return DetectionConfig.FLOAT_INPUT
+
+        context.bot_data[
+            context.user_data[DetectionConfig.CURRENT_VARIABLE]
+        ] = value
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _dbfs_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive a sound level in dBFS from the user, validates it, and saves
+        the value into corresponding variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler or the state
+                DBFS_INPUT in case of validation error.
+        """
+        try:
+            value = float(update.message.text)
+            assert isfinite(value)
+            assert MIN_DBFS <= value <= 0
+        except (ValueError, AssertionError):
+            update.message.reply_text(
+                text=f'Invalid value, insert a number between {MIN_DBFS:g} '
+                     f'and 0'
+            )
+            return DetectionConfig.DBFS_INPUT
+
+        DetectionConfig._store_input(context, value)
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _preroll_input(
+            update: Update,
+            context: CallbackContext
+    ) -> str:
+        """
+        Receive the seconds of audio pre-roll from the user, validates them
+        against `Camera.MAX_AUDIO_PREROLL`, and saves the value into
+        corresponding variable.
+
+        Args:
+            update: The update to be handled.
+            context: The context object for the update.
+
+        Returns:
+            The execution of the previously stored handler or the state
+                PREROLL_INPUT in case of validation error.
+        """
+        try:
+            value = int(update.message.text)
+            assert 0 <= value <= Camera.MAX_AUDIO_PREROLL
+        except (ValueError, AssertionError):
+            update.message.reply_text(
+                text=f'Invalid value, insert an integer number between 0 and '
+                     f'{Camera.MAX_AUDIO_PREROLL}'
+            )
+            return DetectionConfig.PREROLL_INPUT
+
+        DetectionConfig._store_input(context, value)
+
+        return context.user_data[DetectionConfig.RETURN_HANDLER](update, context)
+
+    @staticmethod
+    def _store_input(
+            context: CallbackContext,
+            value: object
+    ) -> None:
+        """
+        Saves an input value into the current variable.
+
+        Per camera variables (stored as a dict by camera ID) are set for
+        the current camera.
+
+        Args:
+            context: The context object for the update.
+            value: The value to be saved.
+        """
+        variable = context.user_data[DetectionConfig.CURRENT_VARIABLE]
+        if isinstance(context.bot_data.get(variable), dict):
+            values = dict(context.bot_data[variable])
+            values[context.user_data[DetectionConfig.CURRENT_CAMERA]] = value
+            value = values
+        context.bot_data[variable] = value
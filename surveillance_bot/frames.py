@@ -0,0 +1,421 @@
+"""
+Module for frame storage.
+
+This module implements the ring of preallocated buffers where the capture
+devices store the frames grabbed, either in the memory of the process
+(`FrameRing`) or in memory shared with a capture process
+(`SharedFrameRing`), so frames are read without copies.
+"""
+from threading import Condition
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # pragma: no cover
+    resource_tracker = shared_memory = None  # Python < 3.8
+
+
+class Frame(NamedTuple):
+    """
+    Frame stored in a `FrameRing`.
+
+    Attributes:
+        id: Unique identifier of the frame.
+        timestamp: Time (in seconds of the monotonic clock) the frame was
+            captured.
+        image: Read-only view of the frame image.
+        proxy: Read-only view of the downscaled grayscale version of the
+            image used for analysis (None if the ring has no proxies).
+    """
+    id: int
+    timestamp: float
+    image: np.ndarray
+    proxy: Optional[np.ndarray] = None
+
+
+class FrameRing:  # pylint: disable=too-many-instance-attributes
+    """
+    Fixed-size ring of preallocated frame buffers.
+
+    The capture thread decodes every new frame directly into the slot
+    returned by `next_slot` and then calls `publish` to make it available,
+    so no memory is allocated while grabbing. Readers get read-only views of
+    the slots instead of copies.
+
+    Every slot can have an analysis proxy next to it, a downscaled
+    grayscale version of the frame written through `next_proxy`.
+
+    Frames are only decoded on request: the capture thread grabs every
+    frame but publishes it only if a reader is waiting for a frame (see
+    `requested`), otherwise it just calls `skip`. A reader waiting for a
+    frame always gets one grabbed after it started waiting, if the latest
+    published frame is older than the latest grabbed one.
+
+    The frame rate is estimated from the capture timestamps as an
+    exponentially weighted moving average of the frame intervals, so it
+    follows devices changing their rate (e.g. in low light).
+
+    The whole ring (a small header with frame ids, timestamps and the rate
+    estimation followed by the slots and the proxies) lives in a single
+    buffer, so it can be placed in memory shared between processes.
+
+    Note:
+        A slot is reused after `size` frames, so a reader needing a frame
+        for longer than that must copy it.
+
+    Args:
+        size: Number of slots in the ring.
+        shape: Shape of the frames to be stored.
+        dtype: Data type of the frames to be stored.
+        proxy_shape: Shape of the analysis proxies, no proxies are stored
+            if it is not given.
+        buffer: Memory to place the ring into, of at least `nbytes` bytes.
+            If not given a new one is allocated and initialized.
+        condition: Condition used to notify new frames, it must be shared
+            by every user of the buffer.
+        last_id: Identifier of the latest frame of the ring replaced by
+            this one, so frame identifiers keep increasing.
+    """
+    FPS_WINDOW = 1.0
+    """Time constant (in seconds) of the frame rate average."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            size: int,
+            shape: Tuple[int, ...],
+            dtype: Any = np.uint8,
+            proxy_shape: Optional[Tuple[int, int]] = None,
+            buffer: Any = None,
+            condition: Any = None,
+            last_id=-1
+    ) -> None:
+        dtype = np.dtype(dtype)
+        initialize = buffer is None
+        if initialize:
+            buffer = bytearray(self.nbytes(size, shape, dtype, proxy_shape))
+
+        # Header: latest frame id, request flag and the frame id of every
+        # slot
+        self._header: np.ndarray = np.ndarray((size + 2,), np.int64, buffer)
+        self._timestamps: np.ndarray = np.ndarray(
+            (size,), np.float64, buffer, offset=self._header.nbytes
+        )
+        offset = self._header.nbytes + self._timestamps.nbytes
+        # Rate: timestamp of the previous frame and mean frame interval
+        self._rate: np.ndarray = np.ndarray((2,), np.float64, buffer, offset=offset)
+        offset += self._rate.nbytes
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        self._slots: List[np.ndarray] = [
+            np.ndarray(shape, dtype, buffer, offset + i * frame_bytes)
+            for i in range(size)
+        ]
+        self._views = [self._read_only(slot) for slot in self._slots]
+
+        offset += size * frame_bytes
+        self._proxies: List[np.ndarray] = []
+        self._proxy_views: List[Optional[np.ndarray]] = [None] * size
+        if proxy_shape:
+            proxy_bytes = proxy_shape[0] * proxy_shape[1]
+            self._proxies = [
+                np.ndarray(proxy_shape, np.uint8, buffer, offset + i * proxy_bytes)
+                for i in range(size)
+            ]
+            self._proxy_views = [
+                self._read_only(proxy) for proxy in self._proxies
+            ]
+
+        self._condition = condition or Condition()
+        self._retired = False
+        if initialize:
+            self.reset(last_id)
+
+    @staticmethod
+    def nbytes(
+            size: int,
+            shape: Tuple[int, ...],
+            dtype: Any,
+            proxy_shape: Optional[Tuple[int, int]] = None
+    ) -> int:
+        """
+        Calculates the memory needed to store a ring.
+
+        Args:
+            size: Number of slots in the ring.
+            shape: Shape of the frames to be stored.
+            dtype: Data type of the frames to be stored.
+            proxy_shape: Shape of the analysis proxies.
+
+        Returns:
+            Size of the ring in bytes.
+        """
+        frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if proxy_shape:
+            frame_bytes += proxy_shape[0] * proxy_shape[1]
+        return 8 * (size + 2) + 8 * size + 16 + size * frame_bytes
+
+    @staticmethod
+    def _read_only(array: np.ndarray) -> np.ndarray:
+        """Creates a read-only view of an array."""
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def reset(self, last_id=-1) -> None:
+        """
+        Marks the ring as empty.
+
+        Args:
+            last_id: Identifier the ids of the next frames follow.
+        """
+        self._header.fill(-1)
+        self._header[0] = last_id
+        self._header[1] = 0
+        self._timestamps.fill(0)
+        self.restart_rate()
+
+    def restart_rate(self) -> None:
+        """
+        Restarts the frame rate estimation.
+
+        It must be called when frames start being grabbed continuously, so
+        the time elapsed while the device was stopped is not accounted.
+        """
+        self._rate.fill(0)
+
+    @property
+    def fps(self) -> float:
+        """Estimated frame rate (0 until two frames are grabbed)."""
+        interval = self._rate[1]
+        return 1 / interval if interval > 0 else 0.0
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Shape of the frames stored in the ring."""
+        return self._slots[0].shape
+
+    @property
+    def proxy_shape(self) -> Optional[Tuple[int, ...]]:
+        """Shape of the analysis proxies (None if there are no proxies)."""
+        return self._proxies[0].shape if self._proxies else None
+
+    @property
+    def last_id(self) -> int:
+        """Identifier of the latest published frame (-1 if none)."""
+        return int(self._header[0])
+
+    @property
+    def requested(self) -> bool:
+        """Return if a reader is waiting for the next frame."""
+        return bool(self._header[1])
+
+    def next_slot(self) -> np.ndarray:
+        """
+        Gets the buffer where the next frame must be written.
+
+        Returns:
+            The writable buffer of the next slot.
+        """
+        return self._slots[(self.last_id + 1) % len(self._slots)]
+
+    def next_proxy(self) -> np.ndarray:
+        """
+        Gets the buffer where the proxy of the next frame must be written.
+
+        Returns:
+            The writable proxy buffer of the next slot.
+        """
+        return self._proxies[(self.last_id + 1) % len(self._slots)]
+
+    def publish(self, timestamp: float) -> int:
+        """
+        Makes available the frame written into the next slot.
+
+        Args:
+            timestamp: Capture time of the frame.
+
+        Returns:
+            The identifier assigned to the frame.
+        """
+        with self._condition:
+            frame_id = self.last_id + 1
+            index = frame_id % len(self._slots)
+            self._header[index + 2] = frame_id
+            self._timestamps[index] = timestamp
+            self._header[0] = frame_id
+            self._header[1] = 0
+            self._update_rate(timestamp)
+            self._condition.notify_all()
+        return frame_id
+
+    def retire(self) -> None:
+        """
+        Marks the ring as replaced, waking up the readers waiting on it.
+
+        Readers waiting for a frame get None, as if their timeout expired.
+        """
+        with self._condition:
+            self._retired = True
+            self._condition.notify_all()
+
+    def skip(self, timestamp: float) -> None:
+        """
+        Accounts a frame grabbed but not decoded nor published.
+
+        Args:
+            timestamp: Capture time of the frame.
+        """
+        self._update_rate(timestamp)
+
+    def _update_rate(self, timestamp: float) -> None:
+        """Adds the interval until the given frame to the rate average."""
+        previous, mean = self._rate
+        self._rate[0] = timestamp
+        if not previous or timestamp <= previous:
+            return
+        interval = timestamp - previous
+        if not mean:
+            self._rate[1] = interval
+        else:
+            weight = min(1.0, interval / self.FPS_WINDOW)
+            self._rate[1] = mean + weight * (interval - mean)
+
+    def latest(self) -> Frame:
+        """
+        Gets the latest published frame.
+
+        Returns:
+            The latest frame with a read-only view of its image.
+        """
+        with self._condition:
+            return self._latest()
+
+    def wait(self, after_id: int, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        Blocks until a frame newer than the given one is published.
+
+        If frames have been grabbed since the latest frame was published,
+        it waits for a newer frame too. Waiting requests the next frame to
+        be published.
+
+        Args:
+            after_id: Identifier of the last frame known by the caller.
+            timeout: Maximum time to wait in seconds (None waits forever).
+
+        Returns:
+            The latest frame or None if the timeout expires (or the ring is
+            retired) before a newer frame is published.
+        """
+        with self._condition:
+            last_id = self.last_id
+            if last_id >= 0 and self._rate[0] > \
+                    self._timestamps[last_id % len(self._slots)]:
+                after_id = max(after_id, last_id)
+            if last_id <= after_id:
+                self._header[1] = 1
+            self._condition.wait_for(
+                lambda: self._retired or self.last_id > after_id,
+                timeout
+            )
+            if self.last_id <= after_id:
+                return None
+            return self._latest()
+
+    def _latest(self) -> Frame:
+        """Builds the latest frame, the condition must be already held."""
+        index = self.last_id % len(self._slots)
+        return Frame(
+            int(self._header[index + 2]),
+            float(self._timestamps[index]),
+            self._views[index],
+            self._proxy_views[index]
+        )
+
+
+class SharedFrameRing(FrameRing):  # pylint: disable=too-many-instance-attributes
+    """
+    Frame ring placed into shared memory.
+
+    It allows a capture process to write frames that other processes read
+    without copying them. The process creating the ring owns the shared
+    memory block and must unlink it, the rest of processes attach to it by
+    name.
+
+    Note:
+        It requires Python 3.8 or newer (see
+        `capture.ProcessCameraDevice`).
+
+    Args:
+        size: Number of slots in the ring.
+        shape: Shape of the frames to be stored.
+        dtype: Data type of the frames to be stored.
+        proxy_shape: Shape of the analysis proxies.
+        condition: Multiprocessing condition used to notify new frames.
+        name: Name of an existing ring to attach to. If not given a new
+            shared memory block is created.
+    """
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            size: int,
+            shape: Tuple[int, ...],
+            dtype: Any,
+            proxy_shape: Optional[Tuple[int, int]],
+            condition: Any,
+            name: Optional[str] = None
+    ) -> None:
+        create = name is None
+        self._memory = shared_memory.SharedMemory(
+            name=name,
+            create=create,
+            size=self.nbytes(size, shape, dtype, proxy_shape) if create else 0
+        )
+        super().__init__(
+            size,
+            shape,
+            dtype,
+            proxy_shape,
+            self._memory.buf,
+            condition
+        )
+        # Attaching tracks the block again (see bpo-39959), which is harmless
+        # if the resource tracker of the owner is shared (see
+        # `share_tracker`), as it tracks every block once
+        if create:
+            self.reset()
+
+    @staticmethod
+    def share_tracker() -> None:
+        """
+        Starts the resource tracker, so the processes started next share it.
+
+        It must be called before starting the processes attaching to the
+        rings, otherwise they would start their own tracker, which destroys
+        the rings when the process ends.
+        """
+        resource_tracker.ensure_running()
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._memory.name
+
+    def close(self) -> None:
+        """
+        Detaches from the shared memory block.
+
+        Note:
+            If any frame view is still referenced the block stays mapped
+            until the process ends.
+        """
+        self._header = self._timestamps = self._rate = np.empty(0)
+        self._slots = self._views = self._proxies = []
+        self._proxy_views = []
+        try:
+            self._memory.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        """Destroys the shared memory block, only called by its owner."""
+        self._memory.unlink()
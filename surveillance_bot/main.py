@@ -10,6 +10,16 @@ BOT_API_TOKEN = os.environ.get('BOT_API_TOKEN', '')
 PERSISTENCE_DIR = os.environ.get('PERSISTENCE_DIR', None)
 LOG_LEVEL = os.environ.get('LOG_LEVEL', logging.WARNING)
 BOT_LOG_LEVEL = os.environ.get('BOT_LOG_LEVEL', None)
+CAMERA_IDS = {
+    int(cam_id): source or int(cam_id)
+    for cam_id, _, source in (
+        camera.partition('=')
+        for camera in os.environ.get('CAMERA_IDS', '0').split(',')
+    )
+}
+CAPTURE_PROCESS = os.environ.get('CAPTURE_PROCESS', '').lower() in (
+    '1', 'true', 'yes'
+)
 
 
 # Logging config.
@@ -27,7 +37,9 @@ def main() -> None:
         token=BOT_API_TOKEN,
         username=AUTHORIZED_USER,
         persistence_dir=PERSISTENCE_DIR,
-        log_level=BOT_LOG_LEVEL
+        log_level=BOT_LOG_LEVEL,
+        cam_ids=CAMERA_IDS,
+        capture_process=CAPTURE_PROCESS
     )
     surveillance_bot.start()
 
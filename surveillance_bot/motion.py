@@ -0,0 +1,749 @@
+"""
+Module for motion detection.
+
+This module implements the `MotionDetector` interface used by the
+surveillance mode along with several detection strategies: differencing of
+consecutive frames, a running average background model and the OpenCV
+background subtractors (MOG2 and KNN). Detectors work on the grayscale
+analysis proxies of the frames, optionally restricted to some regions of
+them. The `MotionHeatmap` accumulates the foreground masks over time to
+show where motion concentrates, and the `StageTimer` measures the time
+spent in every stage of the analysis.
+"""
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from time import perf_counter
+from typing import DefaultDict, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+import cv2
+import numpy as np
+
+
+MOTION_BOX = np.dtype([
+    ('x', np.int32),
+    ('y', np.int32),
+    ('width', np.int32),
+    ('height', np.int32),
+    ('area', np.int32)
+])
+"""Record of an area in motion: its bounding box and area (in pixels)."""
+
+
+class Region(NamedTuple):
+    """
+    Polygonal region of the frames.
+
+    Attributes:
+        points: Vertices of the polygon, as (x, y) fractions of the frame
+            width and height.
+        exclude: True if motion in the region is ignored, False if motion is
+            only detected inside the region (and the rest of included
+            regions).
+    """
+    points: Tuple[Tuple[float, float], ...]
+    exclude: bool = False
+
+
+def parse_regions(spec: str) -> List[Region]:
+    """
+    Parses a textual description of regions.
+
+    Regions are separated by semicolons and their vertices by spaces, every
+    vertex is a pair of comma separated fractions of the frame width and
+    height. Exclusion regions are prefixed with an exclamation mark, e.g.
+    ``0,0 1,0 1,0.5; !0.8,0 1,0 1,0.2`` (top half of the frame but its
+    upper right corner).
+
+    Args:
+        spec: Description of the regions, empty for no regions.
+
+    Returns:
+        The regions described.
+
+    Raises:
+        ValueError: If the description is not valid.
+    """
+    regions = []
+    for polygon in spec.split(';'):
+        polygon = polygon.strip()
+        if not polygon:
+            continue
+        exclude = polygon.startswith('!')
+        points = tuple(
+            tuple(float(value) for value in point.split(','))
+            for point in polygon.lstrip('!').split()
+        )
+        if len(points) < 3:
+            raise ValueError(f'Region with less than 3 vertices: {polygon}')
+        for point in points:
+            if len(point) != 2 or not all(0 <= value <= 1 for value in point):
+                raise ValueError(f'Invalid vertex: {point}')
+        regions.append(Region(points, exclude))  # type: ignore
+    return regions
+
+
+def format_regions(regions: Sequence[Region]) -> str:
+    """
+    Describes regions in the format read by `parse_regions`.
+
+    Args:
+        regions: The regions to be described.
+
+    Returns:
+        The description of the regions.
+    """
+    return '; '.join(
+        ('!' if region.exclude else '')
+        + ' '.join(f'{x:g},{y:g}' for x, y in region.points)
+        for region in regions
+    )
+
+
+def rasterize_regions(
+        regions: Sequence[Region],
+        shape: Tuple[int, ...]
+) -> Optional[np.ndarray]:
+    """
+    Builds the bitmask of the pixels inside the regions.
+
+    Args:
+        regions: The regions to be rasterized.
+        shape: Shape of the images.
+
+    Returns:
+        A binary image, 255 for the analysed pixels and 0 for the ignored
+        ones, or None if there are no regions.
+    """
+    if not regions:
+        return None
+    height, width = shape[:2]
+    included = any(not region.exclude for region in regions)
+    mask = np.full((height, width), 0 if included else 255, np.uint8)
+    # Inclusions are drawn first, so exclusions always take precedence
+    for region in sorted(regions, key=lambda region: region.exclude):
+        points = np.array(region.points) * (width - 1, height - 1)
+        contours = [np.round(points).astype(np.int32)]
+        color = (0,) if region.exclude else (255,)
+        cv2.fillPoly(mask, contours, color)
+    return mask
+
+
+class StageTimer:
+    """
+    Measures the time spent in the stages of the motion analysis.
+
+    Stages are timed from a start time, so stages run by different threads
+    can share a timer. A disabled timer does not read the clock, so
+    instrumented code costs a couple of method calls per stage.
+
+    Args:
+        enabled: If False nothing is measured.
+    """
+    def __init__(self, enabled=True) -> None:
+        self.enabled = enabled
+        self.samples: DefaultDict[str, List[float]] = defaultdict(list)
+
+    def start(self) -> float:
+        """
+        Gets the start time of a stage.
+
+        Returns:
+            The current time, 0 if the timer is disabled.
+        """
+        return perf_counter() if self.enabled else 0.0
+
+    def record(self, stage: str, started: float) -> float:
+        """
+        Records the time spent in a stage.
+
+        Args:
+            stage: Name of the stage.
+            started: Start time of the stage (see `start`).
+
+        Returns:
+            The current time, to be used as start time of the next stage.
+        """
+        if not self.enabled:
+            return 0.0
+        now = perf_counter()
+        self.samples[stage].append(now - started)
+        return now
+
+
+DISABLED_TIMER = StageTimer(enabled=False)
+"""Timer used when the stages are not measured."""
+
+
+class MotionDetector(ABC):  # pylint: disable=too-many-instance-attributes
+    """
+    Base class for motion detection strategies.
+
+    Every frame is blurred to remove noise and then the strategy builds a
+    foreground mask, a binary image of the pixels that changed. The mask is
+    split into a grid of cells and the changed pixels of every cell are
+    counted at once, by resizing the mask to the grid size with
+    `cv2.INTER_AREA` interpolation, which averages the pixels of every cell.
+    Cells with enough changes are in motion. Only if any cell is in motion,
+    the foreground of the bounding box of these cells is closed and its
+    connected components are measured at once, so scenes without motion
+    skip the costly stages. Areas in motion are returned as an array of
+    `MOTION_BOX` records.
+
+    Detection does not allocate images: the working buffers are allocated
+    for the first frame and every OpenCV operation writes into them, they
+    are reallocated (and the strategy restarted) if the frame shape
+    changes. The closing kernel is built once. Cells in motion without
+    areas big enough to be reported mark the motion as suspected (see the
+    `suspected` attribute).
+
+    Stages are measured by the `timer` attribute (blur, diff, grid,
+    morphology and contour stages).
+
+    If regions are given they are rasterized once into a bitmask at the
+    resolution of the analysed images. The analysis is cropped to the
+    bounding box of the mask and the mask is applied to the foreground
+    before the cells are counted.
+
+    Sizes are given for full resolution frames and scaled to the analysis
+    proxies.
+
+    Args:
+        threshold: Sensitivity of the detection, the minimum intensity
+            change of a pixel in motion.
+        scale: Scale of the analysed images relative to the frames.
+        regions: Regions where motion is detected or ignored.
+    """
+    NAME = ''
+    """Name of the strategy used to select it."""
+
+    BLUR_SIZE = 21
+    """Size of the blur applied before motion detection."""
+
+    KERNEL_SIZE = 40
+    """Size of the kernel used to close motion areas."""
+
+    MIN_AREA = 2000
+    """Minimum area of a motion box."""
+
+    CELL_SIZE = 32
+    """Size of the cells of the motion grid."""
+
+    CELL_RATIO = 0.05
+    """Minimum fraction of changed pixels of a cell in motion."""
+
+    def __init__(
+            self,
+            threshold=5,
+            scale=1.0,
+            regions: Sequence[Region] = ()
+    ) -> None:
+        self.threshold = threshold
+        self.scale = scale
+        self.regions = tuple(regions)
+        self._blur_size = int(self.BLUR_SIZE * scale) // 2 * 2 + 1
+        self._kernel_size = max(1, round(self.KERNEL_SIZE * scale))
+        self._min_area = self.MIN_AREA * scale ** 2
+        self._cell_size = max(1, round(self.CELL_SIZE * scale))
+        self._kernel = cv2.getStructuringElement(
+            cv2.MORPH_RECT,
+            (self._kernel_size, self._kernel_size)
+        )
+        self._shape: Optional[Tuple[int, ...]] = None
+        self._crop: Optional[Tuple[slice, slice]] = None
+        self._offset = (0, 0)
+        self._region_mask: Optional[np.ndarray] = None
+        self._blurred = np.empty(0, np.uint8)
+        self._mask = np.empty(0, np.uint8)
+        self._closed = np.empty(0, np.uint8)
+        self._labels = np.empty(0, np.int32)
+        self._padded = np.empty((0, 0), np.uint8)
+        self._cells = np.empty((0, 0), np.uint8)
+        self._lit = np.empty((0, 0), np.bool_)
+        self._cell = 1
+        self._written = False
+        self.suspected = False
+        self.timer = DISABLED_TIMER
+
+    def _configure(self, shape: Tuple[int, ...]) -> None:
+        """
+        Prepares the detection of images of the given shape.
+
+        The regions are rasterized, the analysed area is cropped to them
+        and the working buffers are allocated.
+
+        Args:
+            shape: Shape of the images.
+        """
+        self._shape = shape
+        mask = rasterize_regions(self.regions, shape)
+        if mask is None:
+            self._crop, self._offset = (slice(None), slice(None)), (0, 0)
+            self._region_mask = None
+            self._allocate(shape)
+            return
+
+        x, y, width, height = cv2.boundingRect(mask)
+        if not width or not height:
+            self._crop = None  # Whole frame is excluded
+            return
+        self._crop = (slice(y, y + height), slice(x, x + width))
+        self._offset = (x, y)
+        self._region_mask = mask[self._crop].copy()
+        if self._region_mask.all():
+            self._region_mask = None
+        self._allocate((height, width) + tuple(shape[2:]))
+
+    def _allocate(self, shape: Tuple[int, ...]) -> None:
+        """
+        Allocates the working buffers for images of the given shape.
+
+        The foreground mask is padded to a whole number of cells, the
+        padding is never written so it does not count as motion.
+
+        Args:
+            shape: Shape of the analysed images.
+        """
+        height, width = shape[:2]
+        self._cell = cell = min(self._cell_size, height, width)
+        rows, cols = -(-height // cell), -(-width // cell)
+        self._padded = np.zeros((rows * cell, cols * cell), np.uint8)
+        self._cells = np.empty((rows, cols), np.uint8)
+        self._lit = np.empty((rows, cols), np.bool_)
+        self._blurred = np.empty(shape, np.uint8)
+        self._mask = self._padded[:height, :width]
+        self._closed = np.empty(shape, np.uint8)
+        self._labels = np.empty(shape, np.int32)
+
+    def reset(self) -> None:
+        """Restarts the detection, forgetting the previous frames."""
+        self._shape = None
+
+    @property
+    def foreground(self) -> Optional[np.ndarray]:
+        """
+        Foreground mask of the latest frame, restricted to the regions.
+
+        It covers the analysed area (see `crop`) and it is overwritten by
+        the following frames. None if the latest frame did not produce a
+        mask (e.g. while the strategy learns the scene).
+        """
+        return self._mask if self._written else None
+
+    @property
+    def crop(self) -> Optional[Tuple[slice, slice]]:
+        """Analysed area of the frames, None if it is empty."""
+        return self._crop
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        """
+        Detects motion in a new frame.
+
+        Args:
+            image: The grayscale frame to be analysed.
+
+        Returns:
+            An array of `MOTION_BOX` records with the areas in motion (in
+            pixels of the analysed frame), empty if there is no motion or
+            the strategy is still learning the scene.
+        """
+        timer = self.timer
+        ready = self._shape == image.shape
+        if not ready:
+            self._configure(image.shape)
+        self.suspected = self._written = False
+        if self._crop is None:
+            return np.empty(0, MOTION_BOX)
+
+        started = timer.start()
+        cv2.GaussianBlur(
+            image[self._crop],
+            (self._blur_size, self._blur_size),
+            0,
+            dst=self._blurred
+        )
+        started = timer.record('blur', started)
+        if not self._foreground(self._blurred, self._mask, ready):
+            return np.empty(0, MOTION_BOX)
+        if self._region_mask is not None:
+            cv2.bitwise_and(self._mask, self._region_mask, dst=self._mask)
+        self._written = True
+        started = timer.record('diff', started)
+
+        # Mean of every cell, the fraction of changed pixels times 255
+        cv2.resize(
+            self._padded,
+            self._cells.shape[::-1],
+            dst=self._cells,
+            interpolation=cv2.INTER_AREA
+        )
+        np.greater_equal(self._cells, self.CELL_RATIO * 255, out=self._lit)
+        rows = np.flatnonzero(self._lit.any(axis=1))
+        started = timer.record('grid', started)
+        if not rows.size:
+            return np.empty(0, MOTION_BOX)
+        self.suspected = True
+        cols = np.flatnonzero(self._lit.any(axis=0))
+
+        # Bounding box of the cells in motion, with room for the closing
+        cell, margin = self._cell, self._kernel_size
+        top = max(0, rows[0] * cell - margin)
+        left = max(0, cols[0] * cell - margin)
+        box = (
+            slice(top, (rows[-1] + 1) * cell + margin),
+            slice(left, (cols[-1] + 1) * cell + margin)
+        )
+        closed = self._closed[box]
+        cv2.morphologyEx(
+            self._mask[box],
+            cv2.MORPH_CLOSE,
+            self._kernel,
+            dst=closed
+        )
+        started = timer.record('morphology', started)
+        stats = cv2.connectedComponentsWithStats(
+            closed,
+            labels=self._labels[box],
+            connectivity=8,
+            ltype=cv2.CV_32S
+        )[2]
+        timer.record('contour', started)
+
+        # Label 0 is the background
+        stats = stats[1:][stats[1:, cv2.CC_STAT_AREA] >= self._min_area]
+        boxes = np.ascontiguousarray(stats).view(MOTION_BOX)[:, 0]
+        boxes['x'] += self._offset[0] + left
+        boxes['y'] += self._offset[1] + top
+        return boxes
+
+    @abstractmethod
+    def _foreground(
+            self,
+            image: np.ndarray,
+            mask: np.ndarray,
+            ready: bool
+    ) -> bool:
+        """
+        Builds the foreground mask of a frame and updates the strategy.
+
+        Args:
+            image: The blurred frame.
+            mask: Buffer where the mask is written.
+            ready: False for the first frame after (re)allocating the
+                buffers.
+
+        Returns:
+            True if the mask was written.
+        """
+
+
+class FrameDifferenceDetector(MotionDetector):
+    """
+    Detects motion as the difference between consecutive frames.
+
+    It reacts fast to changes but misses subjects moving slowly.
+    """
+    NAME = 'difference'
+
+    def __init__(
+            self,
+            threshold=5,
+            scale=1.0,
+            regions: Sequence[Region] = ()
+    ) -> None:
+        super().__init__(threshold, scale, regions)
+        self._previous = np.empty(0, np.uint8)
+
+    def _allocate(self, shape: Tuple[int, ...]) -> None:
+        super()._allocate(shape)
+        self._previous = np.empty(shape, np.uint8)
+
+    def _foreground(
+            self,
+            image: np.ndarray,
+            mask: np.ndarray,
+            ready: bool
+    ) -> bool:
+        if ready:
+            cv2.absdiff(self._previous, image, dst=mask)
+            cv2.threshold(
+                mask,
+                self.threshold,
+                255,
+                cv2.THRESH_BINARY,
+                dst=mask
+            )
+        # Current frame becomes the previous one
+        self._previous, self._blurred = image, self._previous
+        return ready
+
+
+class RunningAverageDetector(MotionDetector):
+    """
+    Detects motion as the difference from a running average background.
+
+    The background slowly absorbs the scene changes, so subjects moving
+    slowly are detected while they differ from the average.
+    """
+    NAME = 'average'
+
+    ALPHA = 0.05
+    """Weight of every new frame in the background average."""
+
+    def __init__(
+            self,
+            threshold=5,
+            scale=1.0,
+            regions: Sequence[Region] = ()
+    ) -> None:
+        super().__init__(threshold, scale, regions)
+        self._background = np.empty(0, np.float32)
+        self._rounded = np.empty(0, np.uint8)
+
+    def _allocate(self, shape: Tuple[int, ...]) -> None:
+        super()._allocate(shape)
+        self._background = np.empty(shape, np.float32)
+        self._rounded = np.empty(shape, np.uint8)
+
+    def _foreground(
+            self,
+            image: np.ndarray,
+            mask: np.ndarray,
+            ready: bool
+    ) -> bool:
+        if not ready:
+            self._background[...] = image
+            return False
+        cv2.convertScaleAbs(self._background, dst=self._rounded)
+        cv2.absdiff(self._rounded, image, dst=mask)
+        cv2.threshold(mask, self.threshold, 255, cv2.THRESH_BINARY, dst=mask)
+        cv2.accumulateWeighted(image, self._background, self.ALPHA)
+        return True
+
+
+class BackgroundSubtractorDetector(MotionDetector):
+    """
+    Detects motion with an OpenCV background subtractor (MOG2).
+
+    The background is modelled per pixel with a mixture of gaussians, so
+    scene noise and periodic changes (e.g. leaves) are learnt and ignored.
+    The threshold is the distance (in standard deviations) of a foreground
+    pixel to the background model. Motion is not reported while the model
+    learns the first frames.
+    """
+    NAME = 'mog2'
+
+    WARMUP_FRAMES = 5
+    """Number of frames learnt before reporting motion."""
+
+    def __init__(
+            self,
+            threshold=5,
+            scale=1.0,
+            regions: Sequence[Region] = ()
+    ) -> None:
+        super().__init__(threshold, scale, regions)
+        self._subtractor = self._create_subtractor()
+        self._learnt = 0
+
+    def _create_subtractor(self) -> cv2.BackgroundSubtractor:
+        """Creates the OpenCV background subtractor."""
+        return cv2.createBackgroundSubtractorMOG2(
+            varThreshold=self.threshold ** 2,
+            detectShadows=False
+        )
+
+    def _allocate(self, shape: Tuple[int, ...]) -> None:
+        super()._allocate(shape)
+        self._subtractor = self._create_subtractor()
+        self._learnt = 0
+
+    def _foreground(
+            self,
+            image: np.ndarray,
+            mask: np.ndarray,
+            ready: bool
+    ) -> bool:
+        self._subtractor.apply(image, fgmask=mask)
+        self._learnt += 1
+        return self._learnt > self.WARMUP_FRAMES
+
+
+class KnnSubtractorDetector(BackgroundSubtractorDetector):
+    """
+    Detects motion with the KNN OpenCV background subtractor.
+
+    The threshold is the minimum intensity change of a foreground pixel.
+    """
+    NAME = 'knn'
+
+    def _create_subtractor(self) -> cv2.BackgroundSubtractor:
+        return cv2.createBackgroundSubtractorKNN(
+            dist2Threshold=self.threshold ** 2,
+            detectShadows=False
+        )
+
+
+class MotionHeatmap:
+    """
+    Decaying accumulator of the motion of a camera.
+
+    Every foreground mask is blended into a float32 accumulator at the
+    resolution of the analysed images, weighted by the time since the
+    previous mask, so the accumulator holds the fraction of time (times
+    255) every pixel has been in motion, with older motion halving its
+    weight every `half_life` seconds. Updating it is a single in place
+    OpenCV operation over the analysed area. Gaps longer than
+    `MAX_INTERVAL` (e.g. while the surveillance mode is stopped) count as
+    `MAX_INTERVAL`, so motion seen before the gap is not forgotten.
+
+    Args:
+        half_life: Time (in seconds) for motion to lose half its weight.
+    """
+    HALF_LIFE = 24 * 60 * 60
+    """Default half-life (in seconds) of the accumulated motion."""
+
+    MAX_INTERVAL = 1.0
+    """Maximum time (in seconds) weighted for a single mask."""
+
+    OPACITY = 0.6
+    """Opacity of the hottest areas in the overlay."""
+
+    def __init__(self, half_life: float = HALF_LIFE) -> None:
+        self.half_life = half_life
+        self._heat = np.zeros((0, 0), np.float32)
+        self._last_update: Optional[float] = None
+
+    @property
+    def heat(self) -> np.ndarray:
+        """The accumulator, empty if no motion has been accumulated."""
+        return self._heat
+
+    def reset(self) -> None:
+        """Forgets the accumulated motion."""
+        self._heat = np.zeros((0, 0), np.float32)
+        self._last_update = None
+
+    def update(
+            self,
+            mask: np.ndarray,
+            timestamp: float,
+            shape: Tuple[int, ...],
+            crop: Optional[Tuple[slice, slice]] = None
+    ) -> None:
+        """
+        Accumulates a foreground mask.
+
+        The accumulator is restarted if the shape of the analysed images
+        changes.
+
+        Args:
+            mask: Binary foreground mask (255 for pixels in motion).
+            timestamp: Capture time of the frame the mask was built from.
+            shape: Shape of the analysed images.
+            crop: Area of the analysed images covered by the mask, the
+                whole images if not given.
+        """
+        if self._heat.shape != shape[:2]:
+            self._heat = np.zeros(shape[:2], np.float32)
+            self._last_update = None
+        if self._last_update is None:
+            interval = self.MAX_INTERVAL
+        else:
+            interval = min(
+                max(0.0, timestamp - self._last_update),
+                self.MAX_INTERVAL
+            )
+        self._last_update = timestamp
+        alpha = 1 - 0.5 ** (interval / self.half_life)
+        heat = self._heat if crop is None else self._heat[crop]
+        cv2.accumulateWeighted(mask, heat, alpha)
+
+    def overlay(self, image: np.ndarray) -> np.ndarray:
+        """
+        Draws the accumulated motion on an image.
+
+        The accumulator is normalized to its maximum, scaled to the image
+        and colorized, hotter areas are more opaque.
+
+        Args:
+            image: The BGR image (e.g. the latest frame).
+
+        Returns:
+            A new image with the heatmap overlay.
+        """
+        heat = self._heat
+        peak = float(heat.max()) if heat.size else 0.0
+        if not peak:
+            return image.copy()
+        height, width = image.shape[:2]
+        weight = cv2.resize(heat / peak, (width, height))
+        colors = cv2.applyColorMap(
+            np.round(weight * 255).astype(np.uint8),
+            cv2.COLORMAP_JET
+        )
+        weight = (weight * self.OPACITY)[..., np.newaxis]
+        blended = image * (1 - weight) + colors * weight
+        return np.round(blended).astype(np.uint8)
+
+    def save(self, path: str) -> None:
+        """
+        Saves the accumulated motion into a file.
+
+        Args:
+            path: Path of the file (NumPy ``.npy`` format).
+        """
+        with open(path, 'wb') as file_handler:
+            np.save(file_handler, self._heat)
+
+    def load(self, path: str) -> None:
+        """
+        Loads the accumulated motion saved into a file.
+
+        Args:
+            path: Path of the file.
+
+        Raises:
+            ValueError: If the file does not hold an accumulator.
+        """
+        heat = np.load(path)
+        if heat.ndim != 2:
+            raise ValueError(f'Invalid heatmap: {path}')
+        self._heat = heat.astype(np.float32)
+        self._last_update = None
+
+
+DETECTORS: Dict[str, Type[MotionDetector]] = {
+    detector.NAME: detector for detector in (
+        FrameDifferenceDetector,
+        RunningAverageDetector,
+        BackgroundSubtractorDetector,
+        KnnSubtractorDetector
+    )
+}
+"""Motion detection strategies by name."""
+
+DEFAULT_DETECTOR = FrameDifferenceDetector.NAME
+"""Name of the default motion detection strategy."""
+
+
+def create_detector(
+        name: str,
+        threshold=5,
+        scale=1.0,
+        regions: Sequence[Region] = ()
+) -> MotionDetector:
+    """
+    Creates a motion detector.
+
+    Args:
+        name: Name of the strategy, unknown names fall back to the default
+            strategy.
+        threshold: Sensitivity of the detection.
+        scale: Scale of the analysed images relative to the frames.
+        regions: Regions where motion is detected or ignored.
+
+    Returns:
+        The motion detector.
+    """
+    detector_class = DETECTORS.get(name, DETECTORS[DEFAULT_DETECTOR])
+    return detector_class(threshold, scale, regions)
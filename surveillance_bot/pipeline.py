@@ -0,0 +1,249 @@
+"""
+Module for the surveillance pipeline.
+
+This module implements the `SurveillancePipeline` class that runs the
+surveillance mode of a camera as a sequence of stages connected by bounded
+queues: frames are grabbed by the camera device, analysed (and recorded),
+photos and audio are encoded and finally everything is delivered to the
+user. Every stage has its own worker threads, so a slow delivery does not
+stall the analysis and recording of the frames.
+"""
+import logging
+from io import BytesIO
+from queue import Full, Queue
+from threading import Lock, Thread
+from time import monotonic
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from surveillance_bot.camera import Camera
+
+
+class StageStats(NamedTuple):
+    """
+    Statistics of a pipeline stage.
+
+    Attributes:
+        name: Name of the stage.
+        depth: Number of items waiting in the queue of the stage.
+        processed: Number of items processed.
+        dropped: Number of items dropped because the queue was full.
+        latency: Mean time (in seconds) from queuing an item to the end of
+            its processing.
+    """
+    name: str
+    depth: int = 0
+    processed: int = 0
+    dropped: int = 0
+    latency: float = 0.0
+
+
+class Stage:  # pylint: disable=too-many-instance-attributes
+    """
+    Stage of a pipeline.
+
+    Items put into the bounded queue of the stage are processed by a number
+    of worker threads. When the queue is full putting an item blocks until
+    there is room for it (back-pressure) unless the item is droppable, in
+    which case it is discarded. Items are processed in order only if the
+    stage has a single worker.
+
+    Exceptions raised while processing an item are logged and passed to the
+    error handler, and the item is discarded.
+
+    Args:
+        name: Name of the stage.
+        handler: Function processing every item.
+        maxsize: Maximum number of items waiting in the queue.
+        workers: Number of worker threads.
+        on_error: Function called with the exceptions of the handler.
+    """
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            name: str,
+            handler: Callable[[Any], None],
+            maxsize=8,
+            workers=1,
+            on_error: Optional[Callable[[Exception], None]] = None
+    ) -> None:
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._handler = handler
+        self._on_error = on_error
+        self._queue: Queue = Queue(maxsize)
+        self._threads = [
+            Thread(target=self._work, name=f'{name}-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        self._lock = Lock()
+        self._stats = StageStats(name)
+        self._total_latency = 0.0
+
+    def start(self) -> None:
+        """Starts the worker threads."""
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item: Any, droppable=False) -> bool:
+        """
+        Queues an item to be processed.
+
+        Args:
+            item: The item to be processed.
+            droppable: If True the item is dropped if the queue is full,
+                otherwise it waits for room in the queue.
+
+        Returns:
+            True if the item was queued, False if it was dropped.
+        """
+        try:
+            self._queue.put((monotonic(), item), block=not droppable)
+        except Full:
+            with self._lock:
+                self._stats = self._stats._replace(
+                    dropped=self._stats.dropped + 1
+                )
+            return False
+        return True
+
+    def join(self) -> None:
+        """Processes the queued items and stops the worker threads."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    @property
+    def stats(self) -> StageStats:
+        """Current statistics of the stage."""
+        with self._lock:
+            return self._stats._replace(depth=self._queue.qsize())
+
+    def _work(self) -> None:
+        """Processes queued items until the stage is stopped."""
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            queued, item = entry
+            try:
+                self._handler(item)
+            except Exception as error:  # pylint: disable=broad-except
+                self.logger.exception('Error in %s stage', self.name)
+                if self._on_error:
+                    self._on_error(error)
+            with self._lock:
+                processed = self._stats.processed + 1
+                self._total_latency += monotonic() - queued
+                self._stats = self._stats._replace(
+                    processed=processed,
+                    latency=self._total_latency / processed
+                )
+
+
+class SurveillancePipeline:
+    """
+    Surveillance mode of a camera run as a pipeline.
+
+    The stages are:
+        * capture: the camera device grabs frames in its own thread (or
+          process) into its frame ring.
+        * analysis: motion detection and video recording, run by the
+          thread calling `run`.
+        * encode: JPEG encoding of the photos and Opus encoding of the
+          audio clips, once they are completed.
+        * deliver: the given function sends the results to the user.
+
+    Photos are droppable, when a stage falls behind photos are dropped
+    before the analysis is slowed down. The rest of results (detection
+    notices, audio and videos) are never dropped, so the analysis waits for
+    room in the queues if they are full.
+
+    Args:
+        camera: The camera to watch.
+        deliver: Function receiving the results of the surveillance mode,
+            the dicts yielded by `Camera.surveillance_start` with the photos
+            and audio encoded. Videos are delivered as in-memory files.
+        maxsize: Maximum number of items waiting in every queue.
+        **kwargs: Surveillance mode parameters (see
+            `Camera.surveillance_start`).
+    """
+    def __init__(
+            self,
+            camera: Camera,
+            deliver: Callable[[Dict[str, Any]], None],
+            maxsize=8,
+            **kwargs: Any
+    ) -> None:
+        self.camera = camera
+        self._kwargs = kwargs
+        self._error: Optional[Exception] = None
+        self._deliver = Stage(
+            'deliver',
+            deliver,
+            maxsize,
+            on_error=self._stop
+        )
+        self._encode = Stage(
+            'encode',
+            self._encode_item,
+            maxsize,
+            on_error=self._stop
+        )
+
+    def run(self) -> None:
+        """
+        Runs the surveillance mode until it is stopped.
+
+        When the camera surveillance mode is stopped, the results already
+        queued are encoded and delivered before returning.
+
+        Raises:
+            Exception: The first error raised by a stage, which also stops
+                the surveillance mode.
+        """
+        self._encode.start()
+        self._deliver.start()
+        try:
+            for data in self.camera.surveillance_start(
+                    encode=False,
+                    **self._kwargs
+            ):
+                if 'video' in data:
+                    # The video file is closed when the generator resumes
+                    data = {'video': BytesIO(data['video'].read())}
+                self._encode.put(data, droppable='frame' in data)
+        finally:
+            self._encode.join()
+            self._deliver.join()
+        if self._error:
+            raise self._error
+
+    @property
+    def stats(self) -> List[StageStats]:
+        """Statistics of the encode and deliver stages."""
+        return [self._encode.stats, self._deliver.stats]
+
+    def _encode_item(self, data: Dict[str, Any]) -> None:
+        """
+        Encodes the photo or audio of a result and queues it for delivery.
+
+        Args:
+            data: The result of the surveillance mode.
+        """
+        if 'frame' in data:
+            data = dict(data, photo=self.camera.encode_photo(data['frame']))
+            del data['frame']
+        if 'samples' in data:
+            data = {'audio': self.camera.encode_audio(data['samples'])}
+        self._deliver.put(data, droppable='photo' in data)
+
+    def _stop(self, error: Exception) -> None:
+        """
+        Stops the surveillance mode after an error in a stage.
+
+        Args:
+            error: The error raised.
+        """
+        if self._error is None:
+            self._error = error
+        self.camera.surveillance_stop()
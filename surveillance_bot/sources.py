@@ -0,0 +1,447 @@
+"""
+Module for frame sources.
+
+This module implements the `FrameSource` interface used by the camera
+devices to grab frames, along with sources for live devices, video files,
+directories of images and synthetic scenes. Non live sources allow to
+reproduce recorded incidents and to measure the pipeline throughput without
+a camera attached.
+"""
+import glob
+import os
+from abc import ABC, abstractmethod
+from time import monotonic, sleep
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+class FrameSource(ABC):
+    """
+    Base class for frame sources.
+
+    A frame source follows the reading semantics of OpenCV `VideoCapture`:
+    reading is split into grabbing the next frame, which is cheap, and
+    retrieving (decoding) the grabbed frame, so frames nobody needs are not
+    decoded. Frames are decoded into the given image when it fits,
+    otherwise a new array is returned.
+    """
+
+    @abstractmethod
+    def is_opened(self) -> bool:
+        """Return if the source is ready to be read."""
+
+    @abstractmethod
+    def grab(self) -> bool:
+        """
+        Grabs the next frame without decoding it.
+
+        Returns:
+            True if a frame was grabbed.
+        """
+
+    @abstractmethod
+    def retrieve(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Decodes the latest grabbed frame.
+
+        Args:
+            image: Buffer to decode the frame into.
+
+        Returns:
+            A tuple with a flag indicating if a frame was decoded and the
+            frame itself (the given buffer if the frame fits into it).
+        """
+
+    def read(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Grabs and decodes the next frame.
+
+        Args:
+            image: Buffer to decode the frame into.
+
+        Returns:
+            A tuple with a flag indicating if a frame was read and the frame
+            itself (the given buffer if the frame fits into it).
+        """
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self) -> None:
+        """Releases the resources of the source."""
+
+    def get_encoded(self) -> Optional[bytes]:
+        """
+        Gets the latest retrieved frame as delivered by the device.
+
+        Returns:
+            The JPEG image of the frame, or None if the source does not
+            deliver compressed frames.
+        """
+        return None
+
+    @staticmethod
+    def _store(
+            frame: np.ndarray,
+            image: Optional[np.ndarray]
+    ) -> Tuple[bool, np.ndarray]:
+        """
+        Stores a frame into the given buffer if it fits, or into a copy.
+
+        Args:
+            frame: The frame to be stored.
+            image: Buffer to copy the frame into.
+
+        Returns:
+            A tuple with True and the stored frame.
+        """
+        if image is not None and image.shape == frame.shape \
+                and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+
+class DeviceSource(FrameSource):
+    """
+    Source for live video capturing devices.
+
+    In passthrough mode the device is asked for MJPEG frames without
+    conversion, so the compressed frames are kept (see `get_encoded`) and
+    photos can be sent without encoding them again. Frames are decoded
+    only when retrieved. If the device does not deliver raw MJPEG frames
+    passthrough is disabled.
+
+    Args:
+        cam_id: ID of the video capturing device to open.
+        passthrough: Keeps the MJPEG frames delivered by the device.
+    """
+    JPEG_MARKER = b'\xff\xd8'
+    """Start of image marker of the JPEG format."""
+
+    def __init__(self, cam_id=0, passthrough=False) -> None:
+        self._capture = cv2.VideoCapture(cam_id)
+        self.passthrough = passthrough
+        self._encoded: Optional[bytes] = None
+        if passthrough:
+            self._capture.set(
+                cv2.CAP_PROP_FOURCC,
+                cv2.VideoWriter.fourcc(*'MJPG')
+            )
+            self._capture.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+    def is_opened(self) -> bool:
+        return self._capture.isOpened()
+
+    def grab(self) -> bool:
+        return self._capture.grab()
+
+    def retrieve(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.passthrough:
+            return self._capture.retrieve(image)
+
+        grabbed, frame = self._capture.retrieve()
+        if not grabbed:
+            return False, None
+        encoded = frame.tobytes()
+        if not encoded.startswith(self.JPEG_MARKER):
+            # Device delivered a decoded frame
+            self.passthrough = False
+            return self._store(frame, image)
+
+        self._encoded = encoded
+        frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def read(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.passthrough:
+            return super().read(image)
+        return self._capture.read(image)
+
+    def get_encoded(self) -> Optional[bytes]:
+        return self._encoded if self.passthrough else None
+
+    def release(self) -> None:
+        self._capture.release()
+
+
+class PlaybackSource(FrameSource):  # pylint: disable=abstract-method
+    """
+    Base class for sources that are not live.
+
+    These sources can be played back at their frame rate (real time) or as
+    fast as they are read.
+
+    Args:
+        fps: Frame rate of the source.
+        realtime: If True reading is throttled to the frame rate.
+    """
+    def __init__(self, fps: float, realtime=True) -> None:
+        self.fps = fps
+        self.realtime = realtime
+        self._next_time = 0.0
+
+    def _pace(self) -> None:
+        """Waits until the next frame is due in real time playback."""
+        if not self.realtime:
+            return
+        now = monotonic()
+        if self._next_time > now:
+            sleep(self._next_time - now)
+        self._next_time = max(now, self._next_time) + 1 / self.fps
+
+
+class VideoFileSource(PlaybackSource):
+    """
+    Source for video files.
+
+    Args:
+        path: Path of the video file.
+        realtime: If True the video is played back at its frame rate,
+            otherwise as fast as possible.
+        loop: If True the video starts over when it ends.
+    """
+    def __init__(self, path: str, realtime=True, loop=False) -> None:
+        self._capture = cv2.VideoCapture(path)
+        super().__init__(self._capture.get(cv2.CAP_PROP_FPS) or 30, realtime)
+        self.loop = loop
+
+    def is_opened(self) -> bool:
+        return self._capture.isOpened()
+
+    def grab(self) -> bool:
+        self._pace()
+        grabbed = self._capture.grab()
+        if not grabbed and self.loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            grabbed = self._capture.grab()
+        return grabbed
+
+    def retrieve(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        return self._capture.retrieve(image)
+
+    def release(self) -> None:
+        self._capture.release()
+
+
+class ImageSequenceSource(PlaybackSource):
+    """
+    Source for directories of images.
+
+    Images are sorted by name and decoded once when the source is opened.
+
+    Args:
+        path: Path of the directory.
+        fps: Frame rate of the sequence.
+        realtime: If True the sequence is played back at its frame rate,
+            otherwise as fast as possible.
+        loop: If True the sequence starts over when it ends.
+    """
+    EXTENSIONS = ('*.jpg', '*.jpeg', '*.png')
+    """File patterns of the images to be read."""
+
+    def __init__(self, path: str, fps=30.0, realtime=True, loop=True) -> None:
+        super().__init__(fps, realtime)
+        self.loop = loop
+        paths = sorted(
+            file_path
+            for extension in self.EXTENSIONS
+            for file_path in glob.glob(os.path.join(path, extension))
+        )
+        self._frames: List[np.ndarray] = [
+            cv2.imread(file_path) for file_path in paths
+        ]
+        self._index = 0
+        self._frame: Optional[np.ndarray] = None
+
+    def is_opened(self) -> bool:
+        return bool(self._frames)
+
+    def grab(self) -> bool:
+        if self._index == len(self._frames):
+            if not self.loop:
+                return False
+            self._index = 0
+        self._pace()
+        self._frame = self._frames[self._index]
+        self._index += 1
+        return True
+
+    def retrieve(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._frame is None:
+            return False, None
+        return self._store(self._frame, image)
+
+
+class SyntheticSource(PlaybackSource):  # pylint: disable=too-many-instance-attributes
+    """
+    Source generating a scene with moving objects.
+
+    The scene is a static textured background where a number of rectangles
+    bounce around. Optionally it alternates between periods with and
+    without motion.
+
+    Args:
+        frame_size: Width and height of the frames.
+        fps: Frame rate of the scene.
+        realtime: If True the scene is generated at its frame rate,
+            otherwise as fast as possible.
+        objects: Number of moving objects.
+        active_frames: Number of frames with motion of every period.
+        idle_frames: Number of frames without motion of every period, if
+            it is 0 there is always motion.
+        seed: Seed for the random generation of the scene.
+    """
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            frame_size: Tuple[int, int] = (640, 480),
+            fps=30.0,
+            realtime=True,
+            objects=1,
+            active_frames=0,
+            idle_frames=0,
+            seed=0
+    ) -> None:
+        super().__init__(fps, realtime)
+        width, height = frame_size
+        random = np.random.default_rng(seed)
+
+        texture = random.integers(0, 256, (height // 8 + 1, width // 8 + 1, 3))
+        self._background = cv2.resize(
+            texture.astype(np.uint8),
+            (width, height),
+            interpolation=cv2.INTER_LINEAR
+        )
+        self._size = max(8, min(width, height) // 8)
+        self._positions = random.uniform(
+            0, 1, (objects, 2)) * (width - self._size, height - self._size)
+        self._speeds = random.uniform(
+            -1, 1, (objects, 2)) * self._size / 4
+        self._colors = [
+            tuple(int(c) for c in random.integers(0, 256, 3))
+            for _ in range(objects)
+        ]
+        self._limits = np.array([width - self._size, height - self._size])
+
+        self.active_frames = active_frames
+        self.idle_frames = idle_frames
+        self._count = 0
+
+    def is_opened(self) -> bool:
+        return True
+
+    @property
+    def is_active(self) -> bool:
+        """Return if the next frame has motion."""
+        if not self.idle_frames:
+            return True
+        period = self.active_frames + self.idle_frames
+        return self._count % period < self.active_frames
+
+    def grab(self) -> bool:
+        self._pace()
+        if self.is_active:
+            self._positions += self._speeds
+            bounced = (self._positions < 0) | (self._positions > self._limits)
+            self._speeds[bounced] *= -1
+            np.clip(self._positions, 0, self._limits, out=self._positions)
+        self._count += 1
+        return True
+
+    def retrieve(
+            self,
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        if image is None or image.shape != self._background.shape:
+            image = np.empty_like(self._background)
+        np.copyto(image, self._background)
+        for (x, y), color in zip(self._positions.astype(int), self._colors):
+            cv2.rectangle(
+                image,
+                (x, y),
+                (x + self._size, y + self._size),
+                color,
+                -1
+            )
+        return True, image
+
+
+SourceType = Union[int, str, FrameSource]
+"""Types accepted as video source: a device ID, a spec or a source."""
+
+
+def _synthetic_source(size: str, realtime: bool) -> FrameSource:
+    """
+    Opens a synthetic source from the argument of its spec.
+
+    Args:
+        size: Frame size as ``<width>x<height>``, the default size if empty.
+        realtime: If False the scene is generated as fast as possible.
+
+    Returns:
+        The frame source.
+    """
+    if not size:
+        return SyntheticSource(realtime=realtime)
+    width, height = (int(value) for value in size.split('x'))
+    return SyntheticSource((width, height), realtime=realtime)
+
+
+SOURCE_SPECS: Dict[str, Callable[[str, bool], FrameSource]] = {
+    'mjpeg': lambda cam_id, _: DeviceSource(int(cam_id), passthrough=True),
+    'synthetic': _synthetic_source
+}
+"""Openers of the ``<kind>:<argument>`` specs, by kind."""
+
+
+def open_source(source: SourceType, realtime=True) -> FrameSource:
+    """
+    Opens a video source.
+
+    Args:
+        source: A `FrameSource`, a video capturing device ID or a string
+            spec. Supported specs are a device ID, ``mjpeg:<device ID>``
+            (a device in MJPEG passthrough mode), ``synthetic`` (or
+            ``synthetic:<width>x<height>``), a directory of images or a
+            video file.
+        realtime: If False non live sources are read as fast as possible
+            and recorded ones start over when they end.
+
+    Returns:
+        The frame source.
+    """
+    if isinstance(source, FrameSource):
+        return source
+    if isinstance(source, int) or source.isdigit():
+        return DeviceSource(int(source))
+    kind, _, argument = source.partition(':')
+    if kind in SOURCE_SPECS:
+        return SOURCE_SPECS[kind](argument, realtime)
+    if os.path.isdir(source):
+        return ImageSequenceSource(source, realtime=realtime)
+    return VideoFileSource(source, realtime=realtime, loop=not realtime)
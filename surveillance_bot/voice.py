@@ -0,0 +1,296 @@
+"""
+Module for voice note encoding.
+
+This module encodes audio recordings as Opus in an OGG container, the format
+of the Telegram voice notes, which are several times smaller than MP3 files
+for the same recording. Samples are encoded incrementally, as they are
+written, by one of these encoders:
+
+* `SoundFileEncoder`: encodes in process with libsndfile (through the
+  optional ``soundfile`` package), if it supports Opus.
+* `FfmpegEncoder`: streams the samples through a pipe to a single ``ffmpeg``
+  process per recording, started with the encoder.
+
+`create_encoder` picks the first one available. On demand recordings are
+written to the encoder while they are recorded. The clips of the
+surveillance events are taken from the buffer of the audio monitor once
+completed, so they are encoded afterwards (see `encode_voice`).
+
+Voice notes received are decoded by `decode_voice`, with the same tools.
+"""
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from io import BytesIO
+from threading import Thread
+from typing import IO, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+except (ImportError, OSError):  # pragma: no cover
+    sf = None  # soundfile or libsndfile not installed
+
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+"""Sample rates supported by the Opus codec."""
+
+BITRATE = 32000
+"""Bitrate (in bits per second) of the voice notes encoded by ffmpeg."""
+
+DECODING_RATE = 48000
+"""Sample rate of the voice notes decoded by ffmpeg, the Opus internal rate."""
+
+
+class VoiceEncodingError(Exception):
+    """Raised when audio can not be encoded as a voice note or decoded."""
+
+
+class VoiceEncoder(ABC):
+    """
+    Base class of the voice note encoders.
+
+    Samples are written as they are recorded and the voice note is returned
+    when the encoder is closed.
+
+    Args:
+        sample_rate: Sample rate of the samples.
+        channels: Number of channels of the samples.
+    """
+    def __init__(self, sample_rate: int, channels=1) -> None:
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @abstractmethod
+    def write(self, samples: np.ndarray) -> None:
+        """
+        Encodes samples.
+
+        Args:
+            samples: The 32 bits samples, as rows of channels.
+        """
+
+    @abstractmethod
+    def close(self) -> IO:
+        """
+        Finishes the encoding.
+
+        Returns:
+            File object with the voice note.
+
+        Raises:
+            VoiceEncodingError: If the encoding failed.
+        """
+
+
+class SoundFileEncoder(VoiceEncoder):
+    """
+    Voice note encoder running in process with libsndfile.
+
+    Args:
+        sample_rate: Sample rate of the samples, one of `OPUS_RATES`.
+        channels: Number of channels of the samples.
+    """
+    def __init__(self, sample_rate: int, channels=1) -> None:
+        super().__init__(sample_rate, channels)
+        self._output = BytesIO()
+        self._file = sf.SoundFile(
+            self._output,
+            'w',
+            samplerate=sample_rate,
+            channels=channels,
+            format='OGG',
+            subtype='OPUS'
+        )
+
+    @staticmethod
+    def is_available(sample_rate: int) -> bool:
+        """
+        Checks if libsndfile can encode samples as Opus.
+
+        Args:
+            sample_rate: Sample rate of the samples.
+
+        Returns:
+            True if the encoder can be used.
+        """
+        return (
+            sf is not None
+            and sample_rate in OPUS_RATES
+            and 'OPUS' in sf.available_subtypes('OGG')
+        )
+
+    def write(self, samples: np.ndarray) -> None:
+        self._file.write(samples)
+
+    def close(self) -> IO:
+        self._file.close()
+        self._output.seek(0)
+        return self._output
+
+
+class FfmpegEncoder(VoiceEncoder):
+    """
+    Voice note encoder streaming through a pipe to an ffmpeg process.
+
+    The process is started with the encoder and receives the raw samples in
+    its standard input while a thread collects the voice note from its
+    standard output, so the samples are encoded as they are written.
+
+    Args:
+        sample_rate: Sample rate of the samples.
+        channels: Number of channels of the samples.
+        bitrate: Bitrate (in bits per second) of the voice note.
+
+    Raises:
+        VoiceEncodingError: If ffmpeg can not be started.
+    """
+    def __init__(self, sample_rate: int, channels=1, bitrate=BITRATE) -> None:
+        super().__init__(sample_rate, channels)
+        self._output = BytesIO()
+        try:
+            self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+                [
+                    'ffmpeg', '-loglevel', 'error',
+                    '-f', 's32le', '-ar', str(sample_rate),
+                    '-ac', str(channels), '-i', 'pipe:0',
+                    '-c:a', 'libopus', '-b:a', str(bitrate),
+                    '-application', 'voip', '-f', 'ogg', 'pipe:1'
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError as error:
+            raise VoiceEncodingError('Can not start ffmpeg') from error
+        self._reader = Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Checks if ffmpeg is installed.
+
+        Returns:
+            True if the encoder can be used.
+        """
+        return shutil.which('ffmpeg') is not None
+
+    def write(self, samples: np.ndarray) -> None:
+        samples = np.ascontiguousarray(samples, '<i4')
+        try:
+            self._process.stdin.write(samples.data.cast('B'))
+        except BrokenPipeError as error:
+            raise VoiceEncodingError('ffmpeg stopped') from error
+
+    def close(self) -> IO:
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:  # pragma: no cover
+            pass
+        self._reader.join()
+        if self._process.wait():
+            raise VoiceEncodingError(
+                f'ffmpeg exited with code {self._process.returncode}'
+            )
+        self._output.seek(0)
+        return self._output
+
+    def _read(self) -> None:
+        """Collects the output of the process until it ends."""
+        for chunk in iter(lambda: self._process.stdout.read(65536), b''):
+            self._output.write(chunk)
+
+
+def create_encoder(sample_rate: int, channels=1) -> VoiceEncoder:
+    """
+    Creates the best voice note encoder available.
+
+    Args:
+        sample_rate: Sample rate of the samples.
+        channels: Number of channels of the samples.
+
+    Returns:
+        A `SoundFileEncoder` if libsndfile supports Opus, an `FfmpegEncoder`
+        otherwise.
+
+    Raises:
+        VoiceEncodingError: If there are no encoders available.
+    """
+    if SoundFileEncoder.is_available(sample_rate):
+        return SoundFileEncoder(sample_rate, channels)
+    if FfmpegEncoder.is_available():
+        return FfmpegEncoder(sample_rate, channels)
+    raise VoiceEncodingError('Neither soundfile nor ffmpeg can encode Opus')
+
+
+def encode_voice(
+        segments: Sequence[np.ndarray],
+        sample_rate: int,
+        chunk_seconds=1.0
+) -> IO:
+    """
+    Encodes a completed recording as a voice note.
+
+    The segments are written to the encoder one after the other, in chunks,
+    so they are not joined into a single array.
+
+    Args:
+        segments: Consecutive segments of the 32 bits samples, as rows of
+            channels.
+        sample_rate: Sample rate of the samples.
+        chunk_seconds: Duration of the chunks written to the encoder.
+
+    Returns:
+        File object with the voice note.
+
+    Raises:
+        VoiceEncodingError: If the recording can not be encoded.
+    """
+    encoder = create_encoder(sample_rate, segments[0].shape[1])
+    step = max(1, int(chunk_seconds * sample_rate))
+    for samples in segments:
+        for start in range(0, len(samples), step):
+            encoder.write(samples[start:start + step])
+    return encoder.close()
+
+
+def decode_voice(voice: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Decodes a voice note.
+
+    It is decoded in process with libsndfile if it supports Opus, otherwise
+    by an ``ffmpeg`` process (as mono at `DECODING_RATE`).
+
+    Args:
+        voice: The OGG file with the voice note.
+
+    Returns:
+        A tuple with the 32 bits samples, as rows of channels, and their
+        sample rate.
+
+    Raises:
+        VoiceEncodingError: If the voice note can not be decoded.
+    """
+    if sf is not None and 'OPUS' in sf.available_subtypes('OGG'):
+        try:
+            return sf.read(BytesIO(voice), dtype='int32', always_2d=True)
+        except RuntimeError as error:
+            raise VoiceEncodingError('Can not decode the voice note') from error
+    if not FfmpegEncoder.is_available():
+        raise VoiceEncodingError('Neither soundfile nor ffmpeg can decode Opus')
+    try:
+        process = subprocess.run(
+            [
+                'ffmpeg', '-loglevel', 'error', '-i', 'pipe:0',
+                '-f', 's32le', '-ar', str(DECODING_RATE), '-ac', '1', 'pipe:1'
+            ],
+            input=voice,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        )
+    except (OSError, subprocess.CalledProcessError) as error:
+        raise VoiceEncodingError('ffmpeg can not decode the voice note') from error
+    samples = np.frombuffer(process.stdout, '<i4').reshape(-1, 1)
+    return samples, DECODING_RATE
@@ -1,6 +1,5 @@
 import numpy as np
 import sounddevice as sd
-from pydub import AudioSegment
 
 seconds = 5
 SAMPLE_RATE = 44100
@@ -5,7 +5,7 @@ import os
 import time
 from hashlib import md5
 from io import BytesIO
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -23,6 +23,10 @@ FRAMES: List[np.ndarray] = [
     ) for i in range(5)
 ]
 
+FRAMES_JPEG: List[bytes] = [
+    cv2.imencode(".jpg", f)[1].tobytes() for f in FRAMES
+]
+
 FRAMES_MD5 = [
     md5(
         BytesIO(cv2.imencode(".jpg", f)[1]).read()
@@ -30,49 +34,85 @@ FRAMES_MD5 = [
 ]
 
 
-def _get_reader_mock(fps=FPS) -> Callable[[], Tuple[bool, np.ndarray]]:
+def _get_reader_mock(
+        fps=FPS,
+        mjpeg=False
+) -> Tuple[
+    Callable[[], bool],
+    Callable[[Optional[np.ndarray]], Tuple[bool, np.ndarray]],
+    Callable[[Optional[np.ndarray]], Tuple[bool, np.ndarray]]
+]:
     """
-    Generates a function to simulate video capture read method.
+    Generates functions to simulate video capture reading methods.
+
+    Like OpenCV, the frame is decoded into the given image if it fits,
+    otherwise a new array is returned.
 
     Args:
         fps: Sets framerate for reading simulation.
+        mjpeg: Returns the raw MJPEG frames, as a device without RGB
+            conversion.
 
     Returns:
-        The mocked read method.
+        The mocked grab, retrieve and read methods.
     """
-    index = 0
+    index = -1
     last = time.time() - 1  # don't wait for the first frame
 
-    def read() -> Tuple[bool, np.ndarray]:
+    def grab() -> bool:
         nonlocal index, last
         while time.time() < last + (1 / fps):
             pass
-        frame = FRAMES[index % 5]
         index += 1
         last = time.time()
-        return True, frame
+        return True
+
+    def retrieve(
+            image: Optional[np.ndarray] = None
+    ) -> Tuple[bool, np.ndarray]:
+        if mjpeg:
+            return True, np.frombuffer(FRAMES_JPEG[index % 5], np.uint8)[None]
+        frame = FRAMES[index % 5]
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def read(image: Optional[np.ndarray] = None) -> Tuple[bool, np.ndarray]:
+        grab()
+        return retrieve(image)
 
-    return read
+    return grab, retrieve, read
 
 
 def mock_video_capture(
         mocker: pytest_mock.mocker,
         reader=True,
         opened=True,
-        fps=FPS
+        fps=FPS,
+        mjpeg=False
 ) -> None:
     """
     Patches VideoCapture class to simulate a camera device.
 
     Args:
         mocker: Fixture for object mocking.
-        reader: Patches `read` method if True.
+        reader: Patches reading methods if True.
         opened: Patches `isOpened` method if True.
         fps: Sets framerate for reading simulation.
+        mjpeg: Simulates a device delivering raw MJPEG frames.
     """
     video_capture = mocker.patch('cv2.VideoCapture')
     if reader:
-        video_capture().read = _get_reader_mock(fps)
+        (
+            video_capture().grab,
+            video_capture().retrieve,
+            video_capture().read
+        ) = _get_reader_mock(fps, mjpeg)
+    else:
+        video_capture().grab.return_value = False
+        video_capture().retrieve.return_value = (False, None)
+        video_capture().read.return_value = (False, None)
     video_capture().isOpened.return_value = opened
 
 
@@ -92,6 +92,7 @@ def get_mocked_context_object() -> MagicMock:
         A mocked telegram context update instance.
     """
     context = MagicMock()
+    context.args = []
     context.bot_data = {}
     context.user_data = {}
     return context
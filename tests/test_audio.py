@@ -0,0 +1,250 @@
+"""
+Test suite for AudioMonitor class testing.
+"""
+import numpy as np
+
+import pytest
+import pytest_mock
+
+from surveillance_bot import audio
+from surveillance_bot.audio import (
+    AudioMonitor,
+    Band,
+    SpectralDetector,
+    format_bands,
+    parse_bands,
+    to_dbfs
+)
+
+LOUD = 2 ** 30
+"""Level of the samples with sound (-6 dBFS)."""
+
+
+def _feed(monitor: AudioMonitor, loud: bool, count=1) -> None:
+    """
+    Feeds blocks of 100 samples to a monitor as its input stream does.
+
+    Args:
+        monitor: The monitor.
+        loud: Feeds samples with sound if True, silence otherwise.
+        count: Number of blocks.
+    """
+    callback = getattr(monitor, '_callback')
+    block = np.full((100, 1), LOUD if loud else 0, np.int32)
+    for _ in range(count):
+        callback(block, len(block), None, None)
+
+
+def test_to_dbfs() -> None:
+    """Tests the conversion of amplitudes into dBFS."""
+    assert to_dbfs(2 ** 31) == 0
+    assert round(to_dbfs(LOUD)) == -6
+    assert to_dbfs(0) == float('-inf')
+
+
+def _tones(*tones: float, seconds=1.0, sample_rate=8000) -> np.ndarray:
+    """
+    Generates the samples of a sum of tones.
+
+    Args:
+        *tones: Frequency (in Hz) of every tone, at -12 dBFS.
+        seconds: Duration of the samples.
+        sample_rate: Sample rate of the samples.
+
+    Returns:
+        The samples, as a column.
+    """
+    time = np.arange(int(seconds * sample_rate)) / sample_rate
+    wave = sum(np.sin(2 * np.pi * tone * time) for tone in tones)
+    return (wave * 2 ** 29).astype(np.int32).reshape(-1, 1)
+
+
+def test_bands() -> None:
+    """Tests the textual description of frequency bands."""
+    bands = parse_bands('300-3400,  4000-8000, ')
+    assert bands == [Band(300, 3400), Band(4000, 8000)]
+    assert format_bands(bands) == '300-3400, 4000-8000'
+    assert not parse_bands('')
+    for spec in ('300', '3400-300', 'a-b'):
+        with pytest.raises(ValueError):
+            parse_bands(spec)
+
+
+def test_spectral_detection() -> None:
+    """Tests the detection of sound over the noise floor of bands."""
+    detector = SpectralDetector(8000, [Band(300, 1000), Band(1500, 2500)])
+
+    # A hum out of the bands, analysed in blocks of any size
+    hum = _tones(100)
+    assert not any(
+        detector.detect(hum[start:start + 300])
+        for start in range(0, len(hum), 300)
+    )
+
+    # Quieter sound of a band
+    assert detector.detect(_tones(100, 2000) // 4)
+    assert detector.levels[1] > detector.floor[1] + detector.margin
+
+    # Louder background learned
+    detector = SpectralDetector(8000, [Band(300, 1000)], adaptation=0.1)
+    detector.detect(_tones(500, seconds=0.1) // 16)
+    assert detector.detect(_tones(500))
+    assert not detector.detect(_tones(500))
+
+
+def test_loudness() -> None:
+    """Tests the loudness of the sliding window."""
+    monitor = AudioMonitor(sample_rate=1000, window=0.2)
+    assert monitor.rms_dbfs == float('-inf')
+
+    _feed(monitor, True)
+    assert round(monitor.rms_dbfs) == round(monitor.peak_dbfs) == -6
+
+    # Half of the window with sound
+    _feed(monitor, False)
+    assert round(monitor.rms_dbfs) == -9
+    assert round(monitor.peak_dbfs) == -6
+
+    # Sound out of the window
+    _feed(monitor, False)
+    assert monitor.rms_dbfs == monitor.peak_dbfs == float('-inf')
+
+
+def test_sound_detection() -> None:
+    """Tests the detection and recording of sound."""
+    monitor = AudioMonitor(
+        seconds=0.3,
+        threshold=-20,
+        sample_rate=1000,
+        window=0.2
+    )
+    listener = monitor.listen()
+
+    # Silence
+    _feed(monitor, False, 4)
+    assert listener.poll() == (False, None)
+
+    # Sound is detected within the block
+    _feed(monitor, True)
+    assert listener.poll() == (True, None)
+
+    # The recording starts with the block with sound
+    _feed(monitor, False)
+    assert listener.poll() == (False, None)
+    _feed(monitor, False)
+    heard, recording = listener.poll()
+    assert not heard
+    recording = np.concatenate(recording)
+    assert recording.shape == (300, 1)
+    assert recording[:100].all() and not recording[100:].any()
+    assert listener.poll() == (False, None)
+
+    # Continuous sound is detected once
+    _feed(monitor, True, 3)
+    heard, recording = listener.poll()
+    assert heard and all(segment.all() for segment in recording)
+    _feed(monitor, True, 3)
+    assert listener.poll() == (False, None)
+
+
+def test_preroll() -> None:
+    """Tests the clips of events with the audio before them."""
+    monitor = AudioMonitor(
+        seconds=0.2,
+        threshold=-20,
+        sample_rate=1000,
+        pre_seconds=0.2
+    )
+    listener = monitor.listen()
+    callback = getattr(monitor, '_callback')
+
+    def feed(*values: int) -> None:
+        """Feeds a quiet block of 100 samples with every value."""
+        for value in values:
+            callback(np.full((100, 1), value, np.int32), 100, None, None)
+
+    def blocks(clip: tuple) -> list:
+        """Gets the values of the blocks of the segments of a clip."""
+        return np.concatenate(clip)[::100, 0].tolist()
+
+    # Shorter pre-roll at the start of the monitoring
+    feed(1)
+    assert listener.trigger()
+    assert not listener.trigger()
+    feed(2)
+    assert listener.poll() == (False, None)
+    feed(3)
+    heard, clip = listener.poll()
+    assert not heard and blocks(clip) == [1, 2, 3]
+
+    # Clip across the end of the circular buffer, as views of its segments
+    feed(4, 5, 6, 7, 8)
+    listener.trigger()
+    feed(9, 10)
+    clip = listener.poll()[1]
+    assert len(clip) == 2
+    assert all(np.shares_memory(segment, getattr(monitor, '_buffer')) for segment in clip)
+    assert blocks(clip) == [7, 8, 9, 10]
+
+    # Samples overwritten before polling are discarded
+    listener.trigger()
+    feed(11, 12, 13, 14, 15, 16, 17)
+    assert blocks(listener.poll()[1]) == [10, 11, 12]
+
+
+def test_spectral_monitor() -> None:
+    """Tests the detection of sound by frequency bands."""
+    monitor = AudioMonitor(
+        seconds=0.5,
+        threshold=-90,
+        sample_rate=8000,
+        bands=[Band(1500, 2500)]
+    )
+    listener = monitor.listen()
+    callback = getattr(monitor, '_callback')
+
+    # Loud hum out of the band
+    hum = _tones(100)
+    callback(hum, len(hum), None, None)
+    assert listener.poll() == (False, None)
+
+    sound = _tones(100, 2000)
+    callback(sound, len(sound), None, None)
+    heard, recording = listener.poll()
+    assert heard and np.concatenate(recording).shape == (4000, 1)
+
+
+def test_shared_listeners(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests the monitor shared by the listeners of the process.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    stream = mocker.patch.object(audio.sd, 'InputStream')
+    first = AudioMonitor.shared_listener(0.2, -20, 1000)
+    second = AudioMonitor.shared_listener(0.2, -20, 1000)
+    monitor = first.monitor
+    assert second.monitor is monitor
+    stream.assert_called_once()
+
+    # Sound is heard and recorded by every listener
+    _feed(monitor, True)
+    assert first.poll() == second.poll() == (True, None)
+    _feed(monitor, False)
+    assert first.poll()[1][0].shape == second.poll()[1][0].shape == (200, 1)
+
+    # Triggered clips are only sent to the listener triggering them
+    assert first.trigger()
+    _feed(monitor, False, 2)
+    assert first.poll()[1][0].shape == (200, 1)
+    assert second.poll() == (False, None)
+
+    # The stream is closed with the last listener
+    first.close()
+    stream.return_value.close.assert_not_called()
+    second.close()
+    stream.return_value.close.assert_called_once()
+    third = AudioMonitor.shared_listener(0.2, -20, 1000)
+    assert third.monitor is not monitor
+    third.close()
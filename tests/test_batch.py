@@ -0,0 +1,92 @@
+"""
+Test suite for offline video analysis testing.
+"""
+import json
+import os
+
+import _pytest.tmpdir
+import cv2
+import numpy as np
+
+from surveillance_bot.batch import analyse_video, find_videos, main
+
+
+def _write_video(path: str) -> None:
+    """
+    Writes a 5 seconds video with motion from 1 to 1.5 s and 4 to 4.5 s.
+
+    Args:
+        path: Path of the video file.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 20, (320, 240))
+    for index in range(100):
+        image = np.full((240, 320, 3), 64, np.uint8)
+        position = 20 + 8 * (index % 20) if index // 10 in (2, 8) else 20
+        cv2.rectangle(image, (position, 80), (position + 60, 140), (255,) * 3, -1)
+        writer.write(image)
+    writer.release()
+
+
+def test_analyse_video(tmp_path: _pytest.tmpdir.tmp_path) -> None:
+    """
+    Tests the detection of the motion events of a video.
+
+    Args:
+        tmp_path: Fixture for temporary path handling.
+    """
+    path = str(tmp_path / 'video.avi')
+    _write_video(path)
+
+    result = analyse_video(path, gap=1, clips_dir=str(tmp_path))
+    assert result['frames'] == 100
+    assert result['duration'] == 5
+    events = result['events']
+    assert len(events) == 2
+    assert 1 <= events[0]['start'] < events[0]['end'] <= 1.6
+    assert 4 <= events[1]['start'] < events[1]['end'] <= 4.6
+    x, y, width, height, area = events[0]['boxes'][0]['boxes'][0]
+    assert x <= 100 and 60 <= y <= 90 and width >= 60 and height >= 60
+    assert area > 2000
+    assert os.path.getsize(events[0]['clip']) > 0
+
+    # Sparse analysis finds the same events
+    result = analyse_video(path, gap=1, step=2)
+    assert result['frames'] == 100
+    assert result['duration'] == 5
+    assert len(result['events']) == 2
+
+
+def test_main(tmp_path: _pytest.tmpdir.tmp_path) -> None:
+    """
+    Tests the analysis of a directory of videos in parallel.
+
+    Args:
+        tmp_path: Fixture for temporary path handling.
+    """
+    videos = tmp_path / 'videos'
+    (videos / 'day').mkdir(parents=True)
+    _write_video(str(videos / 'a.avi'))
+    _write_video(str(videos / 'day' / 'b.avi'))
+    (videos / 'notes.txt').write_text('')
+    assert find_videos([str(videos)]) == [
+        str(videos / 'a.avi'),
+        str(videos / 'day' / 'b.avi')
+    ]
+
+    output = tmp_path / 'results.json'
+    main([
+        str(videos),
+        str(tmp_path / 'missing.avi'),
+        '--threshold', '10',
+        '--gap', '1',
+        '--jobs', '2',
+        '--output', str(output)
+    ])
+    report = json.loads(output.read_text())
+    assert report['threshold'] == 10
+    results = {
+        os.path.basename(video['path']): video for video in report['videos']
+    }
+    assert len(results['a.avi']['events']) == 2
+    assert len(results['b.avi']['events']) == 2
+    assert 'error' in results['missing.avi']
@@ -0,0 +1,63 @@
+"""
+Test suite for motion analysis benchmark testing.
+"""
+import json
+
+import _pytest.tmpdir
+import pytest_mock
+
+from surveillance_bot.audio import AudioMonitor
+from surveillance_bot.benchmark import BenchmarkCase, main, run_case
+
+
+def test_run_case(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests the measurements of a benchmark case.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    shared_listener = mocker.patch.object(AudioMonitor, 'shared_listener')
+    result = run_case(
+        BenchmarkCase('detection', 'synthetic:320x240', 'difference', 5),
+        frames=20
+    )
+    assert result.frame_size == (320, 240)
+    assert result.frames >= 20
+    assert result.fps > 0
+    for stage in ('grayscale', 'blur', 'diff', 'grid', 'overlay'):
+        stats = result.stages[stage]
+        assert stats['samples'] > 0
+        assert 0 <= stats['p50'] <= stats['p90'] <= stats['p99']
+
+    # The microphone is not listened by default
+    shared_listener.assert_not_called()
+
+
+def test_main(tmp_path: _pytest.tmpdir.tmp_path) -> None:
+    """
+    Tests the benchmark results file.
+
+    Args:
+        tmp_path: Fixture for temporary path handling.
+    """
+    path = tmp_path / 'results.json'
+    main([
+        '--mode', 'surveillance',
+        '--source', 'synthetic:320x240',
+        '--detector', 'average',
+        '--threshold', '10',
+        '--frames', '20',
+        '--label', 'test',
+        '--output', str(path)
+    ])
+    report = json.loads(path.read_text())
+    assert report['label'] == 'test'
+    assert len(report['results']) == 1
+    result = report['results'][0]
+    assert result['mode'] == 'surveillance'
+    assert result['detector'] == 'average'
+    assert result['threshold'] == 10
+    assert result['frame_size'] == [320, 240]
+    assert result['fps'] > 0
+    assert 'diff' in result['stages']
@@ -7,6 +7,7 @@ from time import sleep
 
 import _pytest.logging
 import _pytest.tmpdir
+import numpy as np
 import pytest
 import pytest_mock
 
@@ -281,6 +282,54 @@ def test_get_photo_command(mocker: pytest_mock.mocker) -> None:
     bot.camera.stop()
 
 
+def test_heatmap_commands(
+        tmp_path: _pytest.tmpdir.tmp_path,
+        mocker: pytest_mock.mocker
+) -> None:
+    """
+    Tests "heatmap" and "heatmap_reset" commands invocation.
+
+    Args:
+        tmp_path: Fixture for temporary path handling.
+        mocker: Fixture for object mocking.
+    """
+    mock_telegram_updater(mocker)
+    mock_video_capture(mocker)
+    bot = Bot(
+        token='FAKE_TOKEN',
+        username='FAKE_USER',
+        persistence_dir=str(tmp_path)
+    )
+    bot.camera.start()
+
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+    text_params, update.message.reply_text = get_kwargs_grabber()
+    photo_params, context.bot.send_photo = get_kwargs_grabber()
+
+    bot.updater.dispatcher.commands['heatmap'](update, context)
+    assert 'No motion' in text_params[-1]['text']
+
+    mask = np.full((240, 320), 255, np.uint8)
+    bot.camera.heatmap.update(mask, 0.0, mask.shape)
+    bot.updater.dispatcher.commands['heatmap'](update, context)
+    assert photo_params[0]['photo'].read(2) == b'\xff\xd8'
+
+    # The heatmap persists
+    getattr(bot, '_save_heatmap')(0)
+    bot.camera.stop()
+    bot = Bot(
+        token='FAKE_TOKEN',
+        username='FAKE_USER',
+        persistence_dir=str(tmp_path)
+    )
+    assert bot.camera.heatmap.heat.any()
+
+    bot.updater.dispatcher.commands['heatmap_reset'](update, context)
+    assert 'cleared' in text_params[-1]['text']
+    assert not bot.camera.heatmap.heat.any()
+
+
 def test_get_video_command(mocker: pytest_mock.mocker) -> None:
     """
     Tests "get_video" command invocation.
@@ -342,6 +391,8 @@ def test_surveillance_start_command(mocker: pytest_mock.mocker) -> None:
     assert 'not active' in parameters[0]['text']
     assert 'started' in parameters[1]['text']
     assert 'is active' in parameters[2]['text']
+    assert 'frames analysed' in parameters[2]['text']
+    assert 'Deliver stage' in parameters[2]['text']
     assert 'DETECTED' in parameters[3]['text']
     assert 'Recording' in parameters[4]['text']
 
@@ -384,3 +435,42 @@ def test_surveillance_errors(mocker: pytest_mock.mocker) -> None:
     assert 'not started' in parameters[0]['text']
     assert 'already started' in parameters[2]['text']
     bot.camera.stop()
+
+
+def test_camera_selection(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests camera selection through command arguments.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_telegram_updater(mocker)
+    mock_video_capture(mocker)
+    bot = Bot(token='FAKE_TOKEN', username='FAKE_USER', cam_ids=[0, 1])
+    bot.cameras.start()
+
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+    context.bot_data['timestamp'] = False
+
+    parameters, update.message.reply_text = get_kwargs_grabber()
+    photo_params, context.bot.send_photo = get_kwargs_grabber()
+
+    # All cameras by default
+    bot.updater.dispatcher.commands['get_photo'](update, context)
+    assert [p['caption'] for p in photo_params] == ['Camera 0', 'Camera 1']
+
+    # Single camera
+    context.args = ['1']
+    bot.updater.dispatcher.commands['get_photo'](update, context)
+    assert photo_params[2]['caption'] == 'Camera 1'
+
+    bot.updater.dispatcher.commands['surveillance_status'](update, context)
+    assert parameters[0]['text'] == 'Camera 1: Surveillance mode is not active'
+
+    # Unknown camera
+    context.args = ['5']
+    bot.updater.dispatcher.commands['get_photo'](update, context)
+    assert len(photo_params) == 3
+    assert 'not found' in parameters[1]['text']
+    bot.cameras.stop()
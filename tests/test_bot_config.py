@@ -194,6 +194,45 @@ def test_change_srv_video_duration() -> None:
     assert '*Surveillance video duration*' in parameters[0]['text']
 
 
+def test_change_srv_audio_preroll() -> None:
+    """Tests surveillance audio pre-roll changing action."""
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+
+    parameters, update.callback_query.edit_message_text = get_kwargs_grabber()
+    BotConfig.ensure_defaults(context)
+    assert getattr(BotConfig, '_change_srv_audio_preroll')(
+        update,
+        context
+    ) == BotConfig.PREROLL_INPUT
+    assert '*Surveillance audio pre\\-roll*' in parameters[0]['text']
+    assert 'Current value: *2*' in parameters[0]['text']
+
+    context.user_data[BotConfig.RETURN_HANDLER] = fake_handler
+    update.message.text = '30'
+    assert getattr(BotConfig, '_preroll_input')(
+        update,
+        context
+    ) == 'fake_return'
+    assert context.bot_data[BotConfig.SRV_AUDIO_PREROLL] == 30
+
+    # Invalid values
+    params, update.message.reply_text = get_kwargs_grabber()
+    for value in ('31', '255', '-1', 'BAD_TYPE'):
+        update.message.text = value
+        assert getattr(BotConfig, '_preroll_input')(
+            update,
+            context
+        ) == BotConfig.PREROLL_INPUT
+        assert 'between 0 and 30' in params.pop()['text']
+    assert context.bot_data[BotConfig.SRV_AUDIO_PREROLL] == 30
+
+    # Pre-rolls over the maximum stored by previous versions
+    context.bot_data[BotConfig.SRV_AUDIO_PREROLL] = 255
+    BotConfig.ensure_defaults(context)
+    assert context.bot_data[BotConfig.SRV_AUDIO_PREROLL] == 30
+
+
 def test_change_srv_picture_interval() -> None:
     """Tests surveillance picture interval changing action."""
     update = get_mocked_update_object()
@@ -216,6 +255,167 @@ def test_change_motion_contours() -> None:
     assert '*Motion contours*' in parameters[0]['text']
 
 
+def test_change_srv_motion_detector() -> None:
+    """Tests motion detector selection for every camera."""
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+
+    parameters, update.callback_query.edit_message_text = get_kwargs_grabber()
+    BotConfig.ensure_defaults(context)
+
+    # Single camera, the strategy is requested straight away
+    assert getattr(BotConfig, '_change_srv_motion_detector')(
+        update,
+        context,
+        cam_ids=[0],
+        return_handler=getattr(BotConfig, '_surveillance_config')
+    ) == BotConfig.DETECTOR_INPUT
+    assert '*Motion detector of camera 0*' in parameters[0]['text']
+    assert parameters[0]['reply_markup'].to_dict()['inline_keyboard'] == [[
+        {'text': name, 'callback_data': name}
+        for name in ('difference', 'average', 'mog2', 'knn')
+    ]]
+
+    # Several cameras, the camera is requested first
+    assert getattr(BotConfig, '_change_srv_motion_detector')(
+        update,
+        context,
+        cam_ids=[0, 2],
+        return_handler=getattr(BotConfig, '_surveillance_config')
+    ) == BotConfig.CAMERA_INPUT
+    assert parameters[1]['reply_markup'].to_dict()['inline_keyboard'] == [[
+        {'text': 'Camera 0', 'callback_data': '0'},
+        {'text': 'Camera 2', 'callback_data': '2'}
+    ]]
+
+    update.callback_query.data = '2'
+    assert getattr(BotConfig, '_camera_input')(
+        update,
+        context
+    ) == BotConfig.DETECTOR_INPUT
+    assert '*Motion detector of camera 2*' in parameters[2]['text']
+
+    update.callback_query.data = 'knn'
+    assert getattr(BotConfig, '_detector_input')(
+        update,
+        context
+    ) == BotConfig.SURVEILLANCE_CONFIG
+    assert context.bot_data[BotConfig.SRV_MOTION_DETECTOR] == {2: 'knn'}
+    assert getattr(BotConfig, '_per_camera_str')(
+        context,
+        BotConfig.SRV_MOTION_DETECTOR,
+        'difference'
+    ) == 'camera 2: knn, others: difference'
+
+
+def test_change_srv_idle_analysis_fps() -> None:
+    """Tests idle analysis rate selection for every camera."""
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+
+    parameters, update.callback_query.edit_message_text = get_kwargs_grabber()
+    BotConfig.ensure_defaults(context)
+
+    assert getattr(BotConfig, '_change_srv_idle_analysis_fps')(
+        update,
+        context,
+        cam_ids=[0, 1],
+        return_handler=getattr(BotConfig, '_surveillance_config')
+    ) == BotConfig.CAMERA_INPUT
+
+    update.callback_query.data = '1'
+    assert getattr(BotConfig, '_camera_input')(
+        update,
+        context
+    ) == BotConfig.INTEGER_INPUT
+    assert '*Idle analysis rate of camera 1*' in parameters[1]['text']
+
+    update.message.text = '2'
+    context.user_data[BotConfig.RETURN_HANDLER] = fake_handler
+    assert getattr(BotConfig, '_integer_input')(
+        update,
+        context
+    ) == 'fake_return'
+    assert context.bot_data[BotConfig.SRV_IDLE_ANALYSIS_FPS] == {1: 2}
+
+
+def test_change_srv_motion_regions() -> None:
+    """Tests motion regions input for a camera."""
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+
+    parameters, update.callback_query.edit_message_text = get_kwargs_grabber()
+    reply_parameters, update.message.reply_text = get_kwargs_grabber()
+    BotConfig.ensure_defaults(context)
+
+    assert getattr(BotConfig, '_change_srv_motion_regions')(
+        update,
+        context,
+        cam_ids=[0],
+        return_handler=getattr(BotConfig, '_surveillance_config')
+    ) == BotConfig.REGIONS_INPUT
+    assert '*Motion regions of camera 0*' in parameters[0]['text']
+
+    # Invalid polygon
+    update.message.text = '0,0 1,0'
+    assert getattr(BotConfig, '_regions_input')(
+        update,
+        context
+    ) == BotConfig.REGIONS_INPUT
+    assert 'Invalid value' in reply_parameters[0]['text']
+
+    update.message.text = '0,0 1,0 1,0.5;!0.8,0 1,0 1,0.2'
+    assert getattr(BotConfig, '_regions_input')(
+        update,
+        context
+    ) == BotConfig.SURVEILLANCE_CONFIG
+    assert context.bot_data[BotConfig.SRV_MOTION_REGIONS] == {
+        0: '0,0 1,0 1,0.5; !0.8,0 1,0 1,0.2'
+    }
+    assert '0,0 1,0 1,0\\.5; \\!0\\.8' in reply_parameters[1]['text']
+
+    update.message.text = 'none'
+    getattr(BotConfig, '_regions_input')(update, context)
+    assert context.bot_data[BotConfig.SRV_MOTION_REGIONS] == {}
+
+
+def test_change_srv_audio_bands() -> None:
+    """Tests audio bands input."""
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+
+    parameters, update.callback_query.edit_message_text = get_kwargs_grabber()
+    reply_parameters, update.message.reply_text = get_kwargs_grabber()
+    BotConfig.ensure_defaults(context)
+
+    assert getattr(BotConfig, '_change_srv_audio_bands')(
+        update,
+        context,
+        return_handler=getattr(BotConfig, '_surveillance_config')
+    ) == BotConfig.BANDS_INPUT
+    assert 'Current value: *disabled*' in parameters[0]['text']
+
+    # Invalid band
+    update.message.text = '3400-300'
+    assert getattr(BotConfig, '_bands_input')(
+        update,
+        context
+    ) == BotConfig.BANDS_INPUT
+    assert 'Invalid value' in reply_parameters[0]['text']
+
+    update.message.text = '300-3400,4000-8000'
+    assert getattr(BotConfig, '_bands_input')(
+        update,
+        context
+    ) == BotConfig.SURVEILLANCE_CONFIG
+    assert context.bot_data[BotConfig.SRV_AUDIO_BANDS] == '300-3400, 4000-8000'
+    assert '300\\-3400, 4000\\-8000 Hz' in reply_parameters[1]['text']
+
+    update.message.text = 'none'
+    getattr(BotConfig, '_bands_input')(update, context)
+    assert context.bot_data[BotConfig.SRV_AUDIO_BANDS] == ''
+
+
 def test_boolean_question() -> None:
     """Tests the request for a boolean value to the user."""
     update = get_mocked_update_object()
@@ -318,6 +518,46 @@ def test_integer_input() -> None:
         assert 'Invalid value' in params.pop()['text']
 
 
+def test_dbfs_input() -> None:
+    """Tests the store of a sound level received from the user."""
+    update = get_mocked_update_object()
+    context = get_mocked_context_object()
+
+    context.user_data[BotConfig.CURRENT_VARIABLE] = 'fake_variable'
+    context.user_data[BotConfig.RETURN_HANDLER] = fake_handler
+
+    update.message.text = '-55.5'
+    assert getattr(BotConfig, '_dbfs_input')(
+        update,
+        context
+    ) == 'fake_return'
+    assert context.bot_data['fake_variable'] == -55.5
+
+    # Invalid values
+    params, update.message.reply_text = get_kwargs_grabber()
+    for value in ('3', '-121', 'nan', '-inf', 'BAD_TYPE'):
+        update.message.text = value
+        assert getattr(BotConfig, '_dbfs_input')(
+            update,
+            context
+        ) == BotConfig.DBFS_INPUT
+        assert 'Invalid value' in params.pop()['text']
+    assert context.bot_data['fake_variable'] == -55.5
+
+
+def test_audio_threshold_migration() -> None:
+    """Tests the conversion of audio thresholds into dBFS."""
+    context = get_mocked_context_object()
+    for value, expected in ((0.1, -20), (1, 0), (-55, -55), (7, -40)):
+        context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD] = value
+        BotConfig.ensure_defaults(context)
+        assert context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD] == expected
+
+        # Converted only once
+        BotConfig.ensure_defaults(context)
+        assert context.bot_data[BotConfig.SRV_AUDIO_THRESHOLD] == expected
+
+
 def test_end() -> None:
     """Tests the end configuration process method."""
     update = get_mocked_update_object()
@@ -2,13 +2,24 @@
 Test suite for Camera class testing.
 """
 from hashlib import md5
-from time import sleep
+from time import monotonic, sleep
 
+import cv2
+import numpy as np
 import pytest
 import pytest_mock
 
-from opencv_mock import FRAMES_MD5, mock_bad_video_writer, mock_video_capture
+from opencv_mock import (
+    FRAMES,
+    FRAMES_MD5,
+    mock_bad_video_writer,
+    mock_video_capture
+)
 from surveillance_bot.camera import Camera, CodecNotAvailable
+from surveillance_bot.capture import CameraDevice
+from surveillance_bot.frames import Frame
+from surveillance_bot.motion import MOTION_BOX
+from surveillance_bot.sources import SyntheticSource
 
 
 def test_init_ok(mocker: pytest_mock.mocker) -> None:
@@ -74,6 +85,49 @@ def test_get_photo(mocker: pytest_mock.mocker) -> None:
     camera.stop()
 
 
+def test_get_photo_capture_process(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests photo taking method when frames are grabbed by another process.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    camera = Camera(capture_process=True)
+    camera.start()
+
+    image = camera.get_photo(False)
+    assert md5(image.read()).hexdigest() in FRAMES_MD5
+
+    camera.stop()
+
+
+def test_get_photo_passthrough(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests photo taking from a device in MJPEG passthrough mode.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, mjpeg=True)
+    encode = mocker.spy(cv2, 'imencode')
+
+    camera = Camera('mjpeg:0')
+    camera.start()
+
+    # Photo is sent as delivered by the device
+    image = camera.get_photo(False)
+    assert md5(image.read()).hexdigest() in FRAMES_MD5
+    encode.assert_not_called()
+
+    # Time stamped photo is encoded
+    camera.get_photo()
+    encode.assert_called_once()
+
+    camera.stop()
+
+
 def test_get_video(mocker: pytest_mock.mocker) -> None:
     """
     Tests video taking method.
@@ -120,6 +174,39 @@ def test_surveillance_mode(mocker: pytest_mock.mocker) -> None:
     camera.stop()
 
 
+def test_surveillance_photos(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests every photo is taken when the video is a multiple of their interval.
+
+    The frame placed in the last slot of the video is captured before the
+    time of the last photo.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, reader=False)
+    mocker.patch.object(CameraDevice, 'fps', 10)
+    mocker.patch.object(CameraDevice, 'frame_size', (640, 480))
+    frames = [
+        (True, Frame(frame_id, timestamp, FRAMES[0]), None)
+        for frame_id, timestamp in enumerate([0, 0.5, 0.96, 0.98, 1.0], 1)
+    ]
+
+    camera = Camera()
+    mocker.patch.object(camera, '_motion_detection', return_value=frames)
+    gen = camera.surveillance_start(
+        timestamp=False,
+        video_seconds=1,
+        picture_seconds=0.5
+    )
+
+    assert 'detected' in next(gen)
+    for photo_id in (1, 2):
+        photo = next(gen)
+        assert (photo['id'], photo['total']) == (photo_id, 2)
+    assert 'video' in next(gen)
+
+
 def test_detect_duplicated_frames(mocker: pytest_mock.mocker) -> None:
     """
     Tests duplicated frames detection.
@@ -142,3 +229,53 @@ def test_detect_duplicated_frames(mocker: pytest_mock.mocker) -> None:
     camera.surveillance_stop()
 
     camera.stop()
+
+
+def test_adaptive_analysis_rate(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests sparse motion analysis while idle and full rate during motion.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    # Static scene, frames are sampled at the idle rate
+    camera = Camera(SyntheticSource(objects=0))
+    camera.start()
+    gen = getattr(camera, '_motion_detection')(idle_fps=5)
+    start = monotonic()
+    assert not any(next(gen)[0] for _ in range(5))
+    assert monotonic() - start >= 0.7
+    stats = camera.analysis_stats
+    assert not stats.full_rate
+    assert stats.analysed == 5
+    assert stats.analysed_ratio < 0.5
+    assert stats.idle_latency == 0.2
+    camera.surveillance_stop()
+    camera.stop()
+
+    # Moving scene, every frame is analysed once motion is detected
+    mock_video_capture(mocker)
+    camera = Camera()
+    camera.start()
+    gen = getattr(camera, '_motion_detection')(
+        idle_fps=1,
+        full_rate_seconds=10
+    )
+    start = monotonic()
+    next(gen)  # First frame is learnt
+    assert all(next(gen)[0] for _ in range(10))
+    assert monotonic() - start < 2
+    assert camera.analysis_stats.full_rate
+    assert camera.heatmap.heat.any()
+    camera.surveillance_stop()
+    camera.stop()
+
+
+def test_draw_boxes() -> None:
+    """Tests marking of the areas in motion on a frame."""
+    frame = np.zeros((100, 100, 3), np.uint8)
+    boxes = np.array([(5, 5, 10, 10, 100), (20, 30, 5, 5, 25)], MOTION_BOX)
+    getattr(Camera, '_draw_boxes')(frame, boxes, scale=0.5)
+    assert frame[10, 10:31, 1].all() and frame[10:31, 10, 1].all()
+    assert frame[60, 40:51, 1].all()
+    assert not frame[11:30, 11:30].any()
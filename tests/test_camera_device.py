@@ -2,13 +2,20 @@
 Test suite for CameraDevice class testing.
 """
 import time
+from threading import Thread
 
+import cv2
 import numpy as np
 import pytest
 import pytest_mock
 
 from opencv_mock import FPS, FRAME_SIZE, mock_video_capture
-from surveillance_bot.camera import CameraConnectionError, CameraDevice
+from surveillance_bot.capture import (
+    CameraConnectionError,
+    CameraDevice,
+    ProxyScaler
+)
+from surveillance_bot.frames import FrameRing
 
 
 def test_init_ok(mocker: pytest_mock.mocker) -> None:
@@ -106,3 +113,209 @@ def test_read(mocker: pytest_mock.mocker) -> None:
     assert frame_id < camera_device.read()[0]
 
     camera_device.stop()
+
+
+def test_read_without_copy(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests that frames are read as read-only views of the frame ring.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, fps=5)
+
+    camera_device = CameraDevice()
+    frame = camera_device.get_frame()
+    assert isinstance(frame.timestamp, float)
+    assert not frame.image.flags.writeable
+    with pytest.raises(ValueError):
+        frame.image[0, 0] = 0
+
+    # Same frame is not copied
+    frame_id, image = camera_device.read(timestamp=False)
+    assert frame_id == frame.id
+    assert np.shares_memory(image, frame.image)
+
+    # Timestamped frame is a writable copy
+    image = camera_device.read()[1]
+    assert image.flags.writeable
+    assert not np.shares_memory(image, frame.image)
+
+
+def test_frame_ring() -> None:
+    """Tests frame ring slot reusing."""
+    ring = FrameRing(2, (4, 4))
+    slots = []
+    for i in range(4):
+        slot = ring.next_slot()
+        slot.fill(i)
+        slots.append(slot)
+        assert ring.publish(float(i)) == i
+        frame = ring.latest()
+        assert frame.id == i
+        assert frame.timestamp == i
+        assert np.all(frame.image == i)
+    assert slots[0] is slots[2]
+    assert slots[1] is slots[3]
+
+
+def test_frame_ring_fps() -> None:
+    """Tests frame rate estimation from the capture timestamps."""
+    ring = FrameRing(2, (4, 4))
+    assert ring.fps == 0
+    for i in range(10):
+        ring.publish(i / 10)
+    assert ring.fps == pytest.approx(10)
+
+    # Rate follows a slower device
+    for i in range(40):
+        ring.publish(1 + i / 5)
+    assert ring.fps == pytest.approx(5, abs=0.5)
+
+    # Time elapsed while stopped is not accounted
+    ring.restart_rate()
+    ring.publish(100)
+    assert ring.fps == 0
+    ring.publish(100.5)
+    assert ring.fps == pytest.approx(2)
+
+
+def test_frame_ring_request() -> None:
+    """Tests frame requesting when grabbed frames are not published."""
+    ring = FrameRing(2, (4, 4))
+    ring.publish(1.0)
+    assert not ring.requested
+    assert ring.wait(-1, timeout=0).id == 0
+
+    # Latest grabbed frame is not published, readers wait for a new one
+    ring.skip(2.0)
+    assert ring.wait(-1, timeout=0.01) is None
+    assert ring.requested
+    ring.publish(3.0)
+    assert not ring.requested
+    assert ring.wait(-1, timeout=0).id == 1
+
+
+def test_decode_on_request(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests that frames are only decoded when they are read.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    camera_device = CameraDevice()
+    frame_id = camera_device.get_frame().id
+    camera_device.start()
+    time.sleep(0.2)
+    assert camera_device.fps > 0
+    ring = camera_device._ring  # pylint: disable=protected-access
+    assert ring.last_id == frame_id
+
+    # Latest grabbed frame is decoded on reading
+    frame = camera_device.get_frame()
+    assert frame.id > frame_id
+    assert time.monotonic() - frame.timestamp < 2 / FPS
+    camera_device.stop()
+
+
+def test_wait_for_frame(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests blocking wait for a new frame.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    camera_device = CameraDevice()
+    frame_id = camera_device.get_frame().id
+
+    # Device is not grabbing, so there is not a new frame
+    assert camera_device.wait_for_frame(frame_id, timeout=0.1) is None
+    assert camera_device.read(after_id=frame_id, timeout=0.1)[0] == frame_id
+
+    camera_device.start()
+    frame = camera_device.wait_for_frame(frame_id, timeout=1)
+    assert frame is not None
+    assert frame.id > frame_id
+    assert camera_device.read(after_id=frame.id, timeout=1)[0] > frame.id
+    camera_device.stop()
+
+
+def test_ring_reallocation(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests readers waiting while the frame ring is reallocated.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    camera_device = CameraDevice()
+    frame_id = camera_device.get_frame().id
+    device = camera_device._device  # pylint: disable=protected-access
+    image = np.zeros((120, 160, 3), np.uint8)
+    mocker.patch.object(device, 'retrieve', return_value=(True, image))
+
+    frames = []
+    waiter = Thread(
+        target=lambda: frames.append(
+            camera_device.wait_for_frame(frame_id, timeout=5)
+        )
+    )
+    waiter.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    camera_device.start()
+    waiter.join()
+    camera_device.stop()
+
+    # Frame ids continue from the previous ring
+    assert time.monotonic() - started < 1
+    assert frames[0].id == frame_id + 1
+    assert frames[0].image.shape == image.shape
+
+
+def test_frame_ring_retire() -> None:
+    """Tests frame ids of a replacing ring and retired ring readers."""
+    ring = FrameRing(2, (4, 4), last_id=6)
+    assert ring.publish(1.0) == 7
+    ring.retire()
+    assert ring.wait(7, timeout=5) is None
+
+
+def test_proxy(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests the analysis proxy published with every frame.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    camera_device = CameraDevice(proxy_width=160)
+    frame = camera_device.read_frame(timestamp=False)
+    assert frame.proxy.shape == (120, 160)
+    assert not frame.proxy.flags.writeable
+
+    # Proxy is the grayscale version of the frame
+    expected = cv2.resize(
+        cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY),
+        (160, 120),
+        interpolation=cv2.INTER_AREA
+    )
+    assert np.abs(frame.proxy.astype(int) - expected).max() <= 2
+
+
+def test_proxy_scaler() -> None:
+    """Tests proxy shape calculation."""
+    assert ProxyScaler((1080, 1920, 3), 320).shape == (180, 320)
+    assert ProxyScaler((480, 640, 3), 320).shape == (240, 320)
+    assert ProxyScaler((120, 160, 3), 320).shape == (120, 160)
+
+    image = np.full((120, 160, 3), 255, np.uint8)
+    proxy = np.empty((120, 160), np.uint8)
+    ProxyScaler(image.shape, 320)(image, proxy)
+    assert np.all(proxy == 255)
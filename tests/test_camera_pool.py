@@ -0,0 +1,58 @@
+"""
+Test suite for CameraPool class testing.
+"""
+import pytest
+import pytest_mock
+
+from opencv_mock import mock_video_capture
+from surveillance_bot.camera import CameraNotFound, CameraPool
+
+
+def test_init_ok(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests CameraPool instance construction.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, reader=False)
+
+    pool = CameraPool([0, 2])
+    assert len(pool) == 2
+    assert list(pool) == [0, 2]
+    assert pool.default is pool[0]
+    assert pool[0].codec == pool[2].codec
+
+
+def test_select(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests camera selection.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, reader=False)
+
+    pool = CameraPool([0, 2])
+    assert pool.select() == [(0, pool[0]), (2, pool[2])]
+    assert pool.select('all') == [(0, pool[0]), (2, pool[2])]
+    assert pool.select('2') == [(2, pool[2])]
+    with pytest.raises(CameraNotFound):
+        pool.select('1')
+    with pytest.raises(CameraNotFound):
+        pool.select('front')
+
+
+def test_start_and_stop(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests camera pool starting and stopping.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, reader=False)
+
+    pool = CameraPool([0, 1])
+    pool.start()
+    assert pool.is_surveillance_active is False
+    pool.stop()
@@ -6,6 +6,7 @@ import logging
 import _pytest.logging
 import pytest_mock
 
+from opencv_mock import mock_video_capture
 import surveillance_bot.main
 
 
@@ -21,7 +22,7 @@ def test_main(
         mocker: Fixture for object mocking.
     """
     mocker.patch('surveillance_bot.main.bot.Updater')
-    mocker.patch('cv2.VideoCapture')
+    mock_video_capture(mocker, reader=False)
     mocker.patch('cv2.VideoWriter')
 
     surveillance_bot.main.BOT_API_TOKEN = 'FAKE_TOKEN'
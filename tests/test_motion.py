@@ -0,0 +1,192 @@
+"""
+Test suite for motion detection strategies testing.
+"""
+import pathlib
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+from surveillance_bot.motion import (
+    DEFAULT_DETECTOR,
+    DETECTORS,
+    MOTION_BOX,
+    FrameDifferenceDetector,
+    MotionHeatmap,
+    Region,
+    create_detector,
+    format_regions,
+    parse_regions,
+    rasterize_regions
+)
+
+
+def _scene(position: int, shape=(240, 320)) -> np.ndarray:
+    """
+    Generates a grayscale frame with a square at the given position.
+
+    Args:
+        position: Horizontal position of the square.
+        shape: Shape of the frame.
+
+    Returns:
+        The frame.
+    """
+    image = np.full(shape, 64, np.uint8)
+    cv2.rectangle(image, (position, 80), (position + 60, 140), 255, -1)
+    return image
+
+
+@pytest.mark.parametrize('name', list(DETECTORS))
+def test_detect(name: str) -> None:
+    """
+    Tests motion detection of every strategy.
+
+    Args:
+        name: Name of the strategy.
+    """
+    detector = create_detector(name, threshold=5, scale=0.5)
+    assert detector.NAME == name
+
+    # Static scene
+    for _ in range(5):
+        assert not detector.detect(_scene(20)).size
+
+    # Moving object
+    boxes = detector.detect(_scene(200))
+    assert boxes.dtype == MOTION_BOX
+    assert boxes.size
+    assert boxes['area'].min() >= detector.MIN_AREA
+    assert boxes['x'].min() <= 200
+    assert (boxes['x'] + boxes['width']).max() >= 260
+    assert boxes['y'].min() <= 80
+    assert (boxes['y'] + boxes['height']).max() >= 140
+
+
+def test_resolution_change() -> None:
+    """Tests that the detection restarts when the frame shape changes."""
+    detector = FrameDifferenceDetector()
+    detector.detect(_scene(20))
+    assert not detector.detect(_scene(200, (480, 640))).size
+    assert detector.detect(_scene(20, (480, 640))).size
+
+
+def test_create_detector() -> None:
+    """Tests detector creation from strategy names."""
+    assert isinstance(create_detector('unknown'), DETECTORS[DEFAULT_DETECTOR])
+
+
+@pytest.mark.parametrize('name', list(DETECTORS))
+def test_detect_allocation(name: str) -> None:
+    """
+    Tests that detection does not allocate images once the buffers exist.
+
+    Args:
+        name: Name of the strategy.
+    """
+    detector = create_detector(name)
+    frames = [_scene(20), _scene(200)]
+    for image in frames * 5:
+        detector.detect(image)
+
+    tracemalloc.start()
+    for image in frames * 5:
+        detector.detect(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < frames[0].nbytes
+
+
+def test_regions() -> None:
+    """Tests motion detection restricted to regions."""
+    regions = parse_regions('0,0 1,0 1,1 0,1; !0.5,0 1,0 1,1 0.5,1')
+    assert regions[1] == Region(((0.5, 0), (1, 0), (1, 1), (0.5, 1)), True)
+    assert format_regions(regions) == '0,0 1,0 1,1 0,1; !0.5,0 1,0 1,1 0.5,1'
+    with pytest.raises(ValueError):
+        parse_regions('0,0 1,0')
+    with pytest.raises(ValueError):
+        parse_regions('0,0 2,0 1,1')
+
+    mask = rasterize_regions(regions, (240, 320))
+    assert mask[:, :150].all() and not mask[:, 170:].any()
+    assert rasterize_regions([], (240, 320)) is None
+
+    # Motion in the excluded half is ignored
+    detector = FrameDifferenceDetector(regions=regions)
+    detector.detect(_scene(200))
+    assert not detector.detect(_scene(250)).size
+    assert detector.detect(_scene(20)).size
+
+    # Analysis is cropped to the included region
+    detector = FrameDifferenceDetector(
+        regions=parse_regions('0,0 0.5,0 0.5,1 0,1')
+    )
+    detector.detect(_scene(200))
+    boxes = detector.detect(_scene(20))
+    assert boxes.size
+    assert boxes['x'].min() <= 20
+    assert getattr(detector, '_blurred').shape[1] < 170
+
+
+def test_cell_prefilter() -> None:
+    """Tests that scattered changes do not reach the contour extraction."""
+    detector = FrameDifferenceDetector()
+    detector.detect(_scene(20))
+
+    # Isolated pixels changed
+    image = _scene(20)
+    image[::40, ::40] = 0
+    assert not detector.detect(image).size
+    assert not detector.suspected
+
+    # Small object, suspected but not reported
+    image = _scene(20)
+    cv2.rectangle(image, (200, 20), (220, 40), 0, -1)
+    assert not detector.detect(image).size
+    assert detector.suspected
+
+
+def test_heatmap(tmp_path: pathlib.Path) -> None:
+    """
+    Tests the accumulation of motion into a heatmap.
+
+    Args:
+        tmp_path: Fixture for temporary path handling.
+    """
+    detector = FrameDifferenceDetector(
+        regions=parse_regions('0,0 0.5,0 0.5,1 0,1')
+    )
+    heatmap = MotionHeatmap(half_life=10)
+    assert detector.foreground is None
+    for second, position in enumerate((20, 60, 20, 60)):
+        image = _scene(position)
+        detector.detect(image)
+        if detector.foreground is not None:
+            heatmap.update(
+                detector.foreground,
+                float(second),
+                image.shape,
+                detector.crop
+            )
+    assert heatmap.heat.shape == (240, 320)
+    assert heatmap.heat[110, 40] > 0
+    assert not heatmap.heat[:, 170:].any()
+
+    # Motion decays, a long gap counts as a single interval
+    hot = heatmap.heat[110, 40]
+    heatmap.update(np.zeros((240, 320), np.uint8), 1000.0, (240, 320))
+    assert 0 < heatmap.heat[110, 40] < hot
+
+    frame = np.zeros((480, 640, 3), np.uint8)
+    overlay = heatmap.overlay(frame)
+    assert overlay.shape == frame.shape
+    assert overlay[220, 80].any() and not overlay[:, 400:].any()
+
+    path = str(tmp_path / 'heatmap.npy')
+    heatmap.save(path)
+    heatmap.reset()
+    assert not heatmap.heat.size
+    assert not heatmap.overlay(frame).any()
+    heatmap.load(path)
+    assert heatmap.heat[110, 40] > 0
@@ -0,0 +1,122 @@
+"""
+Test suite for surveillance pipeline testing.
+"""
+from threading import Event
+from time import sleep
+from typing import Any, Dict, List
+
+import pytest
+import pytest_mock
+
+from opencv_mock import mock_video_capture
+from surveillance_bot.camera import Camera
+from surveillance_bot.pipeline import Stage, SurveillancePipeline
+
+
+def test_stage() -> None:
+    """Tests processing, back-pressure and dropping of a stage."""
+    processed: List[int] = []
+    release = Event()
+
+    def handler(item: int) -> None:
+        release.wait()
+        processed.append(item)
+
+    stage = Stage('test', handler, maxsize=2)
+    stage.start()
+    assert stage.put(0)
+    sleep(0.1)  # First item is being processed
+    assert stage.put(1) and stage.put(2)
+    assert not stage.put(3, droppable=True)
+    assert stage.stats.depth == 2
+    assert stage.stats.dropped == 1
+
+    release.set()
+    stage.join()
+    assert processed == [0, 1, 2]
+    stats = stage.stats
+    assert stats.processed == 3
+    assert stats.depth == 0
+    assert stats.latency >= 0.1 / 3
+
+
+def test_stage_error() -> None:
+    """Tests error handling of a stage."""
+    errors: List[Exception] = []
+
+    def handler(item: int) -> None:
+        if item == 1:
+            raise ValueError
+    stage = Stage('test', handler, on_error=errors.append)
+    stage.start()
+    for item in range(3):
+        stage.put(item)
+    stage.join()
+    assert stage.stats.processed == 3
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+
+
+def test_surveillance_pipeline(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests that a slow delivery does not stall the surveillance mode.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+    camera = Camera()
+    camera.start()
+    sleep(0.2)  # Wait for fps calculation
+
+    delivered: List[Dict[str, Any]] = []
+
+    def deliver(data: Dict[str, Any]) -> None:
+        delivered.append(data)
+        if 'photo' in data:
+            sleep(0.5)  # Slow upload
+        if 'video' in data:
+            camera.surveillance_stop()
+
+    pipeline = SurveillancePipeline(
+        camera,
+        deliver,
+        video_seconds=1,
+        picture_seconds=0.25,
+        idle_fps=0
+    )
+    pipeline.run()
+    camera.stop()
+
+    assert 'detected' in delivered[0]
+    video = next(i for i, data in enumerate(delivered) if 'video' in data)
+    assert delivered[video]['video'].read(12) == b'\x00\x00\x00\x1cftypisom'
+    photos = [data for data in delivered[:video] if 'photo' in data]
+    assert len(photos) == 4
+    assert photos[0]['photo'].read(2) == b'\xff\xd8'
+    assert photos[0]['id'] == 1 and photos[0]['total'] == 4
+
+    # Results were queued while photos were being uploaded
+    encode, deliver_stats = pipeline.stats
+    assert encode.processed == len(delivered)
+    assert deliver_stats.latency > 0.5
+
+
+def test_surveillance_pipeline_error(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests that delivery errors stop the surveillance mode.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+    camera = Camera()
+    camera.start()
+
+    def deliver(_: Dict[str, Any]) -> None:
+        raise ConnectionError
+
+    pipeline = SurveillancePipeline(camera, deliver, idle_fps=0)
+    with pytest.raises(ConnectionError):
+        pipeline.run()
+    assert not camera.is_surveillance_active
+    camera.stop()
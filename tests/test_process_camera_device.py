@@ -0,0 +1,75 @@
+"""
+Test suite for ProcessCameraDevice class testing.
+"""
+import numpy as np
+import pytest
+import pytest_mock
+
+from opencv_mock import FRAME_SIZE, mock_video_capture
+from surveillance_bot.capture import CameraConnectionError, ProcessCameraDevice
+from surveillance_bot.frames import SharedFrameRing
+
+
+def test_init_camera_connection_error(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests ProcessCameraDevice instantiation when device is not reachable.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, reader=False, opened=False)
+
+    with pytest.raises(CameraConnectionError):
+        ProcessCameraDevice()
+
+
+def test_read(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests frame reading from the capture process.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    camera_device = ProcessCameraDevice()
+    assert camera_device.frame_size == FRAME_SIZE
+    frame = camera_device.get_frame()
+    assert frame.id == 0
+    assert frame.proxy.shape == (240, 320)
+    assert not frame.image.flags.writeable
+
+    # Process is not grabbing until device is started
+    assert camera_device.wait_for_frame(frame.id, timeout=0.1) is None
+
+    camera_device.start()
+    frame = camera_device.wait_for_frame(frame.id, timeout=1)
+    assert frame is not None
+    assert frame.id > 0
+    frame_id, image = camera_device.read(after_id=frame.id, timeout=1)
+    assert frame_id > frame.id
+    assert isinstance(image, np.ndarray)
+    camera_device.stop()
+    del frame, image
+    del camera_device
+
+
+def test_shared_frame_ring() -> None:
+    """Tests frame sharing between two rings attached to the same memory."""
+    writer = SharedFrameRing(2, (4, 4, 3), np.uint8, (2, 2), None)
+    reader = SharedFrameRing(2, (4, 4, 3), np.uint8, (2, 2), None, writer.name)
+    assert reader.last_id == -1
+
+    writer.next_slot().fill(7)
+    writer.next_proxy().fill(3)
+    writer.publish(1.0)
+    frame = reader.latest()
+    assert frame.id == 0
+    assert frame.timestamp == 1.0
+    assert np.all(frame.image == 7)
+    assert np.all(frame.proxy == 3)
+
+    del frame
+    reader.close()
+    writer.close()
+    writer.unlink()
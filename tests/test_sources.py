@@ -0,0 +1,159 @@
+"""
+Test suite for frame sources testing.
+"""
+import os
+import time
+
+import _pytest.tmpdir
+import cv2
+import numpy as np
+import pytest_mock
+
+from opencv_mock import FRAMES, FRAMES_JPEG, mock_video_capture
+from surveillance_bot.capture import CameraDevice
+from surveillance_bot.sources import (
+    DeviceSource,
+    ImageSequenceSource,
+    SyntheticSource,
+    VideoFileSource,
+    open_source
+)
+
+FRAMES_DIR = os.path.join(os.path.dirname(__file__), 'frames')
+
+
+def test_device_source(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests live device source.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker)
+
+    source = DeviceSource()
+    assert source.is_opened()
+    grabbed, frame = source.read()
+    assert grabbed
+    assert np.array_equal(frame, FRAMES[0])
+    source.release()
+
+
+def test_device_source_passthrough(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests live device source in MJPEG passthrough mode.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, mjpeg=True)
+
+    source = DeviceSource(passthrough=True)
+    cv2.VideoCapture().set.assert_any_call(cv2.CAP_PROP_CONVERT_RGB, 0)
+    assert source.get_encoded() is None
+    grabbed, frame = source.read()
+    assert grabbed
+    assert frame.shape == FRAMES[0].shape
+    assert source.get_encoded() == FRAMES_JPEG[0]
+
+    # Passthrough is disabled if the device decodes the frames
+    mock_video_capture(mocker)
+    source = DeviceSource(passthrough=True)
+    assert source.read()[0]
+    assert source.get_encoded() is None
+
+
+def test_image_sequence_source() -> None:
+    """Tests image directory source."""
+    source = ImageSequenceSource(FRAMES_DIR, realtime=False, loop=False)
+    assert source.is_opened()
+
+    image = np.empty_like(FRAMES[0])
+    for expected in FRAMES:
+        grabbed, frame = source.read(image)
+        assert grabbed
+        assert frame is image
+        assert np.array_equal(frame, expected)
+    assert source.read() == (False, None)
+
+    # Only grabbed frames are decoded
+    source = ImageSequenceSource(FRAMES_DIR, realtime=False)
+    assert source.retrieve() == (False, None)
+    assert source.grab() and source.grab()
+    assert np.array_equal(source.retrieve()[1], FRAMES[1])
+
+    assert not ImageSequenceSource(os.path.dirname(__file__)).is_opened()
+
+
+def test_video_file_source(tmp_path: _pytest.tmpdir.tmp_path) -> None:
+    """
+    Tests video file source.
+
+    Args:
+        tmp_path: Fixture for temporary path handling.
+    """
+    path = str(tmp_path / 'video.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 20, (64, 48))
+    for i in range(3):
+        writer.write(np.full((48, 64, 3), i * 100, np.uint8))
+    writer.release()
+
+    source = VideoFileSource(path, realtime=False)
+    assert source.is_opened()
+    assert source.fps == 20
+    means = [source.read()[1].mean() for _ in range(3)]
+    assert means == sorted(means)
+    assert not source.read()[0]
+
+    # Looping and real time playback
+    source = VideoFileSource(path, loop=True)
+    start = time.time()
+    assert all(source.read()[0] for _ in range(5))
+    assert time.time() - start >= 4 / 20
+    source.release()
+
+
+def test_synthetic_source() -> None:
+    """Tests synthetic scene source."""
+    source = SyntheticSource(
+        (160, 120),
+        realtime=False,
+        active_frames=2,
+        idle_frames=2
+    )
+    assert source.is_opened()
+    frames = [source.read()[1].copy() for _ in range(6)]
+    assert frames[0].shape == (120, 160, 3)
+    assert not np.array_equal(frames[0], frames[1])  # Motion
+    assert np.array_equal(frames[2], frames[3])  # Idle
+    assert not np.array_equal(frames[4], frames[5])  # Motion again
+
+
+def test_open_source(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests video source opening from specs.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_video_capture(mocker, reader=False)
+
+    assert isinstance(open_source(0), DeviceSource)
+    assert isinstance(open_source('1'), DeviceSource)
+    assert open_source('mjpeg:1').passthrough
+    assert isinstance(open_source(FRAMES_DIR), ImageSequenceSource)
+    assert isinstance(open_source('video.mp4'), VideoFileSource)
+    source = open_source('synthetic:320x240')
+    assert isinstance(source, SyntheticSource)
+    assert source.read()[1].shape == (240, 320, 3)
+    assert open_source(source) is source
+
+
+def test_camera_device_source() -> None:
+    """Tests camera device reading from a frame source."""
+    camera_device = CameraDevice(SyntheticSource(realtime=False))
+    camera_device.start()
+    frame = camera_device.wait_for_frame(0, timeout=1)
+    assert frame is not None
+    assert frame.image.shape == (480, 640, 3)
+    camera_device.stop()
@@ -0,0 +1,34 @@
+"""
+Test suite for TimedVideoWriter class testing.
+"""
+import numpy as np
+import pytest_mock
+
+from surveillance_bot.capture import TimedVideoWriter
+
+
+def test_write(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests frame placement by capture timestamp.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    video_writer = mocker.patch('cv2.VideoWriter')
+    writer = TimedVideoWriter('video.mp4', 'mp4v', 10, (4, 4))
+    image = np.zeros((4, 4, 3), np.uint8)
+
+    writer.write(image, 5.0)
+    assert writer.duration == 0.1
+
+    # Faster camera, frames are dropped
+    writer.write(image, 5.02)
+    assert writer.duration == 0.1
+
+    # Slower camera, frames are repeated
+    writer.write(image, 5.3)
+    assert writer.duration == 0.4
+    assert video_writer().write.call_count == 4
+
+    writer.release()
+    video_writer().release.assert_called_once()
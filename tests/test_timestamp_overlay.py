@@ -0,0 +1,52 @@
+"""
+Test suite for TimestampOverlay class testing.
+"""
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from surveillance_bot.capture import TimestampOverlay
+
+
+def test_apply() -> None:
+    """Tests that stamping matches the text rendered on the frame."""
+    overlay = TimestampOverlay()
+    image = np.full((480, 640, 3), 128, np.uint8)
+    second = int(time.time())
+    timestamp = time.monotonic() - (time.time() - second) + 0.5
+    overlay.apply(image, timestamp)
+
+    # Rendering the text straight on the frame gives the same result
+    expected = np.full((480, 640, 3), 128, np.uint8)
+    for candidate in (second, second + 1):
+        text = datetime.fromtimestamp(candidate).strftime(overlay.FORMAT)
+        expected.fill(128)
+        org = (1, expected.shape[0] - 3)
+        font = cv2.FONT_HERSHEY_PLAIN
+        cv2.putText(expected, text, org, font, 1, (0, 0, 0), 2)
+        cv2.putText(expected, text, org, font, 1, (255, 255, 255), 1)
+        if np.array_equal(image, expected):
+            break
+    else:
+        assert False, 'Time stamp does not match'
+
+
+def test_sprite_cache() -> None:
+    """Tests that the sprite is rendered once per second."""
+    overlay = TimestampOverlay()
+    image = np.zeros((480, 640, 3), np.uint8)
+    timestamp = time.monotonic() - (time.time() % 1) + 0.5
+
+    overlay.apply(image, timestamp)
+    cache = overlay._cache  # pylint: disable=protected-access
+    overlay.apply(image, timestamp)
+    assert overlay._cache is cache  # pylint: disable=protected-access
+
+
+def test_small_frame() -> None:
+    """Tests stamping frames smaller than the sprite."""
+    image = np.zeros((8, 8, 3), np.uint8)
+    TimestampOverlay().apply(image, time.monotonic())
+    assert image.any()
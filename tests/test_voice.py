@@ -0,0 +1,122 @@
+"""
+Test suite for voice note encoding testing.
+"""
+import subprocess
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import pytest_mock
+
+from surveillance_bot import voice
+from surveillance_bot.voice import (
+    FfmpegEncoder,
+    SoundFileEncoder,
+    VoiceEncodingError,
+    create_encoder,
+    decode_voice,
+    encode_voice
+)
+
+POPEN = subprocess.Popen
+"""Process class not mocked."""
+
+
+def mock_ffmpeg(mocker: pytest_mock.mocker, command: str) -> MagicMock:
+    """
+    Replaces ffmpeg by another command reading the samples.
+
+    Args:
+        mocker: Fixture for object mocking.
+        command: The command run instead of ffmpeg.
+
+    Returns:
+        The mock of the process class.
+    """
+    mocker.patch.object(voice, 'sf', None)
+    mocker.patch('shutil.which', return_value=f'/usr/bin/{command}')
+    return mocker.patch(
+        'subprocess.Popen',
+        side_effect=lambda args, **kwargs: POPEN(  # pylint: disable=consider-using-with
+            [command],
+            **kwargs
+        )
+    )
+
+
+def test_create_encoder(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests the selection of the encoder.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    mock_ffmpeg(mocker, 'cat')
+    soundfile = mocker.patch.object(voice, 'sf')
+    soundfile.available_subtypes.return_value = {'OPUS': 'Opus'}
+
+    # In process encoder
+    assert isinstance(create_encoder(48000), SoundFileEncoder)
+    soundfile.SoundFile.assert_called_once()
+
+    # Sample rate not supported by Opus
+    encoder = create_encoder(44100)
+    assert isinstance(encoder, FfmpegEncoder)
+    encoder.close()
+
+    # No encoders
+    mocker.patch.object(voice, 'sf', None)
+    mocker.patch('shutil.which', return_value=None)
+    with pytest.raises(VoiceEncodingError):
+        create_encoder(48000)
+
+
+def test_ffmpeg_encoder(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests the samples streamed to ffmpeg.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    popen = mock_ffmpeg(mocker, 'cat')
+    samples = np.arange(-50000, 50000, dtype=np.int32).reshape(-1, 1)
+
+    audio = encode_voice((samples[:30000], samples[30000:]), 8000)
+    assert audio.read() == samples.tobytes()
+
+    args = popen.call_args[0][0]
+    assert args[0] == 'ffmpeg'
+    assert args[args.index('-ar') + 1] == '8000'
+    assert 'libopus' in args
+
+    # Failed encoding
+    mock_ffmpeg(mocker, 'false')
+    with pytest.raises(VoiceEncodingError):
+        encode_voice((samples,), 8000)
+
+
+def test_decode_voice(mocker: pytest_mock.mocker) -> None:
+    """
+    Tests the decoding of the voice notes received.
+
+    Args:
+        mocker: Fixture for object mocking.
+    """
+    popen = mock_ffmpeg(mocker, 'cat')
+    samples = np.arange(-50000, 50000, dtype=np.int32).reshape(-1, 1)
+
+    decoded, sample_rate = decode_voice(samples.tobytes())
+    args = popen.call_args[0][0]
+    assert args[args.index('-f') + 1] == 's32le'
+    assert sample_rate == voice.DECODING_RATE
+    assert (decoded == samples).all()
+
+    # Failed decoding
+    mock_ffmpeg(mocker, 'false')
+    with pytest.raises(VoiceEncodingError):
+        decode_voice(samples.tobytes())
+
+    # No decoders
+    mocker.patch('shutil.which', return_value=None)
+    with pytest.raises(VoiceEncodingError):
+        decode_voice(samples.tobytes())